@@ -2,9 +2,24 @@ from django.apps import AppConfig
 
 
 class BeeConfig(AppConfig):
+    default = True
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bee'
 
+    def ready(self):
+        import bee.availability
+        import bee.dbmetrics
+        import bee.facets
+        import bee.purchasing
+        import bee.response_cache
+        import bee.search
+
+        from django.conf import settings
+        if getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', 0.0) > 0:
+            # Before any worker thread connects, so every connection gets the query timer
+            from bee.metrics import instrument_connections
+            instrument_connections()
+
 
 
 from django.apps import AppConfig
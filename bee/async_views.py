@@ -0,0 +1,87 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from .conditional import aconditional_get
+from .models import Brand, Category, Inventory, Product, Variant, Warehouse
+from .pagination import InvalidCursor, cursor_queryset, page_meta
+from .response_cache import acached_get, bypasses_cache
+from .serializers import (
+    BrandSerializer, CategorySerializer, InventorySerializer,
+    ProductSerializer, VariantSerializer, WarehouseSerializer,
+)
+
+
+def async_api_response(message, error, data=None, code=status.HTTP_200_OK, page=None):
+    """
+    Same envelope and bytes as views.api_response, without going through DRF.
+    """
+    meta = {"data": data if data else {}}
+    if page is not None:
+        meta["page"] = page
+    content = JSONRenderer().render({"message": message, "error": error, "meta": meta})
+    return HttpResponse(content, status=code, content_type='application/json')
+
+
+def async_list(queryset, serializer_class, message):
+    async def view(request):
+        try:
+            page_queryset, page_size = cursor_queryset(request, queryset.all())
+        except InvalidCursor:
+            return async_api_response("Invalid cursor", True, {}, status.HTTP_400_BAD_REQUEST)
+        rows, page = page_meta([obj async for obj in page_queryset], page_size)
+        serializer = serializer_class(rows, many=True)
+        return async_api_response(message, False, serializer.data, page=page)
+    return view
+
+
+def async_detail(queryset, serializer_class, message, not_found):
+    async def view(request, pk):
+        try:
+            obj = await queryset.aget(pk=pk)
+        except (queryset.model.DoesNotExist, ValidationError):
+            return async_api_response(not_found, True, {}, status.HTTP_404_NOT_FOUND)
+        return async_api_response(message, False, serializer_class(obj).data)
+    return view
+
+
+def catalog_view(view_class, async_get, sync_params=()):
+    """
+    With ASYNC_CATALOG_READS on, plain GETs are served by the native async handler and
+    everything else (writes, ?stream= exports, ?expand=, any of sync_params) falls through
+    to the DRF view in a thread.
+    Async GETs skip DRF authentication; the catalog reads are public anyway.
+    """
+    sync_view = view_class.as_view()
+    if not getattr(settings, 'ASYNC_CATALOG_READS', False):
+        return sync_view
+
+    async def view(request, *args, **kwargs):
+        if request.method == 'GET' and not bypasses_cache(request) and not any(request.GET.get(name) for name in sync_params):
+            return await async_get(request, *args, **kwargs)
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+    return csrf_exempt(view)
+
+
+category_list = aconditional_get(Category)(acached_get('categories')(async_list(Category.objects.all(), CategorySerializer, "Categories fetched successfully")))
+category_detail = aconditional_get(Category)(acached_get('categories')(async_detail(Category.objects.all(), CategorySerializer, "Category details fetched", "Category not found")))
+
+brand_list = aconditional_get(Brand)(acached_get('brands')(async_list(Brand.objects.all(), BrandSerializer, "Brands fetched successfully")))
+brand_detail = aconditional_get(Brand)(acached_get('brands')(async_detail(Brand.objects.all(), BrandSerializer, "Brand details fetched", "Brand not found")))
+
+product_list = aconditional_get(Product)(acached_get('products')(async_list(ProductSerializer.query_plan(Product.objects.all()), ProductSerializer, "Products fetched successfully")))
+product_detail = aconditional_get(Product)(acached_get('products')(async_detail(ProductSerializer.query_plan(Product.objects.all()), ProductSerializer, "Product details fetched", "Product not found")))
+
+variant_list = aconditional_get(Variant)(async_list(Variant.objects.all(), VariantSerializer, "Variants fetched successfully"))
+variant_detail = aconditional_get(Variant)(async_detail(Variant.objects.all(), VariantSerializer, "Variant details fetched", "Variant not found"))
+
+warehouse_list = aconditional_get(Warehouse)(async_list(Warehouse.objects.all(), WarehouseSerializer, "Warehouses fetched successfully"))
+warehouse_detail = aconditional_get(Warehouse)(async_detail(Warehouse.objects.all(), WarehouseSerializer, "Warehouse details fetched", "Warehouse not found"))
+
+inventory_list = aconditional_get(Inventory)(async_list(Inventory.objects.all(), InventorySerializer, "Inventories fetched successfully"))
+inventory_detail = aconditional_get(Inventory)(async_detail(Inventory.objects.all(), InventorySerializer, "Inventory details fetched", "Inventory not found"))
@@ -1,10 +1,70 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.functional import cached_property
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
-from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth import get_user_model
 
+from .cache import TTLCache, restore, snapshot
+from .models import Role
+from .tokens import ROLE_CLAIM, SELLER_CLAIM, AccessToken
+
 User = get_user_model()
 
+# Per-process cache of authenticated users, keyed by user id. Entries are snapshots, so every
+# request gets its own User. The receivers below only clear this process's cache: a change
+# made by another worker shows up here once AUTH_USER_CACHE_TTL runs out.
+_user_cache = TTLCache(
+    maxsize=getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 60),
+)
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request principal built from the access token claims (no DB lookup). Tokens only carry
+    authorization claims (see bee.tokens); load the User for profile fields. Tokens issued
+    before the compact claims carry 'role' and 'is_seller' until they expire.
+    """
+
+    @cached_property
+    def role_name(self):
+        return self.token.get(ROLE_CLAIM, self.token.get('role'))
+
+    @cached_property
+    def is_seller(self):
+        return bool(self.token.get(SELLER_CLAIM, self.token.get('is_seller', False)))
+
+
+def get_cached_user(user_id):
+    """
+    Returns a fresh User (with its role) for the given id, built from the per-process
+    cache when possible.
+    """
+    key = str(user_id)
+    frozen = _user_cache.get(key)
+    if frozen is None:
+        user = User.objects.select_related('role').get(id=user_id)
+        _user_cache.set(key, snapshot(user, related=('role',)))
+        return user
+    return restore(frozen)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    _user_cache.pop(str(instance.pk))
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_cached_users_for_role(sender, instance, **kwargs):
+    _user_cache.clear()
+
+
 class CookieJWTAuthentication(BaseAuthentication):
     def authenticate(self, request):
         access_token = request.COOKIES.get('access_token')
@@ -13,10 +73,11 @@ class CookieJWTAuthentication(BaseAuthentication):
 
         try:
             token = AccessToken(access_token)
-            user_id = token['user_id']
-            user = User.objects.get(id=user_id)
+            if getattr(settings, 'JWT_STATELESS_AUTH', False):
+                return (ClaimsUser(token), token)
+            user = get_cached_user(token[api_settings.USER_ID_CLAIM])
             return (user, token)
         except Exception as e:
             raise AuthenticationFailed('Invalid or expired token.')
 
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,164 @@
+"""
+Per-product availability summary (ProductAvailability), kept in step with Inventory.
+
+Stock changes (reservations, adjustments) go through apply_stock_deltas: each Inventory
+row gets a conditional F() UPDATE and each touched summary an F() UPDATE of its totals, so
+checkouts never aggregate or lock-read. Only a row reaching or leaving zero available can
+change min_price, warehouse_count or whether the product sells at all; those products are
+recomputed by refresh_availability, as are Inventory saves/deletes and bulk inventory writes.
+It recomputes with one grouped aggregate while holding the summary rows locked, so the last
+writer always sees every committed change.
+
+Cached product responses are invalidated only when a summary's in-stock state, min_price
+or warehouse_count changes; the totals they embed can lag by up to CATALOG_CACHE_TTL.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Min, Q, QuerySet, Sum
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Inventory, Product, ProductAvailability
+from .response_cache import invalidate
+
+SUMMARY_FIELDS = ['total_available', 'total_reserved', 'min_price', 'warehouse_count']
+
+
+def compute_availability(product_ids):
+    """
+    Returns {product_id: {field: value}} straight from Inventory, for products that have stock rows.
+    """
+    rows = (
+        Inventory.objects.filter(product_id__in=product_ids)
+        .order_by()
+        .values('product_id')
+        .annotate(
+            total_available=Sum('quantity_available'),
+            total_reserved=Sum('quantity_reserved'),
+            # Only warehouses that can actually sell count towards price and coverage
+            min_price=Min('price', filter=Q(quantity_available__gt=0)),
+            warehouse_count=Count('warehouse_id', filter=Q(quantity_available__gt=0), distinct=True),
+        )
+    )
+    return {row.pop('product_id'): row for row in rows}
+
+
+def empty_summary():
+    return {'total_available': 0, 'total_reserved': 0, 'min_price': None, 'warehouse_count': 0}
+
+
+def storefront_state(summary):
+    """
+    What product responses show beyond the running totals.
+    """
+    return summary['total_available'] > 0, summary['min_price'], summary['warehouse_count']
+
+
+def refresh_availability(product_ids):
+    product_ids = sorted(set(product_ids), key=str)
+    if not product_ids:
+        return
+    with transaction.atomic():
+        existing = Product.objects.filter(pk__in=product_ids).values_list('pk', flat=True)
+        ProductAvailability.objects.bulk_create(
+            [ProductAvailability(product_id=pk) for pk in existing], ignore_conflicts=True
+        )
+        summaries = list(
+            ProductAvailability.objects.select_for_update().filter(product_id__in=product_ids).order_by('product_id')
+        )
+        computed = compute_availability(product_ids)
+        now = timezone.now()
+        changed = False
+        for summary in summaries:
+            values = computed.get(summary.product_id, empty_summary())
+            before = {field: getattr(summary, field) for field in SUMMARY_FIELDS}
+            changed = changed or storefront_state(before) != storefront_state(values)
+            for field, value in values.items():
+                setattr(summary, field, value)
+            summary.updated_at = now
+        ProductAvailability.objects.bulk_update(summaries, SUMMARY_FIELDS + ['updated_at'])
+        if changed:
+            # Product responses embed the summary
+            transaction.on_commit(lambda: invalidate('products'))
+
+
+def _apply_to_row(inventory_id, available, reserved, now):
+    """
+    Returns None when the row lacks the stock a negative `available` takes, else whether
+    it reached or left zero available.
+    """
+    changes = {'updated_at': now}
+    if available:
+        changes['quantity_available'] = F('quantity_available') + available
+    if reserved:
+        changes['quantity_reserved'] = F('quantity_reserved') + reserved
+    rows = Inventory.objects.filter(pk=inventory_id)
+    if not available:
+        return False if rows.update(**changes) else None
+    # Zero is where it lands when taking, or where it starts from when adding
+    boundary = max(0, -available)
+    if rows.filter(quantity_available__gt=boundary).update(**changes):
+        return False
+    if rows.filter(quantity_available=boundary).update(**changes):
+        return True
+    return None
+
+
+def apply_stock_deltas(deltas):
+    """
+    Applies {inventory_id: (available_delta, reserved_delta)} to Inventory and the product
+    summaries; call it inside a transaction. Rows are updated in primary-key order and
+    summaries in product order, so concurrent callers cannot deadlock. Returns the first
+    inventory id whose row lacks the stock its delta takes (the caller must roll back),
+    or None.
+    """
+    now = timezone.now()
+    crossed = set()
+    for inventory_id, (available, reserved) in sorted(deltas.items(), key=lambda item: str(item[0])):
+        result = _apply_to_row(inventory_id, available, reserved, now)
+        if result is None:
+            return inventory_id
+        if result:
+            crossed.add(str(inventory_id))
+
+    # Callers pass ids as strings or UUIDs
+    by_id = {str(inventory_id): delta for inventory_id, delta in deltas.items()}
+    totals = defaultdict(lambda: [0, 0])
+    recompute = set()
+    for inventory_id, product_id in Inventory.objects.filter(pk__in=list(deltas)).values_list('pk', 'product_id'):
+        available, reserved = by_id[str(inventory_id)]
+        totals[product_id][0] += available
+        totals[product_id][1] += reserved
+        if str(inventory_id) in crossed:
+            recompute.add(product_id)
+    for product_id in sorted(totals, key=str):
+        available, reserved = totals[product_id]
+        if product_id in recompute or not ProductAvailability.objects.filter(product_id=product_id).update(
+            total_available=F('total_available') + available,
+            total_reserved=F('total_reserved') + reserved,
+            updated_at=now,
+        ):
+            refresh_availability([product_id])
+    return None
+
+
+@receiver(post_init, sender=Inventory)
+def remember_inventory_product(sender, instance, **kwargs):
+    # An update can move the row to another product; both products need refreshing
+    instance._availability_product_id = instance.product_id_id
+
+
+@receiver(post_save, sender=Inventory)
+def refresh_saved_inventory(sender, instance, **kwargs):
+    refresh_availability({instance.product_id_id, instance._availability_product_id} - {None})
+    instance._availability_product_id = instance.product_id_id
+
+
+@receiver(post_delete, sender=Inventory)
+def refresh_deleted_inventory(sender, instance, origin=None, **kwargs):
+    # Deleting the product itself (one instance or a queryset) cascades to its summary as well
+    if isinstance(origin, Product) or (isinstance(origin, QuerySet) and origin.model is Product):
+        return
+    refresh_availability([instance.product_id_id])
@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+
+def bulk_write(serializer, upsert=True):
+    """
+    Writes the validated rows of a bulk (many=True) serializer in one transaction.
+    Rows are upserted on Meta.bulk_key when upsert is set; rows carrying their
+    primary key are bulk-updated. Existing rows only get the fields the caller sent
+    (minus Meta.bulk_insert_only): rows are written in groups with the same set of fields,
+    so an omitted field keeps its stored value instead of being reset to the model default.
+    Returns a dict of created/updated/upserted counts.
+    """
+    groups = {}
+    for row in serializer.validated_data:
+        groups.setdefault(frozenset(row), []).append(row)
+
+    counts = {"updated": 0}
+    with transaction.atomic():
+        for fields, rows in groups.items():
+            for name, count in _write_group(serializer.child, rows, fields, upsert).items():
+                counts[name] = counts.get(name, 0) + count
+    return counts
+
+
+def _write_group(child, rows, fields, upsert):
+    model = child.Meta.model
+    batch_size = getattr(settings, 'BULK_BATCH_SIZE', 1000)
+    pk_name = model._meta.pk.attname
+    # A primary-key bulk_key only marks rows for bulk_update; new rows are plain inserts
+    key = [model._meta.get_field(name) for name in getattr(child.Meta, 'bulk_key', ())]
+    key = [field for field in key if field.attname != pk_name]
+    # Meta.bulk_insert_only fields are written on insert and left alone on existing rows
+    skip = {field.attname for field in key} | {
+        model._meta.get_field(name).attname for name in getattr(child.Meta, 'bulk_insert_only', ())
+    }
+    update_fields = [
+        model._meta.get_field(attname).name for attname in sorted(fields)
+        if attname != pk_name and attname not in skip
+    ] + ['updated_at']
+
+    # bulk_update does not run auto_now, so updated_at is stamped here
+    now = timezone.now()
+    to_update, to_insert = [], []
+    for row in rows:
+        if row.get(pk_name):
+            to_update.append(model(**row, updated_at=now))
+        else:
+            to_insert.append(model(**{k: v for k, v in row.items() if k != pk_name}))
+
+    counts = {}
+    if to_update:
+        model.objects.bulk_update(to_update, update_fields, batch_size=batch_size)
+        counts["updated"] = len(to_update)
+    if upsert and key and to_insert:
+        model.objects.bulk_create(
+            to_insert,
+            batch_size=batch_size,
+            update_conflicts=True,
+            # MySQL's ON DUPLICATE KEY UPDATE cannot name the conflict target
+            unique_fields=[field.name for field in key] if connection.features.supports_update_conflicts_with_target else None,
+            update_fields=update_fields,
+        )
+        counts["upserted"] = len(to_insert)
+    elif to_insert:
+        model.objects.bulk_create(to_insert, batch_size=batch_size)
+        counts["created"] = len(to_insert)
+    return counts
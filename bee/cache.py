@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Small thread-safe in-process cache with LRU eviction and per-entry expiry.
+    Used for hot lookups that must not hit the database on every request.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry else None
+
+    def discard_where(self, predicate):
+        """
+        Drops every entry whose key matches the predicate.
+        """
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def snapshot(instance, related=()):
+    """
+    Immutable copy of a model instance's column values (plus the given loaded forward
+    relations), for caches shared between requests and threads. Rebuild with restore().
+    """
+    values = tuple(getattr(instance, field.attname) for field in instance._meta.concrete_fields)
+    relations = tuple(
+        (name, snapshot(getattr(instance, name)) if getattr(instance, name) is not None else None)
+        for name in related
+    )
+    return type(instance), instance._state.db, values, relations
+
+
+def restore(frozen):
+    """
+    A new, unshared instance built from snapshot(); no query.
+    """
+    model, db, values, relations = frozen
+    instance = model.from_db(db, [field.attname for field in model._meta.concrete_fields], values)
+    for name, related in relations:
+        model._meta.get_field(name).set_cached_value(instance, restore(related) if related else None)
+    return instance
@@ -0,0 +1,130 @@
+import hashlib
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, Value
+from django.http import HttpResponseNotModified
+from django.utils.http import http_date
+
+from .models import Product, ProductAvailability, Variant
+from .response_cache import bypasses_cache
+
+# Other tables a model's responses depend on, with the field pointing back at it: product
+# rows embed their availability summary and product lists can be filtered by variant
+# attributes. Changes that do not touch updated_at (Brand/Category deletes SET_NULL the
+# product FKs) stamp the products in bee.models, so every input shows up in the data.
+ETAG_DEPENDENCIES = {
+    Product: {Variant: 'product_id', ProductAvailability: 'product_id'},
+}
+VERSION = {'last_modified': Max('updated_at'), 'count': Count('*')}
+
+
+def version_queryset(model, pk=None, field='pk'):
+    queryset = model.objects.order_by()
+    if pk is not None:
+        queryset = queryset.filter(**{field: pk})
+    return queryset
+
+
+def version_query(model, pk=None):
+    """
+    MAX(updated_at) / COUNT(*) of the model's rows and of each of its ETAG_DEPENDENCIES,
+    as one UNION ALL query yielding (part, last_modified, count) rows.
+    """
+    querysets = [version_queryset(model, pk)] + [
+        version_queryset(dependency, pk, field) for dependency, field in ETAG_DEPENDENCIES.get(model, {}).items()
+    ]
+    parts = [
+        queryset.annotate(part=Value(index)).values('part').annotate(**VERSION).values_list('part', 'last_modified', 'count')
+        for index, queryset in enumerate(querysets)
+    ]
+    return parts[0].union(*parts[1:], all=True) if len(parts) > 1 else parts[0]
+
+
+def combine(rows):
+    """
+    One version from the per-table rows of version_query(); Last-Modified is the newest change.
+    """
+    versions = [
+        {'last_modified': last_modified, 'count': count}
+        for _, last_modified, count in sorted(rows, key=lambda row: row[0])
+    ]
+    stamps = [version['last_modified'] for version in versions if version['last_modified'] is not None]
+    return {'last_modified': max(stamps) if stamps else None, 'parts': versions}
+
+
+def compute_etag(model, request, version):
+    """
+    Derived only from the request and the data, so every worker answers with the same ETag.
+    """
+    query = request.GET.urlencode() if request.GET else ''
+    raw = "|".join([
+        model._meta.label,
+        f"{request.path}?{query}",
+        *(
+            f"{part['last_modified'].isoformat() if part['last_modified'] else ''}:{part['count']}"
+            for part in version['parts']
+        ),
+    ])
+    return f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return etag in tags or '*' in tags
+
+
+def with_validators(response, etag, version):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if version['last_modified'] is not None:
+            response['Last-Modified'] = http_date(version['last_modified'].timestamp())
+    return response
+
+
+def conditional_get(model, whole_table=False):
+    """
+    Adds ETag / Last-Modified to a GET handler, computed from MAX(updated_at) and COUNT(*)
+    of the table (or of the single row for detail views, unless whole_table) and of its
+    ETAG_DEPENDENCIES, and answers a matching If-None-Match with 304 before any row is
+    loaded or serialized, with one query. With an index on updated_at each aggregate reads
+    only that index.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if bypasses_cache(request):
+                return method(self, request, *args, **kwargs)
+            try:
+                pk = None if whole_table else kwargs.get('pk')
+                version = combine(list(version_query(model, pk)))
+            except ValidationError:
+                return method(self, request, *args, **kwargs)
+            etag = compute_etag(model, request, version)
+            if etag_matches(request, etag):
+                return with_validators(HttpResponseNotModified(), etag, version)
+            return with_validators(method(self, request, *args, **kwargs), etag, version)
+        return wrapper
+    return decorator
+
+
+def aconditional_get(model):
+    """
+    conditional_get for the native async catalog views (bee.async_views).
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                version = combine([row async for row in version_query(model, kwargs.get('pk'))])
+            except ValidationError:
+                return await view(request, *args, **kwargs)
+            etag = compute_etag(model, request, version)
+            if etag_matches(request, etag):
+                return with_validators(HttpResponseNotModified(), etag, version)
+            return with_validators(await view(request, *args, **kwargs), etag, version)
+        return wrapper
+    return decorator
@@ -0,0 +1,41 @@
+import threading
+
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_lock = threading.Lock()
+_counters = {
+    "requests": 0,
+    "connections_opened": 0,
+}
+
+
+@receiver(request_started)
+def count_request(sender, **kwargs):
+    with _lock:
+        _counters["requests"] += 1
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    with _lock:
+        _counters["connections_opened"] += 1
+
+
+def connection_stats():
+    """
+    Per-process DB connection reuse counters since startup.
+    """
+    with _lock:
+        stats = dict(_counters)
+    requests = stats["requests"]
+    stats["connections_per_request"] = round(stats["connections_opened"] / requests, 4) if requests else 0.0
+    stats["reuse_ratio"] = round(1 - stats["connections_per_request"], 4) if requests else 0.0
+    return stats
+
+
+def reset_connection_stats():
+    with _lock:
+        for key in _counters:
+            _counters[key] = 0
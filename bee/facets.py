@@ -0,0 +1,399 @@
+"""
+Filters and facet counts for the product list: brand, category (with its subcategories),
+and the variant attributes size, color and gender.
+
+Each process keeps a compact in-memory index (FacetIndex), maintained like the search index
+(bee.indexing.CatalogIndex). Filters become bitmaps (Python ints, one bit per product):
+within a facet the selected values are ORed, across facets ANDed, and each facet is counted
+against the other facets' filters only, so every value shows how many products selecting
+it would give. Unfiltered counts are kept running; filtered counts are C-level bit
+operations, so facets never GROUP BY products joined with variants.
+"""
+import threading
+import uuid
+from array import array
+from collections import Counter, defaultdict
+from functools import reduce
+from itertools import chain, compress
+from operator import and_, or_
+
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework import serializers
+
+from .indexing import CatalogIndex
+from .models import Brand, Category, Product, Variant, CATEGORY_PATH_SEGMENT_LENGTH
+
+FACETS = ('brand', 'category', 'size', 'color', 'gender')
+# One value per product: a column of value ids plus each value's documents
+SINGLE_FACETS = ('brand', 'category')
+# Several values per product (one per variant), few distinct values: a bitmap per value
+VARIANT_FACETS = ('size', 'color', 'gender')
+UUID_FACETS = ('brand', 'category')
+BITS = bytes.maketrans(b'01', b'\x00\x01')
+# Below one match in this many products, count by visiting the matches instead of the column
+SPARSE_RATIO = 16
+
+
+def bitmap(docs):
+    """
+    Int with the given bit positions set, built through a bytearray in one pass.
+    """
+    docs = list(docs)
+    if not docs:
+        return 0
+    bits = bytearray(max(docs) // 8 + 1)
+    for doc in docs:
+        bits[doc >> 3] |= 1 << (doc & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def selectors(mask):
+    """
+    One 0/1 byte per bit of mask, lowest first, for itertools.compress.
+    """
+    return bin(mask)[:1:-1].encode().translate(BITS)
+
+
+def set_bits(mask):
+    flags = selectors(mask)
+    position = flags.find(1)
+    while position >= 0:
+        yield position
+        position = flags.find(1, position + 1)
+
+
+class FacetIndex:
+    """
+    Thread-safe facet index over documents (key, {facet: iterable of values}).
+
+    Brand and category are columns (doc -> value id; a list, so compress() yields the stored
+    ints without boxing) with per-value document arrays; counting them under a filter tallies
+    the column through the filter bitmap in C (compress + Counter).
+    Variant attributes keep one bitmap per value and are counted with AND + bit_count().
+    Freed document numbers are reused.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.columns = {facet: [] for facet in SINGLE_FACETS}           # doc -> value id, -1 for none
+            self.value_ids = {facet: {} for facet in SINGLE_FACETS}        # value -> id
+            self.values = {facet: [] for facet in SINGLE_FACETS}           # id -> value
+            self.postings = {facet: {} for facet in SINGLE_FACETS}         # id -> array of docs
+            self.bitmaps = {facet: {} for facet in VARIANT_FACETS}         # value -> int
+            self.counts = {facet: {} for facet in VARIANT_FACETS}          # value -> documents
+            self.alive = 0
+            self.keys = []                                                 # doc -> key
+            self.docs = {}                                                 # key -> doc
+            self.variant_values = []                                       # doc -> ((facet, value), ...)
+            self.free = []
+            self._interned = {}
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _value_id(self, facet, value):
+        ids = self.value_ids[facet]
+        if value not in ids:
+            ids[value] = len(self.values[facet])
+            self.values[facet].append(value)
+            self.postings[facet][ids[value]] = array('I')
+        return ids[value]
+
+    def _variant_entries(self, values):
+        entries = tuple(sorted(
+            (facet, value) for facet in VARIANT_FACETS for value in set(values.get(facet, ())) if value not in (None, '')
+        ))
+        # Most products share a handful of variant combinations
+        return self._interned.setdefault(entries, entries)
+
+    def _allocate(self, key):
+        if self.free:
+            doc = self.free.pop()
+            self.keys[doc] = key
+        else:
+            doc = len(self.keys)
+            self.keys.append(key)
+            self.variant_values.append(())
+            for column in self.columns.values():
+                column.append(-1)
+        self.docs[key] = doc
+        return doc
+
+    def _set_columns(self, doc, values):
+        for facet in SINGLE_FACETS:
+            value = next((value for value in values.get(facet, ()) if value is not None), None)
+            if value is not None:
+                value_id = self._value_id(facet, value)
+                self.columns[facet][doc] = value_id
+                self.postings[facet][value_id].append(doc)
+
+    def load(self, documents):
+        with self._lock:
+            self.clear()
+            positions = defaultdict(list)
+            for key, values in documents:
+                doc = self._allocate(key)
+                self._set_columns(doc, values)
+                entries = self._variant_entries(values)
+                self.variant_values[doc] = entries
+                for entry in entries:
+                    positions[entry].append(doc)
+            for (facet, value), docs in positions.items():
+                self.bitmaps[facet][value] = bitmap(docs)
+                self.counts[facet][value] = len(docs)
+            self.alive = bitmap(range(len(self.keys)))
+
+    def add(self, key, values):
+        with self._lock:
+            self.remove(key)
+            doc = self._allocate(key)
+            self._set_columns(doc, values)
+            entries = self.variant_values[doc] = self._variant_entries(values)
+            bit = 1 << doc
+            for facet, value in entries:
+                self.bitmaps[facet][value] = self.bitmaps[facet].get(value, 0) | bit
+                self.counts[facet][value] = self.counts[facet].get(value, 0) + 1
+            self.alive |= bit
+
+    def remove(self, key):
+        with self._lock:
+            doc = self.docs.pop(key, None)
+            if doc is None:
+                return
+            for facet, column in self.columns.items():
+                if column[doc] >= 0:
+                    self.postings[facet][column[doc]].remove(doc)
+                    column[doc] = -1
+            mask = ~(1 << doc)
+            for facet, value in self.variant_values[doc]:
+                remaining = self.bitmaps[facet][value] & mask
+                if remaining:
+                    self.bitmaps[facet][value] = remaining
+                    self.counts[facet][value] -= 1
+                else:
+                    del self.bitmaps[facet][value]
+                    del self.counts[facet][value]
+            self.alive &= mask
+            self.keys[doc] = None
+            self.variant_values[doc] = ()
+            self.free.append(doc)
+
+    def _mask(self, facet, values):
+        if facet in SINGLE_FACETS:
+            ids = (self.value_ids[facet].get(value) for value in values)
+            return bitmap(chain.from_iterable(self.postings[facet][i] for i in ids if i is not None))
+        return reduce(or_, (self.bitmaps[facet].get(value, 0) for value in values), 0)
+
+    def _tally(self, facet, mask, matches):
+        column = self.columns[facet]
+        if matches * SPARSE_RATIO < len(column):
+            return Counter(map(column.__getitem__, set_bits(mask)))
+        return Counter(compress(column, selectors(mask)))
+
+    def _count(self, facet, base):
+        if facet in SINGLE_FACETS:
+            names = self.values[facet]
+            totals = Counter({i: len(docs) for i, docs in self.postings[facet].items() if docs})
+            if base is not None:
+                matches = base.bit_count()
+                if matches * 2 > len(self.docs):
+                    # Mostly matching: tally the products left out and subtract
+                    totals.subtract(self._tally(facet, self.alive & ~base, len(self.docs) - matches))
+                else:
+                    totals = self._tally(facet, base, matches)
+            return {names[i]: count for i, count in totals.items() if i >= 0 and count > 0}
+        if base is None:
+            return dict(self.counts[facet])
+        counts = {}
+        for value, value_bitmap in self.bitmaps[facet].items():
+            count = (value_bitmap & base).bit_count()
+            if count:
+                counts[value] = count
+        return counts
+
+    def facet_counts(self, filters):
+        """
+        (matching documents, {facet: {value: count}}) for {facet: set of values}.
+        """
+        with self._lock:
+            masks = {facet: self._mask(facet, values) for facet, values in filters.items()}
+
+            def within(excluded=None):
+                selected = [mask for facet, mask in masks.items() if facet != excluded]
+                return reduce(and_, selected) if selected else None
+
+            matching = within()
+            total = (self.alive if matching is None else matching).bit_count()
+            return total, {facet: self._count(facet, within(facet)) for facet in FACETS}
+
+
+def product_documents(products, variants):
+    """
+    (p_id, {facet: values}) for a product queryset and the variants belonging to it.
+    """
+    variant_values = defaultdict(lambda: defaultdict(set))
+    for product_id, *values in variants.order_by().values_list('product_id', *VARIANT_FACETS).iterator(chunk_size=5000):
+        for facet, value in zip(VARIANT_FACETS, values):
+            variant_values[product_id][facet].add(value)
+    for p_id, brand_id, c_id in products.order_by().values_list('p_id', 'brand_id', 'c_id').iterator(chunk_size=5000):
+        yield p_id, {'brand': (brand_id,), 'category': (c_id,), **variant_values.pop(p_id, {})}
+
+
+class ProductFacets(CatalogIndex):
+    sync_setting = 'FACET_INDEX_SYNC_SECONDS'
+    watermark_models = (Product, Variant)
+
+    def new_index(self):
+        return FacetIndex()
+
+    def load(self, index):
+        index.load(product_documents(Product.objects.all(), Variant.objects.all()))
+
+    def index_rows(self, queryset):
+        variants = Variant.objects.filter(product_id__in=queryset.values('pk'))
+        for key, values in product_documents(queryset, variants):
+            self.index.add(key, values)
+
+    def catch_up(self, since):
+        self.index_rows(Product.objects.filter(updated_at__gte=since))
+        self.index_rows(Product.objects.filter(
+            pk__in=Variant.objects.filter(updated_at__gte=since).values('product_id')
+        ))
+
+    def counts(self, filters):
+        self.sync()
+        return self.index.facet_counts(filters)
+
+
+product_facets = ProductFacets()
+
+
+# ---------------- REQUEST FILTERS ----------------
+def category_subtree_ids(category_ids):
+    paths = list(Category.objects.order_by().filter(pk__in=category_ids).values_list('path', flat=True))
+    if not paths:
+        return set()
+    subtree = reduce(or_, (Q(path__startswith=path) for path in paths))
+    return set(Category.objects.order_by().filter(subtree).values_list('pk', flat=True))
+
+
+def parse_filters(params):
+    """
+    {facet: set of values} from ?brand=&category=&size=&color=&gender= (comma-separated,
+    any of the values matches). A category also matches its subcategories.
+    Raises ValidationError for malformed ids.
+    """
+    filters = {}
+    for facet in FACETS:
+        values = {value.strip() for value in params.get(facet, '').split(',') if value.strip()}
+        if not values:
+            continue
+        if facet in UUID_FACETS:
+            try:
+                values = {uuid.UUID(value) for value in values}
+            except ValueError:
+                raise serializers.ValidationError({facet: "Expected comma-separated ids."})
+        filters[facet] = values
+    if 'category' in filters:
+        filters['category'] = category_subtree_ids(filters['category'])
+    return filters
+
+
+def filter_products(queryset, filters):
+    """
+    Applies parse_filters() output to a Product queryset, with the same semantics as the bitmaps.
+    """
+    if 'brand' in filters:
+        queryset = queryset.filter(brand_id__in=filters['brand'])
+    if 'category' in filters:
+        queryset = queryset.filter(c_id__in=filters['category'])
+    for facet in VARIANT_FACETS:
+        if facet in filters:
+            variants = Variant.objects.filter(product_id=OuterRef('pk'), **{f"{facet}__in": filters[facet]})
+            queryset = queryset.filter(Exists(variants))
+    return queryset
+
+
+def rollup_categories(counts):
+    """
+    Adds each category's count to its ancestors, so a category counts its whole subtree.
+    """
+    rolled = defaultdict(int)
+    paths = Category.objects.order_by().filter(pk__in=counts).values_list('pk', 'path')
+    for c_id, path in paths:
+        for start in range(0, len(path), CATEGORY_PATH_SEGMENT_LENGTH):
+            rolled[uuid.UUID(path[start:start + CATEGORY_PATH_SEGMENT_LENGTH - 1])] += counts[c_id]
+    return rolled
+
+
+def facet_summary(filters, limit):
+    """
+    Response body for the facets endpoint: matching total and the top `limit` values per facet.
+    """
+    total, counts = product_facets.counts(filters)
+    counts['category'] = rollup_categories(counts['category'])
+
+    top = {
+        facet: sorted(values.items(), key=lambda item: (-item[1], str(item[0])))[:limit]
+        for facet, values in counts.items()
+    }
+    labels = {
+        'brand': dict(Brand.objects.order_by().filter(pk__in=[value for value, _ in top['brand']]).values_list('pk', 'name')),
+        'category': dict(Category.objects.order_by().filter(pk__in=[value for value, _ in top['category']]).values_list('pk', 'c_name')),
+    }
+    return {
+        "total": total,
+        "facets": {
+            facet: [
+                {"value": str(value), "label": labels[facet].get(value) if facet in labels else value, "count": count}
+                for value, count in values
+            ]
+            for facet, values in top.items()
+        },
+    }
+
+
+@receiver(post_save, sender=Product)
+def index_product_facets(sender, instance, **kwargs):
+    product_facets.reindex(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_init, sender=Variant)
+def remember_variant_product(sender, instance, **kwargs):
+    # A save can move the variant to another product; both products need reindexing.
+    # Read from __dict__ so a deferred product_id is not fetched for every loaded variant
+    instance._facet_product_id = instance.__dict__.get('product_id_id')
+
+
+@receiver(post_save, sender=Variant)
+def index_variant_facets(sender, instance, **kwargs):
+    product_ids = {instance.product_id_id, instance._facet_product_id} - {None}
+    if len(product_ids) > 1:
+        # Other processes catch up by updated_at; the product the variant left has no other trace
+        Product.objects.filter(pk__in=product_ids).update(updated_at=timezone.now())
+    product_facets.reindex(Product.objects.filter(pk__in=product_ids))
+    instance._facet_product_id = instance.product_id_id
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_facets(sender, instance, **kwargs):
+    product_facets.index.remove(instance.pk)
+
+
+@receiver(post_delete, sender=Variant)
+def unindex_variant_facets(sender, instance, **kwargs):
+    product_facets.reindex(Product.objects.filter(pk=instance.product_id_id))
+
+
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Category)
+def reindex_detached_product_facets(sender, instance, **kwargs):
+    # Collected and stamped for other processes by bee.models.touch_detached_products
+    product_facets.reindex(Product.objects.filter(pk__in=getattr(instance, '_detached_products', [])))
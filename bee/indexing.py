@@ -0,0 +1,171 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import ProductTombstone
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogIndex:
+    """
+    Per-process in-memory index over catalog rows (see bee.search, bee.facets), keyed by
+    product id in `self.index`.
+
+    start() (called for every index when the WSGI/ASGI application loads) builds it on a
+    background thread and rebuilds it there every CATALOG_INDEX_RECONCILE_SECONDS into a
+    fresh index that replaces the old one, so requests keep reading while it loads. That
+    rebuild bounds anything catch-up cannot see (raw SQL, longer transactions). A process
+    that was not started builds on first use, once, however many requests arrive together.
+
+    Signals in this process apply writes immediately; writes made elsewhere are picked up
+    by sync(), which at most every `sync_setting` seconds calls catch_up(since) and drops
+    products with a ProductTombstone since then. The watermark is the newest updated_at of
+    `watermark_models` (and newest tombstone) the database held at the previous sync, never
+    this process's clock, and `since` reaches CATALOG_INDEX_SYNC_OVERLAP_SECONDS further
+    back: a row stamped before the watermark but committed after it is still caught when
+    its transaction took less than the overlap. Changes that leave no updated_at behind
+    stamp the products they affect (bee.models).
+    """
+    sync_setting = None
+    watermark_models = ()
+
+    def __init__(self):
+        self.ready = False
+        self.watermark = None
+        self.last_sync = 0.0
+        self.index = self.new_index()
+        self._build_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def new_index(self):
+        raise NotImplementedError
+
+    def load(self, index):
+        raise NotImplementedError
+
+    def index_rows(self, queryset):
+        raise NotImplementedError
+
+    def catch_up(self, since):
+        raise NotImplementedError
+
+    def high_water(self):
+        stamps = [model.objects.order_by().aggregate(stamp=Max('updated_at'))['stamp'] for model in self.watermark_models]
+        stamps.append(ProductTombstone.objects.order_by().aggregate(stamp=Max('deleted_at'))['stamp'])
+        stamps = [stamp for stamp in stamps if stamp is not None]
+        return max(stamps) if stamps else None
+
+    def _rebuild(self):
+        # Read before loading: anything committed after it is loaded or caught up next time
+        watermark = self.high_water()
+        index = self.new_index()
+        self.load(index)
+        self.index, self.watermark = index, watermark
+        self.last_sync = time.monotonic()
+        self.ready = True
+
+    def _catch_up(self):
+        high_water = self.high_water()
+        self.last_sync = time.monotonic()
+        if self.watermark is None:
+            # Empty when built: nothing to fall back on but a full load
+            self._rebuild()
+            return
+        since = self.watermark - timedelta(seconds=settings.CATALOG_INDEX_SYNC_OVERLAP_SECONDS)
+        self.catch_up(since)
+        for key in ProductTombstone.objects.filter(deleted_at__gte=since).values_list('p_id', flat=True):
+            self.index.remove(key)
+        if high_water is not None:
+            self.watermark = max(self.watermark, high_water)
+
+    def build(self):
+        """
+        Loads the index unless another thread already has while this one waited.
+        """
+        with self._build_lock:
+            if not self.ready:
+                self._rebuild()
+
+    def reconcile(self):
+        """
+        Rebuilds the index from scratch.
+        """
+        with self._build_lock:
+            self._rebuild()
+
+    def start(self):
+        """
+        Starts the background thread that builds the index and reconciles it periodically.
+        """
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"{type(self).__name__}-reconcile", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        rebuild = self.build
+        while True:
+            try:
+                rebuild()
+                rebuild = self.reconcile
+            except Exception:
+                logger.exception("%s: index build failed", type(self).__name__)
+            finally:
+                # Connections are per thread; do not hold one open between rebuilds
+                connections.close_all()
+            # A failed first build is retried soon, rebuilds follow the reconcile period
+            time.sleep(settings.CATALOG_INDEX_RECONCILE_SECONDS if self.ready else 5)
+
+    def sync(self):
+        """
+        Builds the index if needed, then catches up with writes made outside this process.
+        """
+        if not self.ready:
+            self.build()
+            self.start()
+            return
+        interval = getattr(settings, self.sync_setting, 5)
+        if time.monotonic() - self.last_sync < interval or not self._build_lock.acquire(blocking=False):
+            return
+        try:
+            self._catch_up()
+        finally:
+            self._build_lock.release()
+
+    def reindex(self, queryset):
+        if self.ready:
+            self.index_rows(queryset.order_by())
+
+
+def start_catalog_indexes():
+    """
+    Builds the search and facet indexes in the background as the application loads.
+    """
+    if getattr(settings, 'CATALOG_INDEX_WARM_ON_START', True):
+        from .facets import product_facets
+        from .search import product_search
+        for catalog_index in (product_search, product_facets):
+            catalog_index.start()
+
+
+def sweep_tombstones(batch_size=1000):
+    """
+    Deletes one batch of tombstones no index can still need: every index rebuilds within
+    CATALOG_INDEX_RECONCILE_SECONDS, so twice that is kept. Returns the number deleted.
+    """
+    cutoff = timezone.now() - timedelta(seconds=2 * settings.CATALOG_INDEX_RECONCILE_SECONDS)
+    ids = list(
+        ProductTombstone.objects.filter(deleted_at__lt=cutoff).order_by('deleted_at').values_list('pk', flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0
+    deleted, _ = ProductTombstone.objects.filter(pk__in=ids).delete()
+    return deleted
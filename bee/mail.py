@@ -0,0 +1,121 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def queue_email(subject, message, recipient, from_email=None):
+    """
+    Stores the email in the outbox; the send_queued_emails worker delivers it.
+    """
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        to_email=recipient,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_SECONDS', 30)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def claim_emails(batch_size):
+    """
+    Leases up to batch_size due emails to this worker in one short transaction and returns them.
+    Claimed rows are 'sending' until their lease (next_attempt_at) runs out; a worker that dies
+    mid-batch leaves them to be claimed again then. Every claim counts as an attempt, so a row
+    whose lease ran out after its last allowed attempt is marked failed instead.
+    """
+    lease = timedelta(seconds=getattr(settings, 'EMAIL_OUTBOX_LEASE_SECONDS', 300))
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    with transaction.atomic():
+        now = timezone.now()
+        due = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        batch = []
+        for email in due:
+            if email.status == 'sending' and email.attempts >= max_attempts:
+                email.status = 'failed'
+                email.last_error = f"lease expired after {email.attempts} attempts"
+            else:
+                email.status = 'sending'
+                email.attempts += 1
+                email.next_attempt_at = now + lease
+                batch.append(email)
+            email.updated_at = now
+        OutboundEmail.objects.bulk_update(due, ['status', 'attempts', 'next_attempt_at', 'last_error', 'updated_at'])
+    return batch
+
+
+def record_result(email, error=None):
+    """
+    Stores the outcome of one send, unless the lease ran out and another worker took the row.
+    """
+    now = timezone.now()
+    if error is None:
+        changes = {'status': 'sent', 'sent_at': now, 'last_error': None}
+    elif email.attempts >= getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5):
+        changes = {'status': 'failed', 'last_error': str(error)}
+    else:
+        changes = {'status': 'pending', 'next_attempt_at': now + retry_delay(email.attempts), 'last_error': str(error)}
+    return OutboundEmail.objects.filter(
+        pk=email.pk, status='sending', next_attempt_at=email.next_attempt_at,
+    ).update(updated_at=now, **changes)
+
+
+def deliver_queued_emails(batch_size=100):
+    """
+    Sends one batch of due outbox emails over a reused SMTP connection.
+    Rows are claimed up front (see claim_emails) and no lock is held while talking to the
+    mail server; each result is written as soon as that email is done. A connection that
+    drops mid-batch is reopened for the next email. Returns (sent, failed) counts.
+    """
+    sent = failed = 0
+    batch = claim_emails(batch_size)
+    connection = None
+    connect_error = None
+    try:
+        for email in batch:
+            error = None
+            if connection is None and connect_error is None:
+                connection = get_connection(fail_silently=False)
+                try:
+                    connection.open()
+                except Exception as e:
+                    logger.warning("Email outbox: could not connect to mail server: %s", e)
+                    connection, connect_error = None, e
+            try:
+                if connection is None:
+                    raise ConnectionError(f"mail server unavailable: {connect_error}")
+                EmailMessage(
+                    email.subject, email.body, email.from_email, [email.to_email], connection=connection
+                ).send()
+            except Exception as e:
+                error = e
+                failed += 1
+                if connection is not None:
+                    # The connection may be dead; start the next email on a new one
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+                    connection = None
+            else:
+                sent += 1
+            record_result(email, error)
+    finally:
+        if connection is not None:
+            connection.close()
+    return sent, failed
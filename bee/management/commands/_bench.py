@@ -0,0 +1,53 @@
+"""
+Shared helpers for the bench_* management commands.
+"""
+import json
+import statistics
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(func, iterations):
+    """
+    Calls func() `iterations` times and returns latency and query stats.
+    """
+    samples = []
+    with CaptureQueriesContext(connection) as ctx:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples, queries=len(ctx.captured_queries))
+
+
+def summarize(samples, queries=None):
+    result = {
+        "iterations": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 4) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50), 4),
+        "p95_ms": round(percentile(samples, 95), 4),
+        "p99_ms": round(percentile(samples, 99), 4),
+    }
+    if queries is not None:
+        result["queries"] = queries
+        result["queries_per_call"] = round(queries / len(samples), 3) if samples else 0.0
+    return result
+
+
+def report(command, results, as_json=False):
+    if as_json:
+        command.stdout.write(json.dumps(results, indent=2, default=str))
+        return
+    for name, stats in results.items():
+        line = ", ".join(f"{key}={value}" for key, value in stats.items())
+        command.stdout.write(f"{name}: {line}")
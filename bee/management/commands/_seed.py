@@ -0,0 +1,125 @@
+"""
+Deterministic synthetic catalog for the bench_* commands. The same --seed and sizes
+always produce the same names, tree shape, prices and stock levels, so runs on different
+commits measure the same data. Rows are tagged with a run id so they can be removed.
+"""
+import random
+import uuid
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from bee.availability import refresh_availability
+from bee.models import Brand, Category, Inventory, Product, Variant, Warehouse
+from bee.response_cache import invalidate
+
+ADJECTIVES = ["classic", "slim", "rugged", "premium", "everyday", "vintage", "sport", "compact", "organic", "wireless"]
+MATERIALS = ["cotton", "leather", "steel", "bamboo", "wool", "denim", "ceramic", "linen", "carbon", "canvas"]
+NOUNS = ["shirt", "jacket", "backpack", "kettle", "headphones", "sneakers", "watch", "lamp", "mug", "wallet",
+         "blender", "jeans", "scarf", "speaker", "bottle"]
+SIZES = ["XS", "S", "M", "L", "XL"]
+COLORS = ["black", "white", "red", "blue", "green", "grey", "navy", "beige"]
+GENDERS = ["men", "women", "unisex"]
+WAREHOUSE_TYPES = ["main", "store", "distribution"]
+
+
+@dataclass
+class CatalogSizes:
+    categories: int = 50
+    brands: int = 20
+    products: int = 2000
+    variants: int = 3
+    warehouses: int = 5
+    stocked_warehouses: int = 2
+
+
+@dataclass
+class SeededCatalog:
+    run: str
+    categories: list = field(default_factory=list)
+    brands: list = field(default_factory=list)
+    products: list = field(default_factory=list)
+    warehouses: list = field(default_factory=list)
+
+    def delete(self):
+        Product.objects.filter(pk__in=self.products).delete()
+        Category.objects.filter(pk__in=self.categories).delete()
+        Brand.objects.filter(pk__in=self.brands).delete()
+        Warehouse.objects.filter(pk__in=self.warehouses).delete()
+        invalidate('categories', 'brands', 'products')
+
+
+def product_name(rng):
+    return f"{rng.choice(ADJECTIVES)} {rng.choice(MATERIALS)} {rng.choice(NOUNS)}".title()
+
+
+def seed_catalog(sizes, seed=42, batch_size=2000):
+    """
+    Bulk-inserts a catalog: a two-level category tree, brands, products spread over both,
+    variants per product and stock for each product in a few warehouses.
+    """
+    rng = random.Random(seed)
+    run = uuid.uuid4().hex[:8]
+    catalog = SeededCatalog(run=run)
+
+    # bulk_create skips Category.save(), so materialized paths are built here
+    roots = max(1, sizes.categories // 5)
+    categories = []
+    for i in range(sizes.categories):
+        c_id = uuid.uuid4()
+        parent = categories[rng.randrange(roots)] if i >= roots else None
+        path = f"{parent.path if parent else ''}{c_id.hex}/"
+        categories.append(Category(c_id=c_id, c_name=f"Category {i}", parent_category=parent, path=path))
+    Category.objects.bulk_create(categories, batch_size=batch_size)
+    catalog.categories = [category.pk for category in categories]
+
+    brands = Brand.objects.bulk_create(
+        [Brand(name=f"Brand {i}") for i in range(sizes.brands)], batch_size=batch_size
+    )
+    catalog.brands = [brand.pk for brand in brands]
+
+    warehouses = Warehouse.objects.bulk_create(
+        [Warehouse(name=f"Warehouse {i}", address=f"Dock {i}", type=WAREHOUSE_TYPES[i % len(WAREHOUSE_TYPES)])
+         for i in range(sizes.warehouses)],
+        batch_size=batch_size,
+    )
+    catalog.warehouses = [warehouse.pk for warehouse in warehouses]
+
+    products = Product.objects.bulk_create(
+        [
+            Product(
+                p_name=product_name(rng),
+                sku_name=f"bench-{run}-{i}",
+                c_id=rng.choice(categories) if categories else None,
+                brand_id=rng.choice(brands) if brands else None,
+            )
+            for i in range(sizes.products)
+        ],
+        batch_size=batch_size,
+    )
+    catalog.products = [product.pk for product in products]
+
+    Variant.objects.bulk_create(
+        (
+            Variant(product_id=product, size=rng.choice(SIZES), color=rng.choice(COLORS), gender=rng.choice(GENDERS))
+            for product in products
+            for _ in range(sizes.variants)
+        ),
+        batch_size=batch_size,
+    )
+
+    stocked = min(sizes.stocked_warehouses, len(warehouses))
+    inventory = []
+    for product in products:
+        for warehouse in rng.sample(warehouses, stocked):
+            price = Decimal(rng.randrange(199, 99999)) / 100
+            inventory.append(Inventory(
+                product_id=product, warehouse_id=warehouse, actual_price=price, price=price,
+                quantity_available=rng.randrange(0, 200),
+            ))
+    Inventory.objects.bulk_create(inventory, batch_size=batch_size)
+
+    # bulk_create skips the signals that keep these in step
+    for start in range(0, len(catalog.products), 500):
+        refresh_availability(catalog.products[start:start + 500])
+    invalidate('categories', 'brands', 'products')
+    return catalog
@@ -0,0 +1,213 @@
+import json
+import platform
+import queue
+import random
+import subprocess
+import threading
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ._bench import percentile, summarize
+from ._seed import COLORS, MATERIALS, SIZES, CatalogSizes, seed_catalog
+
+# name: path builder(catalog, rng). Paths are the real routes from bee/urls.py.
+SCENARIOS = {
+    'products_list': lambda catalog, rng: '/api/products/',
+    'products_list_expand': lambda catalog, rng: '/api/products/?expand=c_id,brand_id',
+    'product_detail': lambda catalog, rng: f'/api/products/{rng.choice(catalog.products)}/',
+    'products_filtered': lambda catalog, rng: f'/api/products/?color={rng.choice(COLORS)}&size={rng.choice(SIZES)}',
+    'products_facets': lambda catalog, rng: f'/api/products/facets?brand={rng.choice(catalog.brands)}',
+    'products_search': lambda catalog, rng: f'/api/products/search?q={rng.choice(MATERIALS)}',
+    'categories_list': lambda catalog, rng: '/api/categories',
+    'category_tree': lambda catalog, rng: f'/api/categories/{rng.choice(catalog.categories)}/tree',
+    'brands_list': lambda catalog, rng: '/api/brands',
+    'variants_list': lambda catalog, rng: '/api/variants/',
+    'inventories_list': lambda catalog, rng: '/api/inventories/',
+    'warehouses_list': lambda catalog, rng: '/api/warehouses/',
+}
+
+
+def git_revision():
+    def git(*args):
+        try:
+            return subprocess.run(
+                ['git', *args], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=10,
+            ).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ''
+    return {"commit": git('rev-parse', 'HEAD') or None, "dirty": bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+
+def drive(paths, concurrency, query_log=None):
+    """
+    Sends every path through django.test.Client (full middleware and URL routing) from
+    `concurrency` threads. Returns (latencies in ms, queries per request, error count, seconds).
+    Executed SQL is counted into query_log ({sql: executions}) when one is given.
+    """
+    work = queue.Queue()
+    for path in paths:
+        work.put(path)
+    latencies, queries = [], []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker():
+        client = Client()
+        try:
+            while True:
+                try:
+                    path = work.get_nowait()
+                except queue.Empty:
+                    return
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    response = client.get(path)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    queries.append(len(ctx.captured_queries))
+                    if query_log is not None:
+                        for query in ctx.captured_queries:
+                            query_log[query['sql']] = query_log.get(query['sql'], 0) + 1
+                    if response.status_code >= 400:
+                        errors[0] += 1
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, queries, errors[0], time.perf_counter() - start
+
+
+def compare(results, baseline):
+    """
+    Relative change against a previous bench_api JSON, per scenario: positive is slower
+    latency / higher throughput.
+    """
+    deltas = {}
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        deltas[name] = {
+            key: round((current[key] - previous[key]) / previous[key] * 100, 1) if previous[key] else None
+            for key in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request')
+        }
+    return deltas
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a deterministic synthetic catalog, drives the bee API routes with a concurrent "
+        "client and prints throughput, latency percentiles and queries per request as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=50)
+        parser.add_argument('--brands', type=int, default=20)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--variants', type=int, default=3, help="Variants per product.")
+        parser.add_argument('--warehouses', type=int, default=5)
+        parser.add_argument('--stocked-warehouses', type=int, default=2, help="Warehouses holding each product.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--requests', type=int, default=300, help="Requests per scenario and concurrency level.")
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+        parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS))
+        parser.add_argument('--cold', action='store_true',
+                            help="Add a unique query parameter to every request so response caches and ETags never hit.")
+        parser.add_argument('--output', help="Also write the JSON report to this file.")
+        parser.add_argument('--compare', help="Previous bench_api JSON report to compute relative changes against.")
+        parser.add_argument('--keep', action='store_true', help="Leave the seeded catalog in the database.")
+        parser.add_argument('--query-log',
+                            help="Write the executed SQL as JSON lines for explain_queries (use with --cold and --keep).")
+
+    def handle(self, *args, **options):
+        sizes = CatalogSizes(
+            categories=options['categories'], brands=options['brands'], products=options['products'],
+            variants=options['variants'], warehouses=options['warehouses'],
+            stocked_warehouses=options['stocked_warehouses'],
+        )
+        seed_start = time.perf_counter()
+        catalog = seed_catalog(sizes, seed=options['seed'])
+        seed_seconds = time.perf_counter() - seed_start
+
+        results = {}
+        query_logs = {}
+        try:
+            for name in options['scenarios']:
+                rng = random.Random(f"{options['seed']}:{name}")
+                build = SCENARIOS[name]
+                for concurrency in options['concurrency']:
+                    paths = [build(catalog, rng) for _ in range(options['requests'])]
+                    if options['cold']:
+                        paths = [f"{path}{'&' if '?' in path else '?'}_bench={i}" for i, path in enumerate(paths)]
+                    drive([build(catalog, rng) for _ in range(options['warmup'])], concurrency)
+                    query_log = query_logs.setdefault(name, {}) if options['query_log'] else None
+                    latencies, queries, errors, seconds = drive(paths, concurrency, query_log)
+                    stats = summarize(latencies)
+                    results[f"{name}@{concurrency}"] = {
+                        "scenario": name,
+                        "concurrency": concurrency,
+                        "requests": len(latencies),
+                        "errors": errors,
+                        "throughput_rps": round(len(latencies) / seconds, 1),
+                        "mean_ms": stats["mean_ms"],
+                        "p50_ms": stats["p50_ms"],
+                        "p95_ms": stats["p95_ms"],
+                        "p99_ms": stats["p99_ms"],
+                        "max_ms": round(max(latencies), 4) if latencies else 0.0,
+                        "queries_per_request": round(sum(queries) / len(queries), 3) if queries else 0.0,
+                        "max_queries": max(queries) if queries else 0,
+                    }
+        finally:
+            if not options['keep']:
+                catalog.delete()
+
+        report = {
+            "meta": {
+                "git": git_revision(),
+                "timestamp": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "settings": {
+                    "CONN_MAX_AGE": settings.DATABASES['default'].get('CONN_MAX_AGE'),
+                    "ASYNC_CATALOG_READS": getattr(settings, 'ASYNC_CATALOG_READS', False),
+                    "CATALOG_CACHE_BACKEND": getattr(settings, 'CATALOG_CACHE_BACKEND', None),
+                    "API_PAGE_SIZE": getattr(settings, 'API_PAGE_SIZE', None),
+                },
+                "dataset": {**vars(sizes), "seed": options['seed'], "seed_seconds": round(seed_seconds, 3)},
+                "requests": options['requests'],
+                "cold": options['cold'],
+            },
+            "results": results,
+        }
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                report["comparison"] = compare(results, json.load(baseline))
+
+        if options['query_log']:
+            with open(options['query_log'], 'w') as handle:
+                for name, query_log in query_logs.items():
+                    for sql, count in query_log.items():
+                        handle.write(json.dumps({"scenario": name, "sql": sql, "count": count}) + '\n')
+
+        output = json.dumps(report, indent=2, default=str)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        self.stdout.write(output)
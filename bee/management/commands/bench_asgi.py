@@ -0,0 +1,67 @@
+import asyncio
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+from django.test import AsyncRequestFactory
+
+from bee import async_views
+from bee.models import Product
+from bee.views import ProductListCreateAPIView
+
+from ._bench import percentile, report
+
+
+async def drive(handler, requests, concurrency, page_size):
+    factory = AsyncRequestFactory()
+    gate = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def one():
+        async with gate:
+            start = time.perf_counter()
+            response = await handler(factory.get('/api/products/', {'page_size': page_size}))
+            assert response.status_code == 200, response.status_code
+            samples.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests_per_sec": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+    }
+
+
+class Command(BaseCommand):
+    help = "Load-tests the product list under ASGI: native async view vs the sync DRF view hopped to a thread."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50])
+        parser.add_argument('--rows', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        run = uuid.uuid4().hex[:8]
+        # Committed (and removed afterwards) so the async ORM threads can see the rows.
+        Product.objects.bulk_create(
+            Product(p_name=f"Bench product {i}", sku_name=f"bench-{run}-{i}") for i in range(options['rows'])
+        )
+        thread_hop = sync_to_async(ProductListCreateAPIView.as_view())
+        results = {}
+        try:
+            for concurrency in options['concurrency']:
+                results[f"async@{concurrency}"] = asyncio.run(drive(
+                    async_views.product_list, options['requests'], concurrency, options['page_size']
+                ))
+                results[f"thread_hop@{concurrency}"] = asyncio.run(drive(
+                    thread_hop, options['requests'], concurrency, options['page_size']
+                ))
+        finally:
+            Product.objects.filter(sku_name__startswith=f"bench-{run}-").delete()
+        report(self, results, options['json'])
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+
+from bee.auth import CookieJWTAuthentication, _user_cache
+from bee.models import Role, User
+from bee.serializers import LoginSerializer
+from bee.utils import _admin_cache, is_admin_from_token
+
+from ._bench import measure, report
+
+
+class Command(BaseCommand):
+    help = "Compares DB, cached and stateless JWT authentication and admin checks (queries and latency per request)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        with transaction.atomic():
+            role, _ = Role.objects.get_or_create(name='user')
+            user = User.objects.create(
+                username='bench-auth@example.com',
+                email='bench-auth@example.com',
+                full_name='Bench Auth',
+                role=role,
+            )
+            user.set_password('bench-password')
+            user.save()
+
+            login = LoginSerializer(data={'email': user.email, 'password': 'bench-password'})
+            login.is_valid(raise_exception=True)
+
+            request = RequestFactory().get('/api/categories')
+            request.COOKIES['access_token'] = login.validated_data['access']
+            auth = CookieJWTAuthentication()
+
+            def uncached():
+                _user_cache.clear()
+                auth.authenticate(request)
+
+            results = {'db': measure(uncached, iterations)}
+            _user_cache.clear()
+            results['cached'] = measure(lambda: auth.authenticate(request), iterations)
+            with override_settings(JWT_STATELESS_AUTH=True):
+                results['stateless'] = measure(lambda: auth.authenticate(request), iterations)
+
+            access = login.validated_data['access']
+
+            def uncached_admin_check():
+                _admin_cache.clear()
+                is_admin_from_token(access)
+
+            results['admin_check_db'] = measure(uncached_admin_check, iterations)
+            _admin_cache.clear()
+            results['admin_check_cached'] = measure(lambda: is_admin_from_token(access), iterations)
+
+            transaction.set_rollback(True)
+
+        _user_cache.clear()
+        _admin_cache.clear()
+        report(self, results, options['json'])
@@ -0,0 +1,88 @@
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from bee.tokens import issue_tokens
+
+from bee.views import ProductBulkAPIView, ProductListCreateAPIView
+
+from ._bench import report
+
+
+def post_rows(view, factory, path, rows, token):
+    request = factory.post(
+        path, data=json.dumps(rows), content_type='application/json',
+        HTTP_AUTHORIZATION=f"Bearer {token}",
+    )
+    response = view(request)
+    assert response.status_code == 201, (response.status_code, response.content[:500])
+
+
+def timed(func):
+    with CaptureQueriesContext(connection) as ctx:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+    return elapsed, len(ctx.captured_queries)
+
+
+class Command(BaseCommand):
+    help = "Measures product ingest throughput: bulk create/upsert endpoint vs one POST per row."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+        parser.add_argument('--per-row-sample', type=int, default=500,
+                            help="Rows posted one by one; the per-row rate is extrapolated from these.")
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        bulk_view = ProductBulkAPIView.as_view()
+        single_view = ProductListCreateAPIView.as_view()
+        batch = settings.BULK_MAX_ROWS
+        results = {}
+
+        with transaction.atomic():
+            run = uuid.uuid4().hex[:8]
+            admin = get_user_model().objects.create(
+                username=f"bench-{run}", email=f"bench-{run}@example.com", is_superuser=True, is_active=True,
+            )
+            token, _ = issue_tokens(admin)
+
+            sample = [{"p_name": f"Single {i}", "sku_name": f"single-{run}-{i}"} for i in range(options['per_row_sample'])]
+            elapsed, queries = timed(lambda: [
+                post_rows(single_view, factory, '/api/products/', row, token) for row in sample
+            ])
+            results["per_row"] = {
+                "rows": len(sample),
+                "rows_per_sec": round(len(sample) / elapsed, 1),
+                "queries_per_row": round(queries / len(sample), 2),
+            }
+
+            for count in options['rows']:
+                rows = [{"p_name": f"Bulk {i}", "sku_name": f"bulk-{run}-{count}-{i}"} for i in range(count)]
+                for mode in ('create', 'upsert'):
+                    # upsert runs second, so every row hits the conflict/update path
+                    path = f'/api/products/bulk?mode={mode}'
+                    elapsed, queries = timed(lambda: [
+                        post_rows(bulk_view, factory, path, rows[i:i + batch], token)
+                        for i in range(0, count, batch)
+                    ])
+                    results[f"bulk_{mode}@{count}"] = {
+                        "rows": count,
+                        "batch_size": batch,
+                        "seconds": round(elapsed, 3),
+                        "rows_per_sec": round(count / elapsed, 1),
+                        "queries_per_row": round(queries / count, 4),
+                        "speedup_vs_per_row": round((count / elapsed) / results["per_row"]["rows_per_sec"], 1),
+                    }
+
+            transaction.set_rollback(True)
+
+        report(self, results, options['json'])
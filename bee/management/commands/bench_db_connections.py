@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+from bee.dbmetrics import connection_stats, reset_connection_stats
+from bee.models import Category
+
+from ._bench import report, summarize
+
+
+class Command(BaseCommand):
+    help = "Compares connect-per-request (CONN_MAX_AGE=0) with persistent connection reuse on the configured database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--json', action='store_true')
+
+    def simulate(self, requests, max_age):
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        reset_connection_stats()
+        samples = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            request_started.send(sender=self.__class__)
+            Category.objects.exists()
+            request_finished.send(sender=self.__class__)
+            samples.append((time.perf_counter() - start) * 1000)
+        return {**summarize(samples), **connection_stats()}
+
+    def handle(self, *args, **options):
+        original = connection.settings_dict['CONN_MAX_AGE']
+        try:
+            results = {
+                'connect_per_request': self.simulate(options['requests'], 0),
+                'persistent': self.simulate(options['requests'], None),
+            }
+        finally:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = original
+        report(self, results, options['json'])
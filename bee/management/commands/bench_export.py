@@ -0,0 +1,57 @@
+import time
+import tracemalloc
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from bee.models import Product
+from bee.serializers import ProductSerializer
+from bee.streaming import stream_rows
+
+from ._bench import report
+
+
+def profile(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = func()
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"elapsed_ms": round(elapsed, 2), "peak_kib": round(peak / 1024, 1), "bytes": size}
+
+
+class Command(BaseCommand):
+    help = "Compares peak memory of the buffered product list with the ?stream=ndjson export."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 50000])
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        results = {}
+        for rows in options['rows']:
+            with transaction.atomic():
+                run = uuid.uuid4().hex[:8]
+                Product.objects.bulk_create(
+                    (Product(p_name=f"Bench product {i}", sku_name=f"bench-{run}-{i}") for i in range(rows)),
+                    batch_size=5000,
+                )
+
+                def buffered():
+                    data = ProductSerializer(Product.objects.all(), many=True).data
+                    return len(JSONRenderer().render(data))
+
+                def streamed():
+                    return sum(len(part) for part in stream_rows(
+                        Product.objects.all(), ProductSerializer, 'ndjson', options['chunk_size']
+                    ))
+
+                results[f"buffered@{rows}"] = profile(buffered)
+                results[f"stream@{rows}"] = profile(streamed)
+                transaction.set_rollback(True)
+
+        report(self, results, options['json'])
@@ -0,0 +1,80 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from bee.facets import FacetIndex
+
+from ._bench import summarize, report
+
+SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL', '38', '40', '42', '44']
+COLORS = ['black', 'white', 'red', 'blue', 'green', 'navy', 'grey', 'beige', 'brown', 'pink',
+          'olive', 'maroon', 'teal', 'orange', 'yellow', 'purple', 'khaki', 'cream', 'tan', 'gold']
+GENDERS = ['men', 'women', 'unisex', 'kids']
+BRANDS = 500
+CATEGORIES = 2000
+
+FILTERS = {
+    "none": {},
+    "color": {'color': {'red'}},
+    "brand+size": {'brand': {7, 8, 9}, 'size': {'M', 'L'}},
+    "category+color+gender": {'category': set(range(40)), 'color': {'black', 'navy'}, 'gender': {'women'}},
+}
+
+
+def synthetic_values(rng, i):
+    variants = rng.randint(1, 4)
+    return {
+        'brand': (i % BRANDS,),
+        'category': (i % CATEGORIES,),
+        'size': [rng.choice(SIZES) for _ in range(variants)],
+        'color': [rng.choice(COLORS) for _ in range(variants)],
+        'gender': [rng.choice(GENDERS)],
+    }
+
+
+class Command(BaseCommand):
+    help = "Builds the product facet bitmaps over synthetic products and measures build time, memory and count latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--docs', type=int, nargs='+', default=[10000, 100000, 1000000])
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--memory', action='store_true', help="Trace index memory (slows the build down).")
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        results = {}
+        for count in options['docs']:
+            rng = random.Random(options['seed'])
+            documents = [(i, synthetic_values(rng, i)) for i in range(count)]
+            index = FacetIndex()
+            if options['memory']:
+                tracemalloc.start()
+            start = time.perf_counter()
+            index.load(documents)
+            build = {
+                "docs": count,
+                "seconds": round(time.perf_counter() - start, 3),
+                "values": sum(map(len, index.bitmaps.values())) + sum(map(len, index.value_ids.values())),
+            }
+            if options['memory']:
+                build["traced_mb"] = round(tracemalloc.get_traced_memory()[0] / 2 ** 20, 1)
+                tracemalloc.stop()
+            results[f"build@{count}"] = build
+            del documents
+
+            for name, filters in FILTERS.items():
+                samples = []
+                for _ in range(options['iterations']):
+                    start = time.perf_counter()
+                    index.facet_counts(filters)
+                    samples.append((time.perf_counter() - start) * 1000)
+                results[f"{name}@{count}"] = summarize(samples)
+
+            start = time.perf_counter()
+            for i in range(1000):
+                index.add(count + i, synthetic_values(rng, count + i))
+            results[f"incremental_add@{count}"] = {"docs": 1000, "ms_per_doc": round(time.perf_counter() - start, 4)}
+        report(self, results, options['json'])
@@ -0,0 +1,89 @@
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client, override_settings
+
+from bee import oauth
+from bee.models import User
+from bee.tests import StubOIDC
+
+from ._bench import report, summarize
+
+CLIENT_ID = 'bench-client.apps.example.com'
+
+
+def drive(codes, concurrency):
+    work = list(codes)
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+
+    def worker():
+        client = Client()
+        try:
+            while True:
+                with lock:
+                    if not work:
+                        return
+                    code = work.pop()
+                start = time.perf_counter()
+                response = client.get('/api/auth/google/callback', {'code': code})
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[response.status_code] += 1
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the Google OAuth callback against a local stub OpenID provider: latency, upstream "
+        "requests and connections per callback, and the timeout path with a slow upstream."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--callbacks', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--slow-delay', type=float, default=1.5,
+                            help="Token endpoint delay in the slow scenario, above the read timeout used there.")
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        results = {}
+        run = uuid.uuid4().hex[:8]
+        for name, delay, read_timeout in (('fast', 0.0, 5.0), ('slow_upstream', options['slow_delay'], 0.5)):
+            stub = StubOIDC(delay=delay)
+            oauth._documents.clear()
+            oauth._pool = None
+            callbacks = options['callbacks'] if not delay else options['concurrency']
+            codes = [f'bench-{run}-{name}-{i}' for i in range(callbacks)]
+            try:
+                with override_settings(
+                    GOOGLE_OIDC_DISCOVERY_URL=f'{stub.issuer}/.well-known/openid-configuration',
+                    GOOGLE_CLIENT_ID=CLIENT_ID, GOOGLE_CLIENT_SECRET='bench-secret',
+                    GOOGLE_REDIRECT_URI='http://testserver/api/auth/google/callback',
+                    GOOGLE_HTTP_READ_TIMEOUT=read_timeout,
+                ):
+                    latencies, statuses = drive(codes, options['concurrency'])
+            finally:
+                stub.close()
+                oauth._pool = None
+                User.objects.filter(username__startswith=f'bench-{run}-').delete()
+            results[name] = {
+                **summarize(latencies),
+                "status": {str(code): count for code, count in sorted(statuses.items())},
+                "upstream_requests": dict(stub.hits),
+                "upstream_connections": len(stub.connections),
+            }
+        report(self, results, options['json'])
@@ -0,0 +1,139 @@
+import random
+import threading
+import time
+from collections import Counter
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client, override_settings
+
+from bee.models import Role, User
+from bee.passwords import hash_pool_stats, reset_hash_pools
+from bee.throttles import LoginThrottle
+
+from ._bench import report, summarize
+from ._seed import CatalogSizes, seed_catalog
+from .bench_api import SCENARIOS, drive
+
+# name: (settings overrides, throttles on). Without throttles the storm is spread over many
+# addresses and accounts, so every attempt reaches the hasher; with them it is the usual
+# brute force of one account from one address.
+MODES = {
+    'baseline': (None, False),
+    'inline': ({'PASSWORD_HASH_WORKERS': 0}, False),
+    'pool': ({}, False),
+    'pool_process': ({'PASSWORD_HASH_EXECUTOR': 'process'}, False),
+    'throttled': ({}, True),
+}
+CATALOG_SCENARIOS = ['products_list', 'product_detail', 'products_filtered', 'category_tree']
+
+
+def storm(stop, threads, emails, outcomes, latencies, lock, targeted=False):
+    """
+    Wrong-password logins from `threads` clients until stop is set. Every attempt that gets
+    past the throttles costs one full hash.
+    """
+    def attacker(n):
+        client = Client(REMOTE_ADDR='10.0.0.1' if targeted else f"10.0.{n // 250}.{n % 250 + 1}")
+        targets = emails[:1] if targeted else emails
+        rng = random.Random(n)
+        try:
+            while not stop.is_set():
+                start = time.perf_counter()
+                response = client.post(
+                    '/api/v1/auth/login', {'email': rng.choice(targets), 'password': 'not-the-password'},
+                    content_type='application/json',
+                )
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    outcomes[response.status_code] += 1
+                    latencies.append(elapsed)
+        finally:
+            connections.close_all()
+
+    workers = [threading.Thread(target=attacker, args=(n,)) for n in range(threads)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives catalog reads while a synthetic wrong-password login storm runs, and compares "
+        "catalog latency with inline hashing, the bounded hash pool and the login throttles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--requests', type=int, default=400, help="Catalog requests per mode.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Concurrent catalog clients.")
+        parser.add_argument('--storm-threads', type=int, default=16)
+        parser.add_argument('--users', type=int, default=50, help="Accounts the storm spreads its attempts over.")
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=['baseline', 'inline', 'pool', 'throttled'])
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        catalog = seed_catalog(CatalogSizes(products=options['products']), seed=options['seed'])
+        role, _ = Role.objects.get_or_create(name='user')
+        encoded = make_password('bench-password')
+        emails = [f"bench-storm-{i}@example.com" for i in range(options['users'])]
+        User.objects.bulk_create([
+            User(username=email, email=email, full_name='Bench Storm', role=role, password=encoded, is_active=True)
+            for email in emails
+        ])
+        results = {}
+        try:
+            for mode in options['modes']:
+                overrides, throttled = MODES[mode]
+                rng = random.Random(f"{options['seed']}:{mode}")
+                # Unique query strings keep the response cache out of the measurement
+                paths = [
+                    f"{path}{'&' if '?' in path else '?'}_bench={i}"
+                    for i, path in enumerate(SCENARIOS[rng.choice(CATALOG_SCENARIOS)](catalog, rng)
+                                             for _ in range(options['requests']))
+                ]
+                caches['throttle'].clear()
+                reset_hash_pools()
+                before = hash_pool_stats()
+                outcomes, login_latencies, lock = Counter(), [], threading.Lock()
+                stop = threading.Event()
+                rates = {} if throttled else {'login_ip': None, 'login_email': None}
+                with override_settings(**(overrides or {})), \
+                        mock.patch.object(LoginThrottle, 'THROTTLE_RATES', {**LoginThrottle.THROTTLE_RATES, **rates}):
+                    attackers = []
+                    if overrides is not None:
+                        attackers = storm(
+                            stop, options['storm_threads'], emails, outcomes, login_latencies, lock, targeted=throttled,
+                        )
+                        time.sleep(0.5)
+                    try:
+                        latencies, _, errors, seconds = drive(paths, options['concurrency'])
+                    finally:
+                        stop.set()
+                        for attacker in attackers:
+                            attacker.join()
+                    after = hash_pool_stats()
+                stats = summarize(latencies)
+                results[mode] = {
+                    "catalog_rps": round(len(latencies) / seconds, 1),
+                    "catalog_p50_ms": stats["p50_ms"],
+                    "catalog_p95_ms": stats["p95_ms"],
+                    "catalog_p99_ms": stats["p99_ms"],
+                    "catalog_errors": errors,
+                    "logins": sum(outcomes.values()),
+                    "login_status": {str(code): count for code, count in sorted(outcomes.items())},
+                    "login_p50_ms": summarize(login_latencies)["p50_ms"],
+                    "hashes_pooled": after["completed"] - before["completed"],
+                    "pool_rejections": after["rejected"] - before["rejected"],
+                    "pool_timeouts": after["timeouts"] - before["timeouts"],
+                }
+        finally:
+            reset_hash_pools()
+            caches['throttle'].clear()
+            User.objects.filter(email__in=emails).delete()
+            catalog.delete()
+        report(self, results, options['json'])
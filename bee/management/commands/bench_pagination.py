@@ -0,0 +1,58 @@
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from bee.models import Product
+from bee.pagination import encode_cursor, paginate
+
+from ._bench import measure, report
+
+
+class Command(BaseCommand):
+    help = "Compares OFFSET and keyset (cursor) pagination latency at increasing page depths."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        page_size = options['page_size']
+        iterations = options['iterations']
+        factory = RequestFactory()
+        results = {}
+
+        with transaction.atomic():
+            run = uuid.uuid4().hex[:8]
+            Product.objects.bulk_create(
+                (Product(p_name=f"Bench product {i}", sku_name=f"bench-{run}-{i}") for i in range(rows)),
+                batch_size=5000,
+            )
+            ordered = Product.objects.order_by('created_at', 'pk')
+
+            depth = 0
+            depths = []
+            while depth < rows:
+                depths.append(depth)
+                depth = depth * 10 if depth else page_size * 10
+            for offset in depths:
+                anchor = ordered[offset - 1] if offset else None
+                params = {'page_size': page_size}
+                if anchor is not None:
+                    params['cursor'] = encode_cursor(anchor)
+                request = factory.get('/api/products/', params)
+
+                results[f"offset@{offset}"] = measure(
+                    lambda: list(ordered[offset:offset + page_size]), iterations
+                )
+                results[f"cursor@{offset}"] = measure(
+                    lambda: paginate(request, Product.objects.all()), iterations
+                )
+
+            transaction.set_rollback(True)
+
+        report(self, results, options['json'])
@@ -0,0 +1,110 @@
+import json
+import time
+import uuid
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from bee.models import Product, PurchaseOrder
+from bee.purchasing import computed_totals
+from bee.tokens import issue_tokens
+from bee.views import PurchaseOrderItemListCreateAPIView, PurchaseOrderListCreateAPIView
+
+from ._bench import report
+
+
+def post(view, factory, path, body, token):
+    request = factory.post(
+        path, data=json.dumps(body), content_type='application/json',
+        HTTP_AUTHORIZATION=f"Bearer {token}",
+    )
+    response = view(request)
+    assert response.status_code == 201, (response.status_code, response.data)
+    return response.data['meta']['data']
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates purchase orders two ways: one POST with nested items vs one POST for the order "
+        "and one per line. Runs outside a transaction so every request commits as it would live."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+', default=[500])
+        parser.add_argument('--orders', type=int, default=3, help="Orders created per mode and size.")
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        order_view = PurchaseOrderListCreateAPIView.as_view()
+        item_view = PurchaseOrderItemListCreateAPIView.as_view()
+        run = uuid.uuid4().hex[:8]
+        admin = get_user_model().objects.create(
+            username=f"bench-{run}", email=f"bench-{run}@example.com", is_superuser=True, is_active=True,
+        )
+        token, _ = issue_tokens(admin)
+        products = Product.objects.bulk_create([
+            Product(p_name=f"PO bench {i}", sku_name=f"po-{run}-{i}") for i in range(max(options['lines']))
+        ])
+        order_ids = []
+        results = {}
+
+        def lines_for(count):
+            return [
+                {"product_id": str(products[i].pk), "quantity": i % 7 + 1, "price": str(Decimal(i % 50) + Decimal('0.25'))}
+                for i in range(count)
+            ]
+
+        def per_item(lines):
+            order = post(order_view, factory, '/api/purchase-orders/', {"order_date": date.today().isoformat()}, token)
+            for line in lines:
+                post(item_view, factory, '/api/purchase-order-items/', {**line, "purchase_order_id": order['id']}, token)
+            return order['id'], 1 + len(lines)
+
+        def nested(lines):
+            order = post(order_view, factory, '/api/purchase-orders/',
+                         {"order_date": date.today().isoformat(), "items": lines}, token)
+            return order['id'], 1
+
+        try:
+            for count in options['lines']:
+                lines = lines_for(count)
+                for mode, create in (('per_item', per_item), ('nested', nested)):
+                    elapsed = requests = queries = 0
+                    for _ in range(options['orders']):
+                        # Django keeps only the last 9000 queries; count each order from an empty log
+                        reset_queries()
+                        with CaptureQueriesContext(connection) as ctx:
+                            start = time.perf_counter()
+                            order_id, sent = create(lines)
+                            elapsed += time.perf_counter() - start
+                        requests += sent
+                        queries += len(ctx.captured_queries)
+                        order_ids.append(order_id)
+                    results[f"{mode}@{count}"] = {
+                        "orders": options['orders'],
+                        "lines": count,
+                        "seconds_per_order": round(elapsed / options['orders'], 4),
+                        "requests_per_order": requests // options['orders'],
+                        "queries_per_order": round(queries / options['orders'], 1),
+                    }
+                results[f"nested@{count}"]["speedup_vs_per_item"] = round(
+                    results[f"per_item@{count}"]["seconds_per_order"] / results[f"nested@{count}"]["seconds_per_order"], 1
+                )
+            # Both paths must leave every order's total equal to its lines
+            computed = computed_totals(order_ids)
+            drifted = sum(
+                order.total_amount != computed.get(order.pk) for order in PurchaseOrder.objects.filter(pk__in=order_ids)
+            )
+            results["totals"] = {"orders": len(order_ids), "drifted": drifted}
+        finally:
+            PurchaseOrder.objects.filter(pk__in=order_ids).delete()
+            Product.objects.filter(pk__in=[product.pk for product in products]).delete()
+            admin.delete()
+
+        report(self, results, options['json'])
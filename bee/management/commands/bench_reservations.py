@@ -0,0 +1,99 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections
+
+from bee.models import Inventory, Product, StockReservation, Warehouse
+from bee.reservations import InsufficientStock, commit, release, reserve
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress-tests stock reservations: many threads race to reserve the same inventory "
+        "and the run fails if more units are reserved than were in stock."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--stock', type=int, default=2000)
+        parser.add_argument('--lines', type=int, default=2, help="Inventory rows per reservation (multi-line checkouts).")
+        parser.add_argument('--quantity', type=int, default=1)
+
+    def handle(self, *args, **options):
+        run = uuid.uuid4().hex[:8]
+        product = Product.objects.create(p_name="Bench reservation", sku_name=f"bench-res-{run}")
+        warehouses = Warehouse.objects.bulk_create(
+            Warehouse(name=f"Bench {run} {i}", address="bench", type="main") for i in range(options['lines'])
+        )
+        inventories = Inventory.objects.bulk_create(
+            Inventory(product_id=product, warehouse_id=warehouse, actual_price=1, price=1,
+                      quantity_available=options['stock'])
+            for warehouse in warehouses
+        )
+        lines = [(inventory.pk, options['quantity']) for inventory in inventories]
+        counts = {"reserved": 0, "rejected": 0, "retried": 0, "released": 0}
+        lock = threading.Lock()
+
+        def retrying(func, *args):
+            # sqlite raises "database is locked"; real databases block on the row lock instead
+            while True:
+                try:
+                    return func(*args)
+                except OperationalError:
+                    with lock:
+                        counts["retried"] += 1
+
+        def worker(index):
+            reserved = rejected = released = 0
+            try:
+                while True:
+                    try:
+                        reservation = retrying(reserve, lines[::-1] if index % 2 else lines)
+                    except InsufficientStock:
+                        rejected += 1
+                        break
+                    reserved += 1
+                    # Churn a little so release and commit race with reserve too
+                    if reserved % 10 == 0:
+                        retrying(release, reservation.pk)
+                        released += 1
+                    else:
+                        retrying(commit, reservation.pk)
+            finally:
+                with lock:
+                    counts["reserved"] += reserved
+                    counts["rejected"] += rejected
+                    counts["released"] += released
+                close_old_connections()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['threads'])]
+        oversold = []
+        start = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+            committed = counts["reserved"] - counts["released"]
+            for inventory in Inventory.objects.filter(pk__in=[line[0] for line in lines]):
+                if inventory.quantity_reserved != 0 or committed * options['quantity'] != options['stock'] - inventory.quantity_available:
+                    oversold.append(str(inventory.pk))
+
+            self.stdout.write(
+                f"threads={options['threads']} stock={options['stock']} lines={options['lines']} "
+                f"reservations={counts['reserved']} released={counts['released']} rejected={counts['rejected']} "
+                f"retried={counts['retried']} seconds={elapsed:.3f} "
+                f"reservations_per_sec={counts['reserved'] / elapsed:.1f}"
+            )
+        finally:
+            StockReservation.objects.filter(items__inventory__product_id=product).delete()
+            product.delete()
+            Warehouse.objects.filter(pk__in=[warehouse.pk for warehouse in warehouses]).delete()
+
+        if oversold:
+            raise CommandError(f"Stock counters inconsistent for inventories: {', '.join(oversold)}")
+        self.stdout.write(self.style.SUCCESS("No oversell"))
@@ -0,0 +1,67 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from bee.search import SearchIndex, product_fields
+
+from ._bench import summarize, report
+from ._seed import product_name
+
+QUERIES = [
+    "shirt",                    # one common term
+    "cotton shirt",             # intersection of two common terms
+    "premium leather wallet",   # three terms
+    "shrit",                    # typo
+    "back",                     # prefix
+    "brand 7",                  # brand name
+    "sku-12345",                # exact SKU
+    "bamboo zzzz",              # partial match fallback
+]
+
+
+class Command(BaseCommand):
+    help = "Builds the in-process product search index over synthetic products and measures build time, memory and query latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--docs', type=int, nargs='+', default=[100000, 1000000])
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--memory', action='store_true', help="Trace index memory (slows the build down).")
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        results = {}
+        for count in options['docs']:
+            rng = random.Random(options['seed'])
+            documents = [
+                (i, product_fields(product_name(rng), f"sku-{i}", f"Brand {i % 500}", f"Category {i % 2000}"))
+                for i in range(count)
+            ]
+            index = SearchIndex()
+            if options['memory']:
+                tracemalloc.start()
+            start = time.perf_counter()
+            index.load(documents)
+            build = {"docs": count, "seconds": round(time.perf_counter() - start, 3), "terms": len(index.postings)}
+            if options['memory']:
+                build["traced_mb"] = round(tracemalloc.get_traced_memory()[0] / 2 ** 20, 1)
+                tracemalloc.stop()
+            results[f"build@{count}"] = build
+            del documents
+
+            for query in QUERIES:
+                samples = []
+                for _ in range(options['iterations']):
+                    start = time.perf_counter()
+                    index.search(query, options['limit'])
+                    samples.append((time.perf_counter() - start) * 1000)
+                results[f"{query}@{count}"] = summarize(samples)
+
+            start = time.perf_counter()
+            for i in range(1000):
+                index.add(count + i, product_fields(product_name(rng), f"new-{i}", "Brand 1", "Category 1"))
+            results[f"incremental_add@{count}"] = {"docs": 1000, "ms_per_doc": round((time.perf_counter() - start), 4)}
+        report(self, results, options['json'])
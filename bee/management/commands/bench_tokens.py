@@ -0,0 +1,77 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from rest_framework_simplejwt.state import token_backend as pyjwt_backend
+from rest_framework_simplejwt.tokens import AccessToken as PyJWTAccessToken
+from rest_framework_simplejwt.tokens import RefreshToken as PyJWTRefreshToken
+
+from bee.models import Role, User
+from bee.tokens import AccessToken, issue_tokens, token_backend
+
+from ._bench import measure, report
+
+
+def legacy_tokens(user):
+    """
+    The previous login token: simplejwt's PyJWT signing plus nine profile claims.
+    """
+    refresh = PyJWTRefreshToken.for_user(user)
+    access = refresh.access_token
+    access["user_id"] = str(user.id)
+    access["email"] = user.email
+    access["full_name"] = user.full_name or ""
+    access["phone"] = user.phone or ""
+    access["dob"] = user.dob.isoformat() if user.dob else None
+    access["gender"] = user.gender or ""
+    access["is_seller"] = user.is_seller
+    access["role"] = user.role.name if user.role else None
+    access["profile_verified"] = True
+    return str(access), str(refresh)
+
+
+def cookie_bytes(access, refresh):
+    response = HttpResponse()
+    response.set_cookie('access_token', access, max_age=3600, httponly=True, samesite='None')
+    response.set_cookie('refresh_token', refresh, max_age=86400, httponly=True, samesite='None')
+    return len(response.cookies.output(header='Set-Cookie:').encode())
+
+
+class Command(BaseCommand):
+    help = "Compares the legacy and compact JWTs: issue/verify cost, token size and Set-Cookie bytes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000)
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        role, _ = Role.objects.get_or_create(name='user')
+        # Unsaved: issuing tokens never touches the database
+        user = User(
+            username='bench-tokens@example.com', email='bench-tokens@example.com',
+            full_name='Bench Tokens Example', phone='+10000000000', dob=date(1990, 1, 1),
+            gender='female', is_seller=True, role=role,
+        )
+
+        legacy_access, legacy_refresh = legacy_tokens(user)
+        access, refresh = issue_tokens(user)
+        results = {
+            "legacy_issue": measure(lambda: legacy_tokens(user), iterations),
+            "compact_issue": measure(lambda: issue_tokens(user), iterations),
+            # What every authenticated request pays to read its cookie
+            "legacy_verify": measure(lambda: PyJWTAccessToken(legacy_access), iterations),
+            "compact_verify_pyjwt": measure(lambda: PyJWTAccessToken(access), iterations),
+            "compact_verify": measure(lambda: AccessToken(access), iterations),
+            "decode_pyjwt": measure(lambda: pyjwt_backend.decode(access), iterations),
+            "decode_prepared_key": measure(lambda: token_backend.decode(access), iterations),
+        }
+        results["size"] = {
+            "legacy_access_bytes": len(legacy_access),
+            "compact_access_bytes": len(access),
+            "legacy_refresh_bytes": len(legacy_refresh),
+            "compact_refresh_bytes": len(refresh),
+            "legacy_set_cookie_bytes": cookie_bytes(legacy_access, legacy_refresh),
+            "compact_set_cookie_bytes": cookie_bytes(access, refresh),
+        }
+        report(self, results, options['json'])
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bee.availability import SUMMARY_FIELDS, compute_availability, empty_summary, refresh_availability
+from bee.models import Product, ProductAvailability
+
+
+class Command(BaseCommand):
+    help = "Compares the per-product availability summary with Inventory and reports drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--fix', action='store_true', help="Recompute the products that drifted.")
+
+    def handle(self, *args, **options):
+        product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        drifted = []
+        for start in range(0, len(product_ids), batch_size):
+            batch = product_ids[start:start + batch_size]
+            computed = compute_availability(batch)
+            stored = {
+                row.pop('product_id'): row
+                for row in ProductAvailability.objects.filter(product_id__in=batch).values('product_id', *SUMMARY_FIELDS)
+            }
+            for product_id in batch:
+                expected = computed.get(product_id, empty_summary())
+                # Products that never had stock have no summary row yet
+                actual = stored.get(product_id, empty_summary())
+                if actual != expected:
+                    drifted.append(product_id)
+                    self.stdout.write(f"{product_id}: stored={actual} expected={expected}")
+
+        if drifted and options['fix']:
+            refresh_availability(drifted)
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(drifted)} of {len(product_ids)} products"))
+        elif drifted:
+            raise CommandError(f"{len(drifted)} of {len(product_ids)} products have drifted (rerun with --fix)")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"All {len(product_ids)} products consistent"))
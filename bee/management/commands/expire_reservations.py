@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bee.reservations import expire_reservations
+
+
+class Command(BaseCommand):
+    help = "Returns stock held by stock reservations that are past their expiry."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help="Keep sweeping instead of exiting when nothing is due.")
+        parser.add_argument('--interval', type=float, default=30.0, help="Seconds to sleep between sweeps when idle.")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            expired = expire_reservations(options['batch_size'])
+            total += expired
+            if expired:
+                self.stdout.write(f"Expired {expired}")
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} reservations expired"))
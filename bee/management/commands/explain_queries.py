@@ -0,0 +1,199 @@
+import json
+import re
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE')
+# Django aliases joined and subquery tables as T2, U0, V1, ...
+ALIAS_RE = re.compile(r'\b(?:FROM|JOIN)\s+[`"]?(\w+)[`"]?\s+(?:AS\s+)?[`"]?([A-Z]\d+)\b', re.IGNORECASE)
+FIRST_TABLE_RE = re.compile(r'\bFROM\s+[`"]?(\w+)[`"]?', re.IGNORECASE)
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+SQLITE_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?(.*)$')
+SQLITE_TEMP_RE = re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)')
+
+
+def normalize(sql):
+    """
+    The statement with literals replaced, so repeats with different ids group together.
+    """
+    return LITERAL_RE.sub('?', sql)
+
+
+def sqlite_findings(sql):
+    """
+    [(kind, table, detail)] from EXPLAIN QUERY PLAN. A SCAN without USING reads the whole
+    table; a temp B-tree is SQLite's filesort.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        rows = cursor.fetchall()
+    findings = []
+    for row in rows:
+        detail = row[-1]
+        scan = SQLITE_SCAN_RE.match(detail)
+        if scan and 'USING' not in scan.group(3):
+            findings.append(('full_scan', scan.group(2) or scan.group(1), detail))
+        elif SQLITE_TEMP_RE.search(detail):
+            findings.append(('filesort', None, detail))
+    return findings
+
+
+def mysql_findings(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN {sql}")
+        columns = [column[0].lower() for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    findings = []
+    for row in rows:
+        extra = row.get('extra') or ''
+        detail = f"type={row.get('type')} key={row.get('key')} rows={row.get('rows')} extra={extra}"
+        if row.get('type') == 'ALL':
+            findings.append(('full_scan', row.get('table'), detail))
+        if 'Using filesort' in extra:
+            findings.append(('filesort', row.get('table'), detail))
+        if 'Using temporary' in extra:
+            findings.append(('temporary', row.get('table'), detail))
+    return findings
+
+
+def postgresql_findings(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    findings = []
+
+    def relation(node):
+        if node.get('Relation Name'):
+            return node.get('Alias') or node['Relation Name']
+        for child in node.get('Plans', ()):
+            name = relation(child)
+            if name:
+                return name
+        return None
+
+    def walk(node):
+        detail = f"{node['Node Type']} rows={node.get('Plan Rows')} cost={node.get('Total Cost')}"
+        if node['Node Type'] == 'Seq Scan':
+            findings.append(('full_scan', node.get('Alias') or node.get('Relation Name'), detail))
+        elif node['Node Type'] in ('Sort', 'Incremental Sort'):
+            findings.append(('filesort', relation(node), f"{detail} key={node.get('Sort Key')}"))
+        for child in node.get('Plans', ()):
+            walk(child)
+
+    walk(plan[0]['Plan'])
+    return findings
+
+
+EXPLAINERS = {
+    'sqlite': sqlite_findings,
+    'mysql': mysql_findings,
+    'postgresql': postgresql_findings,
+}
+
+
+def resolve_table(name, sql):
+    """
+    Real table name for a table or Django alias mentioned in a plan.
+    """
+    if name is None:
+        first = FIRST_TABLE_RE.search(sql)
+        return first.group(1) if first else None
+    aliases = {alias: table for table, alias in ALIAS_RE.findall(sql)}
+    return aliases.get(name, name)
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays a bench_api --query-log with EXPLAIN and flags full table scans and "
+        "filesorts on the bee models."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('logs', nargs='+', help="JSON-lines query logs written by bench_api --query-log.")
+        parser.add_argument('--min-rows', type=int, default=1000,
+                            help="Ignore tables smaller than this; planners rightly scan small tables.")
+        parser.add_argument('--json', action='store_true')
+        parser.add_argument('--fail', action='store_true', help="Exit with an error when anything is flagged.")
+
+    def handle(self, *args, **options):
+        explain = EXPLAINERS.get(connection.vendor)
+        if explain is None:
+            raise CommandError(f"EXPLAIN parsing is not implemented for {connection.vendor}.")
+        models = {model._meta.db_table: model for model in apps.get_app_config('bee').get_models()}
+
+        statements = {}
+        for path in options['logs']:
+            with open(path) as handle:
+                for line in handle:
+                    entry = json.loads(line)
+                    if not entry['sql'].lstrip().upper().startswith(EXPLAINABLE):
+                        continue
+                    statement = statements.setdefault(normalize(entry['sql']), {
+                        "sql": entry['sql'], "executions": 0, "scenarios": set(),
+                    })
+                    statement["executions"] += entry.get('count', 1)
+                    statement["scenarios"].add(entry.get('scenario'))
+
+        row_counts = {}
+        flagged = defaultdict(lambda: {"executions": 0, "statements": 0, "scenarios": set(), "details": set()})
+        errors = []
+        for statement in statements.values():
+            try:
+                findings = explain(statement["sql"])
+            except DatabaseError as exc:
+                errors.append({"sql": statement["sql"][:300], "error": str(exc)})
+                continue
+            for kind, name, detail in findings:
+                model = models.get(resolve_table(name, statement["sql"]))
+                if model is None:
+                    continue
+                if model not in row_counts:
+                    row_counts[model] = model._base_manager.count()
+                if row_counts[model] < options['min_rows']:
+                    continue
+                entry = flagged[(model.__name__, kind)]
+                entry["executions"] += statement["executions"]
+                entry["statements"] += 1
+                entry["scenarios"].update(statement["scenarios"])
+                entry["details"].add(detail)
+                entry.setdefault("example", statement["sql"][:500])
+
+        report = {
+            "database": connection.vendor,
+            "statements": len(statements),
+            "flagged": [
+                {
+                    "model": model, "kind": kind,
+                    "rows": next(count for m, count in row_counts.items() if m.__name__ == model),
+                    "executions": entry["executions"], "statements": entry["statements"],
+                    "scenarios": sorted(filter(None, entry["scenarios"])),
+                    "plan": sorted(entry["details"]), "example": entry["example"],
+                }
+                for (model, kind), entry in sorted(flagged.items(), key=lambda item: -item[1]["executions"])
+            ],
+            "errors": errors,
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.stdout.write(f"{report['statements']} distinct statements explained on {report['database']}")
+            for item in report["flagged"]:
+                self.stdout.write(
+                    f"{item['model']} {item['kind']}: rows={item['rows']} executions={item['executions']} "
+                    f"statements={item['statements']} scenarios={','.join(item['scenarios'])}"
+                )
+                for detail in item["plan"]:
+                    self.stdout.write(f"    {detail}")
+                self.stdout.write(f"    e.g. {item['example']}")
+            for error in errors:
+                self.stderr.write(f"Could not explain: {error['error']}: {error['sql']}")
+            if not report["flagged"]:
+                self.stdout.write("No full scans or filesorts on bee tables")
+        if options['fail'] and report["flagged"]:
+            raise CommandError(f"{len(report['flagged'])} scan/sort findings on bee tables")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from bee.availability import refresh_availability
+from bee.models import Product
+
+
+class Command(BaseCommand):
+    help = "Recomputes the per-product availability summary from Inventory for every product."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        for start in range(0, len(product_ids), batch_size):
+            refresh_availability(product_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt availability for {len(product_ids)} products"))
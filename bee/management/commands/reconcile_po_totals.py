@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from bee.models import PurchaseOrder
+from bee.purchasing import reconcile_totals
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes PurchaseOrder.total_amount from the items for every order, in locked "
+        "batches, and reports the orders that had drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--verbose-orders', action='store_true', help="List every corrected order.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        checked = corrected = 0
+        last = None
+        while True:
+            # Keyset batches keep each lock set small and never rescan finished orders
+            batch = PurchaseOrder.objects.order_by('pk')
+            if last is not None:
+                batch = batch.filter(pk__gt=last)
+            order_ids = list(batch.values_list('pk', flat=True)[:batch_size])
+            if not order_ids:
+                break
+            drifted = reconcile_totals(order_ids)
+            checked += len(order_ids)
+            corrected += len(drifted)
+            if options['verbose_orders']:
+                for order in drifted:
+                    self.stdout.write(f"PO-{order.pk}: total_amount set to {order.total_amount}")
+            last = order_ids[-1]
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} purchase orders, corrected {corrected}"))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bee.mail import deliver_queued_emails
+
+
+class Command(BaseCommand):
+    help = "Delivers pending outbox emails in batches over a reused mail connection, with retry and backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help="Keep polling instead of exiting when the queue is drained.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep between polls when idle.")
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = deliver_queued_emails(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}")
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f"Done: {total_sent} sent, {total_failed} failed attempts"))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bee.otp import sweep_expired
+
+
+class Command(BaseCommand):
+    help = "Deletes expired OTP rows in small batches (only needed with OTP_STORE=database)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.05, help="Seconds between batches, to let other writers in.")
+        parser.add_argument('--loop', action='store_true', help="Keep sweeping instead of exiting when nothing is due.")
+        parser.add_argument('--interval', type=float, default=60.0, help="Seconds to sleep between sweeps when idle.")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            deleted = sweep_expired(options['batch_size'])
+            total += deleted
+            if deleted:
+                self.stdout.write(f"Deleted {deleted}")
+                time.sleep(options['pause'])
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} expired OTPs deleted"))
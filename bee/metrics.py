@@ -0,0 +1,191 @@
+"""
+In-process request metrics recorded by bee.middleware.QueryProfilingMiddleware and
+rendered in the Prometheus text format at /api/_metrics.
+
+Histograms use HDR-style log-linear buckets: every power of two between the lowest and
+highest bound is split into a few equal steps. That keeps the relative error of any
+percentile bounded with a few dozen buckets and a constant-time bisect per sample.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import serializers
+
+from .dbmetrics import connection_stats
+from .passwords import hash_pool_stats
+from .response_cache import cache_stats
+
+
+def log_linear_bounds(lowest, highest, steps_per_octave=2):
+    bounds = []
+    octave = lowest
+    while octave < highest:
+        step = octave / steps_per_octave
+        bounds.extend(octave + step * i for i in range(steps_per_octave))
+        octave *= 2
+    bounds.append(highest)
+    return bounds
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def record(self, value):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+# name: (help text, bucket bounds)
+METRICS = {
+    'bee_request_duration_seconds': ("Total request latency", log_linear_bounds(0.0005, 30.0)),
+    'bee_request_db_seconds': ("Time spent executing SQL per request", log_linear_bounds(0.0001, 30.0)),
+    'bee_request_serializer_seconds': ("Time spent in top-level serializer .data per request", log_linear_bounds(0.0001, 30.0)),
+    'bee_request_queries': ("SQL queries per request", [0] + log_linear_bounds(1, 1024)),
+}
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+# Serializer time of the request being profiled; None when it is not sampled
+serializer_time = ContextVar('serializer_time', default=None)
+# {"queries", "seconds"} of the request being profiled; None when it is not sampled
+query_stats = ContextVar('query_stats', default=None)
+
+
+def histogram(name, labels):
+    key = (name, labels)
+    found = _histograms.get(key)
+    if found is None:
+        with _histograms_lock:
+            found = _histograms.setdefault(key, Histogram(METRICS[name][1]))
+    return found
+
+
+def observe(labels, duration, db_time, serializer_seconds, queries):
+    histogram('bee_request_duration_seconds', labels).record(duration)
+    histogram('bee_request_db_seconds', labels).record(db_time)
+    histogram('bee_request_serializer_seconds', labels).record(serializer_seconds)
+    histogram('bee_request_queries', labels).record(queries)
+
+
+def reset_metrics():
+    with _histograms_lock:
+        _histograms.clear()
+
+
+def _timed_data(prop):
+    def data(self):
+        spent = serializer_time.get()
+        if spent is None or self.parent is not None:
+            return prop.fget(self)
+        start = time.perf_counter()
+        try:
+            return prop.fget(self)
+        finally:
+            spent[0] += time.perf_counter() - start
+    return property(data)
+
+
+def instrument_serializers():
+    """
+    Wraps Serializer.data / ListSerializer.data so sampled requests can report serializer
+    time. Installed once at startup, and only when sampling is enabled.
+    """
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(cls.data.fget, '_bee_timed', False):
+            wrapped = _timed_data(cls.data)
+            wrapped.fget._bee_timed = True
+            cls.data = wrapped
+
+
+def record_query(execute, sql, params, many, context):
+    stats = query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats["seconds"] += time.perf_counter() - start
+        stats["queries"] += 1
+
+
+def _install_query_timer(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def instrument_connections():
+    """
+    Times queries on every connection, in whichever thread opens it: async ORM calls and
+    sync views under ASGI run on executor threads with their own connections. The
+    request's query_stats context variable travels there with sync_to_async, so queries
+    outside a sampled request cost one lookup.
+    """
+    connection_created.connect(_install_query_timer, dispatch_uid='bee.metrics.query_timer')
+    for connection in connections.all(initialized_only=True):
+        _install_query_timer(None, connection)
+
+
+def _format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    escaped = ('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"')) for key, value in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+def render_prometheus():
+    lines = []
+    with _histograms_lock:
+        items = sorted(_histograms.items())
+    for name, (help_text, bounds) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for (metric, labels), hist in items:
+            if metric != name:
+                continue
+            counts, total, count = hist.snapshot()
+            cumulative = 0
+            for bound, bucket in zip(bounds, counts):
+                cumulative += bucket
+                lines.append(f"{name}_bucket{_format_labels(labels, le=f'{bound:g}')} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels, le='+Inf')} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    stats = connection_stats()
+    lines.append("# HELP bee_requests_total Requests started in this process")
+    lines.append("# TYPE bee_requests_total counter")
+    lines.append(f"bee_requests_total {stats['requests']}")
+    lines.append("# HELP bee_db_connections_opened_total Database connections opened in this process")
+    lines.append("# TYPE bee_db_connections_opened_total counter")
+    lines.append(f"bee_db_connections_opened_total {stats['connections_opened']}")
+
+    lines.append("# HELP bee_response_cache_requests_total Catalog response cache lookups")
+    lines.append("# TYPE bee_response_cache_requests_total counter")
+    for endpoint, counts in sorted(cache_stats().items()):
+        for outcome in ('hits', 'misses'):
+            lines.append(
+                f"bee_response_cache_requests_total{_format_labels((('endpoint', endpoint),), outcome=outcome)} {counts[outcome]}"
+            )
+
+    lines.append("# HELP bee_password_checks_total Login password checks through the hash pool")
+    lines.append("# TYPE bee_password_checks_total counter")
+    for outcome, count in sorted(hash_pool_stats().items()):
+        lines.append(f"bee_password_checks_total{_format_labels((), outcome=outcome)} {count}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bee', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_verified',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='brand',
+            index=models.Index(fields=['created_at', 'id'], name='bee_brand_created_576e51_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['created_at', 'c_id'], name='bee_categor_created_ec833d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['created_at', 'id'], name='bee_invento_created_6938f9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at', 'p_id'], name='bee_product_created_e4dc3c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['created_at', 'id'], name='bee_purchas_created_7e90f3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorderitem',
+            index=models.Index(fields=['created_at', 'id'], name='bee_purchas_created_6cd48f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='variant',
+            index=models.Index(fields=['created_at', 'id'], name='bee_variant_created_8af349_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='warehouse',
+            index=models.Index(fields=['created_at', 'id'], name='bee_warehou_created_72d8a0_idx'),
+        ),
+    ]
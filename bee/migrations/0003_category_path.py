@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+def build_category_paths(apps, schema_editor):
+    Category = apps.get_model('bee', 'Category')
+    parents = dict(Category.objects.values_list('c_id', 'parent_category_id'))
+    paths = {}
+
+    def path_for(c_id, seen=()):
+        if c_id not in paths:
+            parent_id = parents.get(c_id)
+            prefix = path_for(parent_id, seen + (c_id,)) if parent_id and parent_id not in seen else ''
+            paths[c_id] = f"{prefix}{c_id.hex}/"
+        return paths[c_id]
+
+    for c_id in parents:
+        Category.objects.filter(pk=c_id).update(path=path_for(c_id))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bee', '0002_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=693),
+        ),
+        migrations.RunPython(build_category_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:55
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_inventories(apps, schema_editor):
+    """
+    Folds inventory rows that share a (product, warehouse) into the oldest one, adding up
+    their quantities, so the unique constraint below can be created.
+    """
+    Inventory = apps.get_model('bee', 'Inventory')
+    duplicates = (
+        Inventory.objects.order_by()
+        .values('product_id', 'warehouse_id')
+        .annotate(rows=Count('pk'))
+        .filter(rows__gt=1)
+    )
+    for group in duplicates:
+        rows = list(
+            Inventory.objects.filter(product_id=group['product_id'], warehouse_id=group['warehouse_id'])
+            .order_by('created_at', 'pk')
+        )
+        keep, extra = rows[0], rows[1:]
+        keep.quantity_available += sum(row.quantity_available for row in extra)
+        keep.quantity_reserved += sum(row.quantity_reserved for row in extra)
+        keep.save(update_fields=['quantity_available', 'quantity_reserved'])
+        Inventory.objects.filter(pk__in=[row.pk for row in extra]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bee', '0004_outbound_email'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_inventories, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='inventory',
+            constraint=models.UniqueConstraint(fields=('product_id', 'warehouse_id'), name='unique_inventory_per_warehouse'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min, Q, Sum
+
+
+def build_product_availability(apps, schema_editor):
+    Product = apps.get_model('bee', 'Product')
+    Inventory = apps.get_model('bee', 'Inventory')
+    ProductAvailability = apps.get_model('bee', 'ProductAvailability')
+    totals = {
+        row.pop('product_id'): row
+        for row in Inventory.objects.order_by().values('product_id').annotate(
+            total_available=Sum('quantity_available'),
+            total_reserved=Sum('quantity_reserved'),
+            min_price=Min('price', filter=Q(quantity_available__gt=0)),
+            warehouse_count=Count('warehouse_id', filter=Q(quantity_available__gt=0), distinct=True),
+        )
+    }
+    ProductAvailability.objects.bulk_create(
+        (ProductAvailability(product_id=pk, **totals.get(pk, {})) for pk in Product.objects.values_list('pk', flat=True)),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bee', '0006_stock_reservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAvailability',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='availability', serialize=False, to='bee.product')),
+                ('total_available', models.PositiveIntegerField(default=0)),
+                ('total_reserved', models.PositiveIntegerField(default=0)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('warehouse_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(build_product_availability, migrations.RunPython.noop),
+    ]
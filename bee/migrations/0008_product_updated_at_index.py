@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bee', '0007_product_availability'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['updated_at'], name='bee_product_updated_b40968_idx'),
+        ),
+    ]
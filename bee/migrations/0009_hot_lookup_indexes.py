@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bee', '0008_product_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='address',
+            index=models.Index(fields=['user', 'is_default'], name='bee_address_user_id_6da459_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['parent_category', 'c_name'], name='bee_categor_parent__bfd5ea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['updated_at'], name='bee_invento_updated_3a5cf8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='otp',
+            index=models.Index(fields=['user', 'otp_code'], name='bee_otp_user_id_67e06e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['p_name'], name='bee_product_p_name_6f329d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['order_date'], name='bee_purchas_order_d_e4ae90_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='variant',
+            index=models.Index(fields=['updated_at'], name='bee_variant_updated_1fe002_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:26
+
+from datetime import timedelta
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def set_otp_expiry(apps, schema_editor):
+    # Outstanding codes keep the five minutes they were issued with
+    OTP = apps.get_model('bee', 'OTP')
+    OTP.objects.update(expires_at=F('updated_at') + timedelta(minutes=5))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bee', '0009_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='otp',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(set_otp_expiry, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bee', '0012_outbound_email_sending'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productavailability',
+            index=models.Index(fields=['updated_at'], name='bee_product_updated_adad7d_idx'),
+        ),
+    ]
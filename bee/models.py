@@ -1,7 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Concat, StrIndex, Substr
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_delete, post_migrate, pre_delete
 from django.dispatch import receiver
 import uuid
 from datetime import timedelta
@@ -83,16 +84,47 @@ class OTP(TimeStampedModel):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='otp')
     otp_code = models.CharField(max_length=6)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set on every issue; sweep_otps deletes rows past it
+    expires_at = models.DateTimeField(default=timezone.now, db_index=True)
 
     def __str__(self):
         return f"OTP for {self.user.email}"
 
     def is_expired(self):
-        return timezone.now() > self.created_at + timedelta(minutes=5)
+        return timezone.now() > self.expires_at
 
     class Meta:
         verbose_name = "OTP"
         verbose_name_plural = "OTPs"
+        # OTP verification looks up (user, otp_code)
+        indexes = [models.Index(fields=['user', 'otp_code'])]
+
+
+# Outbox for emails sent by the send_queued_emails worker
+class OutboundEmail(TimeStampedModel):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        # Claimed by a worker until next_attempt_at (the lease) passes
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    to_email = models.EmailField()
+    from_email = models.CharField(max_length=255, blank=True, null=True)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email} ({self.status})"
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
 
 
 class Address(TimeStampedModel):
@@ -110,9 +142,17 @@ class Address(TimeStampedModel):
     def __str__(self):
         return f"{self.name} - {self.pincode}"
 
+    class Meta:
+        # A user's default address
+        indexes = [models.Index(fields=['user', 'is_default'])]
+
 
 
 
+CATEGORY_PATH_SEGMENT_LENGTH = 33
+CATEGORY_PATH_MAX_LENGTH = CATEGORY_PATH_SEGMENT_LENGTH * 21
+
+
 class Category(TimeStampedModel):
     c_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     c_name = models.CharField(max_length=255)
@@ -123,12 +163,64 @@ class Category(TimeStampedModel):
         blank=True,
         related_name='subcategories'
     )
+    # Materialized path: one fixed-width "<c_id hex>/" segment per level, root first.
+    path = models.CharField(max_length=CATEGORY_PATH_MAX_LENGTH, db_index=True, editable=False, default='')
 
     def __str__(self):
         return self.c_name
 
+    @property
+    def segment(self):
+        return f"{self.c_id.hex}/"
+
+    @property
+    def depth(self):
+        return len(self.path) // CATEGORY_PATH_SEGMENT_LENGTH - 1
+
+    @property
+    def ancestor_ids(self):
+        return [uuid.UUID(seg) for seg in self.path.split('/')[:-2]]
+
+    def save(self, *args, **kwargs):
+        old_path = self.path
+        parent_path = ''
+        if self.parent_category_id:
+            parent_path = Category.objects.values_list('path', flat=True).get(pk=self.parent_category_id)
+        self.path = parent_path + self.segment
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'path' not in update_fields:
+            # A new parent means a new path, whichever fields the caller named
+            kwargs['update_fields'] = [*update_fields, 'path']
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if old_path and old_path != self.path:
+                # Re-parent the whole subtree in one UPDATE
+                Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(models.Value(self.path), Substr('path', len(old_path) + 1)),
+                    updated_at=timezone.now(),
+                )
+
     class Meta:
         ordering = ['c_name']
+        indexes = [
+            models.Index(fields=['created_at', 'c_id']),
+            # Children of a category in default order
+            models.Index(fields=['parent_category', 'c_name']),
+        ]
+
+
+@receiver(post_delete, sender=Category)
+def detach_category_subtree(sender, instance, **kwargs):
+    """
+    Children of a deleted category become roots (SET_NULL), so drop the deleted
+    segment and everything above it from the paths of its former descendants.
+    """
+    segment = instance.segment
+    Category.objects.filter(path__contains=segment).update(
+        path=Substr('path', StrIndex('path', models.Value(segment)) + len(segment)),
+        updated_at=timezone.now(),
+    )
 
 
 # Brand
@@ -142,6 +234,7 @@ class Brand(TimeStampedModel):
 
     class Meta:
         ordering = ['name']
+        indexes = [models.Index(fields=['created_at', 'id'])]
 
 
 # Product
@@ -157,6 +250,43 @@ class Product(TimeStampedModel):
 
     class Meta:
         ordering = ['p_name']
+        indexes = [
+            models.Index(fields=['created_at', 'p_id']),
+            models.Index(fields=['p_name']),
+            # bee.search catches up with writes from other processes by updated_at;
+            # also serves the whole-table ETag aggregate
+            models.Index(fields=['updated_at']),
+        ]
+
+
+@receiver(pre_delete, sender=Brand)
+@receiver(pre_delete, sender=Category)
+def touch_detached_products(sender, instance, **kwargs):
+    """
+    The SET_NULL that follows does not touch updated_at; stamp the products it will change
+    so ETags and catch-up by updated_at (bee.conditional, bee.search, bee.facets) see it.
+    """
+    lookup = 'brand_id' if sender is Brand else 'c_id'
+    # Kept on the instance for post_delete receivers that reindex them in this process
+    instance._detached_products = list(Product.objects.filter(**{lookup: instance.pk}).values_list('pk', flat=True))
+    Product.objects.filter(pk__in=instance._detached_products).update(updated_at=timezone.now())
+
+
+# Deleted products, so every process can drop them from its catalog indexes (bee.indexing)
+class ProductTombstone(models.Model):
+    p_id = models.UUIDField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.p_id} deleted at {self.deleted_at}"
+
+    class Meta:
+        indexes = [models.Index(fields=['deleted_at'])]
+
+
+@receiver(post_delete, sender=Product)
+def record_product_tombstone(sender, instance, **kwargs):
+    ProductTombstone.objects.create(p_id=instance.pk)
 
 
 # Variant (Optional)
@@ -170,6 +300,22 @@ class Variant(TimeStampedModel):
     def __str__(self):
         return f"{self.product_id.p_name} - {self.size or ''} {self.color or ''}".strip()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            # Whole-table ETags read MAX(updated_at), COUNT(*) from this index alone
+            models.Index(fields=['updated_at']),
+        ]
+
+
+@receiver(post_delete, sender=Variant)
+def touch_variant_product(sender, instance, **kwargs):
+    """
+    A deleted variant leaves no row behind; stamp its product so catch-up by updated_at
+    (bee.facets) reindexes it.
+    """
+    Product.objects.filter(pk=instance.product_id_id).update(updated_at=timezone.now())
+
 
 # Warehouse / Location
 class Warehouse(TimeStampedModel):
@@ -188,6 +334,7 @@ class Warehouse(TimeStampedModel):
 
     class Meta:
         ordering = ['name']
+        indexes = [models.Index(fields=['created_at', 'id'])]
 
 
 # Inventory
@@ -200,9 +347,76 @@ class Inventory(TimeStampedModel):
     quantity_available = models.PositiveIntegerField(default=0)
     quantity_reserved = models.PositiveIntegerField(default=0)
 
+    # Moved only by the F() updates in bee.reservations once the row exists
+    STOCK_FIELDS = ('quantity_available', 'quantity_reserved')
+
     def __str__(self):
         return f"{self.product_id.p_name} - {self.warehouse_id.name}"
 
+    def save(self, *args, **kwargs):
+        # Saving a loaded row must not write back stock counts that reservations moved since
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.STOCK_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['updated_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['product_id', 'warehouse_id'], name='unique_inventory_per_warehouse'),
+        ]
+
+
+# Per-product stock summary across warehouses (maintained by bee.availability)
+class ProductAvailability(TimeStampedModel):
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='availability')
+    total_available = models.PositiveIntegerField(default=0)
+    total_reserved = models.PositiveIntegerField(default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    warehouse_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.product_id}: {self.total_available} available"
+
+    class Meta:
+        # Part of the product ETags (bee.conditional)
+        indexes = [models.Index(fields=['updated_at'])]
+
+
+# Stock reservation (see bee.reservations)
+class StockReservation(TimeStampedModel):
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('committed', 'Committed'),
+        ('released', 'Released'),
+        ('expired', 'Expired'),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_reservations')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Reservation-{self.id} ({self.status})"
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'expires_at'])]
+
+
+class StockReservationItem(TimeStampedModel):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    reservation = models.ForeignKey(StockReservation, on_delete=models.CASCADE, related_name='items')
+    inventory = models.ForeignKey(Inventory, on_delete=models.CASCADE, related_name='reservation_items')
+    quantity = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.inventory_id} x {self.quantity}"
+
 
 # Purchase Order
 class PurchaseOrder(TimeStampedModel):
@@ -210,13 +424,28 @@ class PurchaseOrder(TimeStampedModel):
     supplier_id = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='purchase_orders')
     status = models.CharField(max_length=50, default='pending')
     order_date = models.DateField()
-    total_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    # Sum of the items' quantity * price, maintained by bee.purchasing
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
     def __str__(self):
         return f"PO-{self.id} ({self.status})"
 
+    def save(self, *args, **kwargs):
+        # total_amount only moves through the F() deltas in bee.purchasing; saving a loaded
+        # order must not write back a copy that concurrent item writes have moved since
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'total_amount'
+            ]
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-order_date']
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['order_date']),
+        ]
 
 
 # Purchase Order Item
@@ -230,6 +459,18 @@ class PurchaseOrderItem(TimeStampedModel):
     def __str__(self):
         return f"{self.product_id.p_name} x {self.quantity}"
 
+    @property
+    def line_total(self):
+        return self.quantity * self.price
+
+    def save(self, *args, **kwargs):
+        # The order total moves with the line in the same transaction (see bee.purchasing)
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [models.Index(fields=['created_at', 'id'])]
+
 
 # -----------------------------
 # Catalog: Category -> Brand -> Product -> Variant
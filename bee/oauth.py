@@ -0,0 +1,189 @@
+"""
+Google sign-in (OpenID Connect authorization code flow) without calling userinfo.
+
+The code is exchanged at the token endpoint and the returned ID token is verified locally
+against Google's published keys. The discovery document and JWKS are cached per process
+for as long as their Cache-Control allows (capped by GOOGLE_OIDC_CACHE_SECONDS), so a
+callback normally costs one upstream request.
+
+All HTTP goes through one urllib3 PoolManager per process: keep-alive connections,
+thread-safe, no retries, and connect/read timeouts from settings so a slow upstream
+cannot hold a worker. GOOGLE_OIDC_DISCOVERY_URL can point at a local stub server
+(see StubOIDC in bee.tests).
+"""
+import re
+import threading
+import time
+
+import jwt
+import urllib3
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .cache import TTLCache
+from .models import Role, User
+
+
+class OAuthError(Exception):
+    pass
+
+
+class UpstreamTimeout(OAuthError):
+    pass
+
+
+_documents = TTLCache(maxsize=16, ttl=3600)
+_pool = None
+_pool_lock = threading.Lock()
+_fetch_lock = threading.Lock()
+_jwks_refreshed = [0.0]
+MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+def http():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = urllib3.PoolManager(
+                    maxsize=getattr(settings, 'GOOGLE_HTTP_POOL_SIZE', 10),
+                    retries=False,
+                    timeout=urllib3.Timeout(
+                        connect=getattr(settings, 'GOOGLE_HTTP_CONNECT_TIMEOUT', 2.0),
+                        read=getattr(settings, 'GOOGLE_HTTP_READ_TIMEOUT', 5.0),
+                    ),
+                )
+    return _pool
+
+
+def request_json(method, url, **kwargs):
+    """
+    Returns (status, JSON body, response headers). Timeouts raise UpstreamTimeout and
+    other transport failures OAuthError.
+    """
+    try:
+        response = http().request(method, url, **kwargs)
+    except urllib3.exceptions.TimeoutError as e:
+        raise UpstreamTimeout(f"{url}: {e}")
+    except urllib3.exceptions.HTTPError as e:
+        raise OAuthError(f"{url}: {e}")
+    try:
+        body = response.json()
+    except ValueError:
+        raise OAuthError(f"{url}: HTTP {response.status}, body is not JSON")
+    return response.status, body, response.headers
+
+
+def cached_json(url, parse=None):
+    """
+    GETs a public document, cached (after parse(), when given) for its Cache-Control max-age.
+    """
+    document = _documents.get(url)
+    if document is not None:
+        return document
+    # One fetch per process when the cache is cold, however many callbacks are waiting
+    with _fetch_lock:
+        document = _documents.get(url)
+        if document is not None:
+            return document
+        status, document, headers = request_json('GET', url)
+        if status != 200:
+            raise OAuthError(f"{url}: HTTP {status}")
+        max_age = MAX_AGE_RE.search(headers.get('Cache-Control', ''))
+        ttl = getattr(settings, 'GOOGLE_OIDC_CACHE_SECONDS', 3600)
+        if max_age:
+            ttl = min(ttl, int(max_age.group(1)))
+        if parse is not None:
+            document = parse(document)
+        _documents.set(url, document, ttl)
+    return document
+
+
+def discovery():
+    return cached_json(settings.GOOGLE_OIDC_DISCOVERY_URL)
+
+
+def signing_key(kid):
+    """
+    The JWK for a key id. An unknown kid refetches the JWKS, since Google rotates keys,
+    but at most once per GOOGLE_JWKS_MIN_REFRESH_SECONDS so forged kids cannot hammer it.
+    """
+    jwks_uri = discovery()['jwks_uri']
+    for attempt in range(2):
+        for key in cached_json(jwks_uri, jwt.PyJWKSet.from_dict).keys:
+            if key.key_id == kid:
+                return key
+        now = time.monotonic()
+        if attempt or now - _jwks_refreshed[0] < getattr(settings, 'GOOGLE_JWKS_MIN_REFRESH_SECONDS', 60):
+            break
+        _jwks_refreshed[0] = now
+        _documents.pop(jwks_uri)
+    raise OAuthError(f"no signing key {kid!r}")
+
+
+def verify_id_token(id_token):
+    """
+    Checks the ID token's signature, audience, issuer and expiry; returns its claims.
+    """
+    issuer = discovery()['issuer']
+    try:
+        kid = jwt.get_unverified_header(id_token).get('kid')
+        key = signing_key(kid)
+        claims = jwt.decode(
+            id_token, key.key, algorithms=['RS256'],
+            audience=settings.GOOGLE_CLIENT_ID,
+            # Google signs with either form of its issuer
+            issuer=[issuer, issuer.removeprefix('https://')],
+            leeway=getattr(settings, 'GOOGLE_ID_TOKEN_LEEWAY', 30),
+            options={'require': ['exp', 'iat', 'sub', 'iss', 'aud']},
+        )
+    except jwt.PyJWTError as e:
+        raise OAuthError(f"ID token rejected: {e}")
+    if not claims.get('email') or claims.get('email_verified') is not True:
+        raise OAuthError("ID token has no verified email")
+    return claims
+
+
+def exchange_code(code):
+    """
+    Trades an authorization code for tokens and returns the verified ID token claims.
+    """
+    status, body, _ = request_json('POST', discovery()['token_endpoint'], fields={
+        'code': code,
+        'client_id': settings.GOOGLE_CLIENT_ID,
+        'client_secret': settings.GOOGLE_CLIENT_SECRET,
+        'redirect_uri': settings.GOOGLE_REDIRECT_URI,
+        'grant_type': 'authorization_code',
+    }, encode_multipart=False)
+    if status != 200 or not isinstance(body, dict) or not body.get('id_token'):
+        raise OAuthError(f"token endpoint: HTTP {status} {body.get('error') if isinstance(body, dict) else ''}")
+    return verify_id_token(body['id_token'])
+
+
+def google_user(claims):
+    """
+    The user for verified ID token claims, created on first sign-in. Google has verified
+    the address, so new accounts skip the OTP step.
+    """
+    try:
+        return User.objects.select_related('role').get(email=claims['email'])
+    except User.DoesNotExist:
+        pass
+    user = User(
+        username=claims['email'],
+        email=claims['email'],
+        full_name=(claims.get('name') or '')[:255],
+        first_name=claims.get('given_name', '')[:150],
+        last_name=claims.get('family_name', '')[:150],
+        role=Role.objects.filter(name='user').first(),
+        is_active=True,
+        profile_verified=True,
+    )
+    user.set_unusable_password()
+    try:
+        with transaction.atomic():
+            user.save()
+    except IntegrityError:
+        # A concurrent first sign-in created it
+        return User.objects.select_related('role').get(email=claims['email'])
+    return user
@@ -0,0 +1,131 @@
+"""
+One-time codes for email verification, behind a pluggable store (settings.OTP_STORE):
+
+- 'database': one OTP row per user. Verification is a single query joining User on email,
+  and manage.py sweep_otps deletes expired rows in small batches.
+- 'cache': the code lives under a TTL key in the 'otp' cache and never touches the database.
+  The cache must be shared by every worker (file or redis backend).
+
+A dotted path to another OTPStore subclass also works.
+"""
+import secrets
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OTP
+
+User = get_user_model()
+
+
+class InvalidOTP(Exception):
+    pass
+
+
+class ExpiredOTP(InvalidOTP):
+    pass
+
+
+def generate_code():
+    return f"{secrets.randbelow(10 ** 6):06d}"
+
+
+def otp_ttl():
+    return timedelta(seconds=getattr(settings, 'OTP_TTL_SECONDS', 300))
+
+
+class OTPStore:
+    def issue(self, user):
+        """
+        Replaces the user's code with a fresh one and returns it.
+        """
+        raise NotImplementedError
+
+    def verify(self, email, code):
+        """
+        Consumes a matching code and returns its user.
+        Raises ExpiredOTP / InvalidOTP; a code can be used once.
+        """
+        raise NotImplementedError
+
+
+class DatabaseOTPStore(OTPStore):
+    def issue(self, user):
+        code = generate_code()
+        OTP.objects.update_or_create(user=user, defaults={'otp_code': code, 'expires_at': timezone.now() + otp_ttl()})
+        return code
+
+    def verify(self, email, code):
+        # One query: user.email is unique and (user, otp_code) is indexed
+        otp = next(iter(OTP.objects.select_related('user').filter(user__email=email, otp_code=code)[:1]), None)
+        if otp is None:
+            raise InvalidOTP(email)
+        # The delete doubles as the single-use check when two requests race
+        deleted, _ = OTP.objects.filter(pk=otp.pk).delete()
+        if not deleted:
+            raise InvalidOTP(email)
+        if otp.is_expired():
+            raise ExpiredOTP(email)
+        return otp.user
+
+
+class CacheOTPStore(OTPStore):
+    """
+    Keys are per email; an expired code is simply gone, so it reports as invalid.
+    """
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, 'OTP_CACHE_ALIAS', 'otp')]
+
+    @staticmethod
+    def key(email):
+        return f"otp:{email.lower()}"
+
+    def issue(self, user):
+        code = generate_code()
+        self.cache.set(self.key(user.email), (code, user.pk), int(otp_ttl().total_seconds()))
+        return code
+
+    def verify(self, email, code):
+        stored = self.cache.get(self.key(email))
+        if stored is None or not secrets.compare_digest(stored[0], code):
+            raise InvalidOTP(email)
+        if not self.cache.delete(self.key(email)):
+            raise InvalidOTP(email)
+        try:
+            return User.objects.get(pk=stored[1])
+        except User.DoesNotExist:
+            raise InvalidOTP(email)
+
+
+STORES = {
+    'database': DatabaseOTPStore,
+    'cache': CacheOTPStore,
+}
+
+
+@lru_cache(maxsize=None)
+def _store(name):
+    return (STORES.get(name) or import_string(name))()
+
+
+def get_otp_store():
+    return _store(getattr(settings, 'OTP_STORE', 'database'))
+
+
+def sweep_expired(batch_size=1000):
+    """
+    Deletes one batch of expired OTP rows by primary key, so each DELETE holds its locks
+    briefly. Returns the number deleted.
+    """
+    now = timezone.now()
+    ids = list(OTP.objects.filter(expires_at__lt=now).order_by('expires_at').values_list('pk', flat=True)[:batch_size])
+    if not ids:
+        return 0
+    deleted, _ = OTP.objects.filter(pk__in=ids, expires_at__lt=now).delete()
+    return deleted
@@ -0,0 +1,86 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(obj):
+    raw = json.dumps([obj.created_at.isoformat(), str(obj.pk)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    created_at = parse_datetime(created_at) if isinstance(created_at, str) else None
+    if created_at is None:
+        raise InvalidCursor(cursor)
+    return created_at, pk
+
+
+def get_page_size(request):
+    default = getattr(settings, 'API_PAGE_SIZE', 50)
+    maximum = getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+    try:
+        page_size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        page_size = default
+    return max(1, min(page_size, maximum))
+
+
+def keyset_after(queryset, created_at, pk):
+    """
+    Filters to rows strictly after (created_at, pk).
+    The redundant created_at__gte keeps the OR sargable for the (created_at, pk) index.
+    """
+    return queryset.filter(
+        Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk),
+        created_at__gte=created_at,
+    )
+
+
+def cursor_queryset(request, queryset):
+    """
+    Applies keyset pagination on (created_at, pk) to the queryset.
+    Returns (queryset, page_size); the queryset fetches one extra row to detect more pages.
+    Raises InvalidCursor for a malformed ?cursor= value.
+    """
+    page_size = get_page_size(request)
+    queryset = queryset.order_by('created_at', 'pk')
+    cursor = request.GET.get('cursor')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        try:
+            queryset = keyset_after(queryset, created_at, pk)
+        except ValidationError:
+            raise InvalidCursor(cursor)
+    return queryset[:page_size + 1], page_size
+
+
+def page_meta(rows, page_size):
+    """
+    Trims the look-ahead row and returns (rows, page info for the response meta).
+    """
+    rows = list(rows)
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    return rows, {
+        "page_size": page_size,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(rows[-1]) if has_more else None,
+    }
+
+
+def paginate(request, queryset):
+    queryset, page_size = cursor_queryset(request, queryset)
+    return page_meta(queryset, page_size)
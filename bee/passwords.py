@@ -0,0 +1,148 @@
+"""
+Password checks off the request thread.
+
+PBKDF2 is deliberately CPU-heavy, so a burst of logins hashing inline can take every core
+from the workers that also serve catalog reads. verify_password() runs the hash in a small
+per-process pool instead (settings.PASSWORD_HASH_WORKERS, threads or processes, optionally
+at a lower CPU priority) and admits at most PASSWORD_HASH_QUEUE waiting checks beyond the
+busy workers. Past that it raises HashPoolBusy straight away and the login view answers 429,
+so a storm sheds load instead of queueing CPU work it cannot finish.
+"""
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class HashPoolBusy(Exception):
+    pass
+
+
+def _lower_priority(nice, thread):
+    if not nice:
+        return
+    try:
+        if thread and sys.platform == 'linux':
+            # Linux applies setpriority to a single thread when given its native id
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+        elif not thread:
+            os.nice(nice)
+    except (AttributeError, OSError):
+        pass
+
+
+def _init_process(nice):
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    _lower_priority(nice, thread=False)
+
+
+def _verify(password, encoded):
+    return hashers.verify_password(password, encoded)
+
+
+class HashPool:
+    def __init__(self, workers, queue, timeout, executor='thread', nice=0):
+        if executor == 'process':
+            self.executor = ProcessPoolExecutor(workers, initializer=_init_process, initargs=(nice,))
+        else:
+            self.executor = ThreadPoolExecutor(
+                workers, thread_name_prefix='bee-password',
+                initializer=_lower_priority, initargs=(nice, True),
+            )
+        self.timeout = timeout
+        # A slot is held from submit until the hash finishes, even if its caller gave up
+        self.slots = threading.BoundedSemaphore(workers + queue)
+        self.stats = {"completed": 0, "rejected": 0, "timeouts": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _done(self, future):
+        self.slots.release()
+        self._count("completed")
+
+    def run(self, func, *args):
+        if not self.slots.acquire(blocking=False):
+            self._count("rejected")
+            raise HashPoolBusy()
+        try:
+            future = self.executor.submit(func, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(self._done)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            self._count("timeouts")
+            raise HashPoolBusy()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_hash_pool():
+    """
+    This process's pool for the current settings, or None when PASSWORD_HASH_WORKERS is 0.
+    Created on first use so forked server workers never inherit a parent's threads.
+    """
+    config = (
+        getattr(settings, 'PASSWORD_HASH_WORKERS', 0),
+        getattr(settings, 'PASSWORD_HASH_QUEUE', 0),
+        getattr(settings, 'PASSWORD_HASH_TIMEOUT', 5.0),
+        getattr(settings, 'PASSWORD_HASH_EXECUTOR', 'thread'),
+        getattr(settings, 'PASSWORD_HASH_NICE', 0),
+    )
+    if not config[0]:
+        return None
+    pool = _pools.get(config)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(config)
+            if pool is None:
+                pool = _pools[config] = HashPool(*config)
+    return pool
+
+
+def hash_pool_stats():
+    stats = {"completed": 0, "rejected": 0, "timeouts": 0}
+    for pool in list(_pools.values()):
+        for key, value in pool.stats.items():
+            stats[key] += value
+    return stats
+
+
+def reset_hash_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown()
+        _pools.clear()
+
+
+def verify_password(user, password):
+    """
+    user.check_password() through the pool. Upgrades the stored hash when the hasher or its
+    work factor changed, like check_password's setter. Raises HashPoolBusy when saturated.
+    """
+    pool = get_hash_pool()
+    if pool is None:
+        return user.check_password(password)
+    is_correct, must_update = pool.run(_verify, password, user.password)
+    if is_correct and must_update:
+        user.password = pool.run(hashers.make_password, password)
+        user.save(update_fields=['password'])
+    return is_correct
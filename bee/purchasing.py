@@ -0,0 +1,121 @@
+"""
+PurchaseOrder.total_amount, kept equal to the sum of its items' quantity * price.
+
+Item saves and deletes move the order total by the line's change with an F() update, in the
+same transaction as the item write (PurchaseOrderItem.save runs in atomic(); Django already
+deletes inside one). Concurrent writers to one order only add and subtract, so they never
+overwrite each other. Writes that skip signals (bulk_create, queryset.update()) must call
+add_to_totals themselves; manage.py reconcile_po_totals repairs any drift.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, QuerySet, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import PurchaseOrder, PurchaseOrderItem
+
+ZERO = Decimal('0.00')
+AMOUNT = DecimalField(max_digits=12, decimal_places=2)
+LINE_TOTAL = ExpressionWrapper(F('quantity') * F('price'), output_field=AMOUNT)
+
+
+def line_total(quantity, price):
+    if quantity is None or price is None:
+        return ZERO
+    return Decimal(quantity) * Decimal(str(price))
+
+
+def add_to_totals(deltas):
+    """
+    Applies {purchase_order_id: amount} with one UPDATE ... SET total_amount = total_amount + x per order.
+    """
+    now = timezone.now()
+    for order_id, delta in sorted(deltas.items(), key=lambda item: str(item[0])):
+        if order_id is not None and delta:
+            PurchaseOrder.objects.filter(pk=order_id).update(total_amount=F('total_amount') + delta, updated_at=now)
+
+
+def with_item_totals(queryset):
+    """
+    Annotates item_count and items_total (sum of line totals) in the same query.
+    """
+    return queryset.annotate(
+        item_count=Count('items'),
+        items_total=Coalesce(Sum(F('items__quantity') * F('items__price'), output_field=AMOUNT), ZERO, output_field=AMOUNT),
+    )
+
+
+def computed_totals(order_ids):
+    """
+    {purchase_order_id: sum of line totals} straight from the items, for orders that have any.
+    """
+    rows = (
+        PurchaseOrderItem.objects.filter(purchase_order_id__in=order_ids)
+        .order_by()
+        .values('purchase_order_id')
+        .annotate(total=Sum(LINE_TOTAL))
+    )
+    return {row['purchase_order_id']: row['total'].quantize(ZERO) for row in rows}
+
+
+def reconcile_totals(order_ids):
+    """
+    Recomputes the given orders' totals under row locks, so in-flight item deltas either
+    land before the recount or wait for it. Returns the orders whose total was wrong.
+    """
+    with transaction.atomic():
+        orders = list(
+            PurchaseOrder.objects.select_for_update().filter(pk__in=order_ids).order_by('pk').only('pk', 'total_amount')
+        )
+        computed = computed_totals([order.pk for order in orders])
+        drifted = []
+        now = timezone.now()
+        for order in orders:
+            expected = computed.get(order.pk, ZERO)
+            if order.total_amount != expected:
+                order.total_amount = expected
+                order.updated_at = now
+                drifted.append(order)
+        PurchaseOrder.objects.bulk_update(drifted, ['total_amount', 'updated_at'])
+    return drifted
+
+
+@receiver(post_init, sender=PurchaseOrderItem)
+def remember_line(sender, instance, **kwargs):
+    values = instance.__dict__
+    if 'quantity' in values and 'price' in values and 'purchase_order_id_id' in values:
+        instance._po_line = (values['purchase_order_id_id'], line_total(values['quantity'], values['price']))
+    else:
+        instance._po_line = None
+
+
+@receiver(pre_save, sender=PurchaseOrderItem)
+def load_unknown_line(sender, instance, **kwargs):
+    # Loaded with deferred fields: read what the row held before this save
+    if instance._po_line is None and not instance._state.adding:
+        old = PurchaseOrderItem.objects.filter(pk=instance.pk).values('purchase_order_id', 'quantity', 'price').first()
+        instance._po_line = (old['purchase_order_id'], line_total(old['quantity'], old['price'])) if old else (None, ZERO)
+
+
+@receiver(post_save, sender=PurchaseOrderItem)
+def move_order_total(sender, instance, created, **kwargs):
+    old_order, old_total = (None, ZERO) if created or instance._po_line is None else instance._po_line
+    new_total = line_total(instance.quantity, instance.price)
+    deltas = defaultdict(Decimal)
+    deltas[old_order] -= old_total
+    deltas[instance.purchase_order_id_id] += new_total
+    add_to_totals(deltas)
+    instance._po_line = (instance.purchase_order_id_id, new_total)
+
+
+@receiver(post_delete, sender=PurchaseOrderItem)
+def subtract_deleted_line(sender, instance, origin=None, **kwargs):
+    # Deleting the order itself cascades to its items; there is no total left to keep
+    if isinstance(origin, PurchaseOrder) or (isinstance(origin, QuerySet) and origin.model is PurchaseOrder):
+        return
+    add_to_totals({instance.purchase_order_id_id: -line_total(instance.quantity, instance.price)})
@@ -0,0 +1,122 @@
+"""
+Stock changes on Inventory. Reservations: reserve moves quantity from quantity_available to
+quantity_reserved, commit consumes the reserved quantity and release/expire puts it back.
+adjust_stock adds received stock or writes it off. Nothing else changes the counters of an
+existing row: the inventory serializers only set them when the row is created.
+
+Every stock change goes through bee.availability.apply_stock_deltas: a conditional F()
+UPDATE per Inventory row and an F() UPDATE of the product's availability summary in the
+same transaction, so concurrent checkouts never read-modify-write the counters. Rows are
+always touched in primary-key order, which keeps multi-line reservations from deadlocking
+each other.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .availability import apply_stock_deltas
+from .models import Inventory, StockReservation, StockReservationItem
+
+
+class InsufficientStock(Exception):
+    def __init__(self, inventory_id, requested):
+        self.inventory_id = inventory_id
+        self.requested = requested
+        super().__init__(f"Not enough stock for inventory {inventory_id} (requested {requested})")
+
+
+class ReservationNotActive(Exception):
+    pass
+
+
+def merge_lines(lines):
+    """
+    Sums quantities per inventory id and returns the lines sorted by inventory id.
+    """
+    totals = Counter()
+    for inventory_id, quantity in lines:
+        totals[inventory_id] += quantity
+    return sorted(totals.items(), key=lambda line: str(line[0]))
+
+
+def reserve(lines, user_id=None, ttl=None):
+    """
+    Reserves every (inventory_id, quantity) line in one transaction, or none of them.
+    Raises InsufficientStock for the first line that cannot be covered.
+    """
+    now = timezone.now()
+    ttl = ttl if ttl is not None else getattr(settings, 'STOCK_RESERVATION_TTL', 900)
+    merged = merge_lines(lines)
+    with transaction.atomic():
+        short = apply_stock_deltas({inventory_id: (-quantity, quantity) for inventory_id, quantity in merged})
+        if short is not None:
+            raise InsufficientStock(short, dict(merged)[short])
+
+        reservation = StockReservation.objects.create(user_id=user_id, expires_at=now + timedelta(seconds=ttl))
+        StockReservationItem.objects.bulk_create(
+            StockReservationItem(reservation=reservation, inventory_id=inventory_id, quantity=quantity)
+            for inventory_id, quantity in merged
+        )
+    return reservation
+
+
+def adjust_stock(lines):
+    """
+    Adds each (inventory_id, delta) line to quantity_available in one transaction, or none
+    of them. A negative delta can only take what is available, never reserved units; the
+    first line that cannot be covered raises InsufficientStock.
+    """
+    merged = merge_lines(lines)
+    with transaction.atomic():
+        short = apply_stock_deltas({inventory_id: (delta, 0) for inventory_id, delta in merged})
+        if short is not None:
+            raise InsufficientStock(short, -dict(merged)[short])
+
+
+def _finish(reservation_id, status, restock, unexpired=False):
+    """
+    Moves an active reservation to `status` and settles its reserved quantities.
+    The status change is itself a conditional UPDATE, so only one caller wins.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        claim = StockReservation.objects.filter(pk=reservation_id, status='active')
+        if unexpired:
+            claim = claim.filter(expires_at__gt=now)
+        if not claim.update(status=status, updated_at=now):
+            raise ReservationNotActive(reservation_id)
+
+        items = StockReservationItem.objects.filter(reservation_id=reservation_id).values_list('inventory_id', 'quantity')
+        apply_stock_deltas({
+            inventory_id: (quantity if restock else 0, -quantity) for inventory_id, quantity in merge_lines(items)
+        })
+
+
+def commit(reservation_id):
+    """
+    Consumes the reserved stock. Fails once the reservation has expired, even before the sweep.
+    """
+    _finish(reservation_id, 'committed', restock=False, unexpired=True)
+
+
+def release(reservation_id):
+    _finish(reservation_id, 'released', restock=True)
+
+
+def expire_reservations(batch_size=500):
+    """
+    Returns stock held by active reservations past expires_at. Returns the number expired.
+    """
+    expired = 0
+    due = StockReservation.objects.filter(status='active', expires_at__lte=timezone.now()).order_by('expires_at')
+    for reservation_id in list(due.values_list('pk', flat=True)[:batch_size]):
+        try:
+            _finish(reservation_id, 'expired', restock=True)
+        except ReservationNotActive:
+            # Committed or released concurrently
+            continue
+        expired += 1
+    return expired
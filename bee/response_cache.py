@@ -0,0 +1,167 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import Brand, Category, Product, Variant
+
+_lock = threading.Lock()
+_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+
+def get_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'catalog')]
+
+
+def _generation_key(resource):
+    return f"catalog:{resource}:generation"
+
+
+def _fresh_generation():
+    # Never a value used before, so a generation key lost to culling or a cache restart
+    # cannot bring back responses cached under an older generation
+    return time.time_ns()
+
+
+def generation(resource):
+    cache = get_cache()
+    value = cache.get(_generation_key(resource))
+    if value is None:
+        cache.add(_generation_key(resource), _fresh_generation(), None)
+        value = cache.get(_generation_key(resource))
+    return value
+
+
+def invalidate(*resources):
+    """
+    Bumps the generation of each resource so every cached response for it stops matching.
+    The generation lives in the catalog cache, so this reaches every worker sharing it.
+    """
+    cache = get_cache()
+    for resource in resources:
+        try:
+            cache.incr(_generation_key(resource))
+        except ValueError:
+            cache.set(_generation_key(resource), _fresh_generation(), None)
+
+
+def cache_key(resource, request):
+    query = request.GET.urlencode() if request.GET else ''
+    digest = hashlib.md5(f"{request.path}?{query}".encode()).hexdigest()
+    return f"catalog:{resource}:{generation(resource)}:{digest}"
+
+
+def bypasses_cache(request):
+    """
+    Streaming exports and ?expand= responses (which embed other resources) are never
+    cached or answered with 304.
+    """
+    return bool(request.GET.get('stream') or request.GET.get('expand'))
+
+
+def _record(endpoint, outcome):
+    with _lock:
+        _stats[endpoint][outcome] += 1
+
+
+def cache_stats():
+    with _lock:
+        return {endpoint: dict(counts) for endpoint, counts in _stats.items()}
+
+
+def cached_get(resource):
+    """
+    Caches the pre-rendered JSON bytes of a successful GET handler, keyed by URL and query params.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if bypasses_cache(request):
+                return method(self, request, *args, **kwargs)
+
+            endpoint = type(self).__name__
+            cache = get_cache()
+            key = cache_key(resource, request)
+            content = cache.get(key)
+            if content is not None:
+                _record(endpoint, "hits")
+                return HttpResponse(content, content_type='application/json')
+
+            _record(endpoint, "misses")
+            response = method(self, request, *args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                content = JSONRenderer().render(response.data)
+                cache.set(key, content, getattr(settings, 'CATALOG_CACHE_TTL', 300))
+                return HttpResponse(content, content_type='application/json')
+            return response
+        return wrapper
+    return decorator
+
+
+def acached_get(resource):
+    """
+    cached_get for the native async catalog views (bee.async_views).
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            match = request.resolver_match
+            endpoint = f"async:{match.route if match else resource}"
+            cache = get_cache()
+            key = await sync_to_async(cache_key)(resource, request)
+            content = await cache.aget(key)
+            if content is not None:
+                _record(endpoint, "hits")
+                return HttpResponse(content, content_type='application/json')
+
+            _record(endpoint, "misses")
+            response = await view(request, *args, **kwargs)
+            if response.status_code == 200:
+                await cache.aset(key, response.content, getattr(settings, 'CATALOG_CACHE_TTL', 300))
+            return response
+        return wrapper
+    return decorator
+
+
+# Deleting a brand or category SET_NULLs product FKs without product signals.
+@receiver(post_save, sender=Category)
+def invalidate_categories(sender, **kwargs):
+    invalidate('categories')
+
+
+@receiver(post_delete, sender=Category)
+def invalidate_deleted_category(sender, **kwargs):
+    invalidate('categories', 'products')
+
+
+@receiver(post_save, sender=Brand)
+def invalidate_brands(sender, **kwargs):
+    invalidate('brands')
+
+
+@receiver(post_delete, sender=Brand)
+def invalidate_deleted_brand(sender, **kwargs):
+    invalidate('brands', 'products')
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_products(sender, **kwargs):
+    invalidate('products')
+
+
+# Product lists can be filtered by variant attributes (bee.facets)
+@receiver(post_save, sender=Variant)
+@receiver(post_delete, sender=Variant)
+def invalidate_variant_products(sender, **kwargs):
+    invalidate('products')
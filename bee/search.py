@@ -0,0 +1,373 @@
+"""
+In-process product search: an inverted index over product name, SKU, brand name and
+category name with prefix and one-typo matching and BM25 ranking.
+
+Each process builds the index lazily on first search (bee.indexing.CatalogIndex).
+Product/Brand/Category signals apply this process's writes immediately. Writes made
+elsewhere (other workers, bulk endpoints, queryset updates) are picked up by sync(), which
+at most every SEARCH_INDEX_SYNC_SECONDS reindexes rows whose updated_at moved past the
+database watermark and drops products deleted since (ProductTombstone).
+"""
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .indexing import CatalogIndex
+from .models import Brand, Category, Product
+
+TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+# field: weight of one occurrence in the document's term frequency
+FIELD_WEIGHTS = {'name': 3.0, 'sku': 2.0, 'brand': 1.0, 'category': 1.0}
+PREFIX_WEIGHT = 0.8
+TYPO_WEIGHT = 0.6
+MAX_PREFIX_EXPANSIONS = 50
+MAX_QUERY_TOKENS = 8
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def one_deletes(term):
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def term_frequencies(fields):
+    frequencies = defaultdict(float)
+    for field, text in fields.items():
+        weight = FIELD_WEIGHTS.get(field, 1.0)
+        for token in tokenize(text):
+            frequencies[token] += weight
+        if field == 'sku' and text:
+            frequencies[text.lower()] += weight
+    return frequencies
+
+
+class SearchIndex:
+    """
+    Thread-safe BM25 inverted index keyed by arbitrary document keys.
+
+    Postings store each document's precomputed BM25 term impact (length-normalised tf), so a
+    query only multiplies by idf. Each term's postings are ranked by impact on first use
+    (and again after a write touches the term), so single-token top-k reads a prefix and
+    multi-token queries walk the rarest token best first, stopping early (threshold algorithm).
+    Typo candidates come from a delete-neighbourhood map (every alphabetic term and its
+    one-character deletions point back to the term), so a lookup touches a handful of keys.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.postings = {}             # term -> {doc: impact}
+            self.terms = []                # sorted vocabulary, for prefix ranges
+            self.pending_terms = []        # added since the last sort
+            self.neighbours = defaultdict(set)
+            self.keys = []                 # doc -> key
+            self.docs = {}                 # key -> doc
+            self.doc_terms = {}            # doc -> [terms]
+            self.free = []
+            self.average_length = None     # fixed at load(); keeps stored impacts comparable
+            self.ranked = {}               # term -> docs by impact, best first (built on demand)
+            self.best_impact = {}          # term -> highest impact in its postings
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def load(self, documents):
+        """
+        Replaces the index with (key, fields) documents, normalising against their average length.
+        """
+        prepared = [(key, term_frequencies(fields)) for key, fields in documents]
+        with self._lock:
+            self.clear()
+            if prepared:
+                self.average_length = sum(sum(f.values()) for _, f in prepared) / len(prepared) or 1.0
+            for key, frequencies in prepared:
+                self._insert(key, frequencies)
+            self._sort_terms()
+
+    def add(self, key, fields):
+        """
+        Indexes (or re-indexes) a document from {field: text}.
+        """
+        frequencies = term_frequencies(fields)
+        with self._lock:
+            self.remove(key)
+            if self.average_length is None:
+                self.average_length = sum(frequencies.values()) or 1.0
+            self._insert(key, frequencies)
+
+    def _insert(self, key, frequencies):
+        if self.free:
+            doc = self.free.pop()
+            self.keys[doc] = key
+        else:
+            doc = len(self.keys)
+            self.keys.append(key)
+        self.docs[key] = doc
+        self.doc_terms[doc] = list(frequencies)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * sum(frequencies.values()) / self.average_length)
+        for term, frequency in frequencies.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                self._add_term(term)
+            postings[doc] = frequency * (BM25_K1 + 1) / (frequency + norm)
+            self._changed(term)
+
+    def remove(self, key):
+        with self._lock:
+            doc = self.docs.pop(key, None)
+            if doc is None:
+                return
+            for term in self.doc_terms.pop(doc):
+                postings = self.postings[term]
+                del postings[doc]
+                self._changed(term)
+                if not postings:
+                    del self.postings[term]
+                    self._remove_term(term)
+            self.keys[doc] = None
+            self.free.append(doc)
+
+    def _add_term(self, term):
+        self.pending_terms.append(term)
+        # Typo matching is for words; SKUs and numbers stay exact/prefix only
+        if len(term) >= 3 and term.isalpha():
+            for variant in one_deletes(term) | {term}:
+                self.neighbours[variant].add(term)
+
+    def _remove_term(self, term):
+        self._sort_terms()
+        del self.terms[bisect_left(self.terms, term)]
+        if len(term) >= 3 and term.isalpha():
+            for variant in one_deletes(term) | {term}:
+                self.neighbours[variant].discard(term)
+                if not self.neighbours[variant]:
+                    del self.neighbours[variant]
+
+    def _sort_terms(self):
+        if len(self.pending_terms) < 64:
+            for term in self.pending_terms:
+                insort(self.terms, term)
+        else:
+            self.terms.extend(self.pending_terms)
+            self.terms.sort()
+        self.pending_terms = []
+
+    def expand(self, token):
+        """
+        {term: weight} for a query token: the exact term, vocabulary terms it prefixes,
+        and words one edit away.
+        """
+        matches = {}
+        if token in self.postings:
+            matches[token] = 1.0
+        if len(token) >= 2:
+            start = bisect_left(self.terms, token)
+            for term in self.terms[start:start + MAX_PREFIX_EXPANSIONS]:
+                if not term.startswith(token):
+                    break
+                matches.setdefault(term, PREFIX_WEIGHT)
+        if len(token) >= 4 and token.isalpha():
+            for variant in one_deletes(token) | {token}:
+                for term in self.neighbours.get(variant, ()):
+                    matches.setdefault(term, TYPO_WEIGHT)
+        return matches
+
+    def _changed(self, term):
+        self.ranked.pop(term, None)
+        self.best_impact.pop(term, None)
+
+    def _ranked(self, term):
+        ranked = self.ranked.get(term)
+        if ranked is None:
+            postings = self.postings[term]
+            ranked = self.ranked[term] = sorted(postings, key=postings.__getitem__, reverse=True)
+        return ranked
+
+    def _best_impact(self, term):
+        best = self.best_impact.get(term)
+        if best is None:
+            best = self.best_impact[term] = max(self.postings[term].values())
+        return best
+
+    def _weighted_terms(self, token, count):
+        """
+        [(term, postings, weight * idf)] for every term a query token expands to.
+        """
+        weighted = []
+        for term, weight in self.expand(token).items():
+            postings = self.postings[term]
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            weighted.append((term, postings, weight * idf))
+        return weighted
+
+    @staticmethod
+    def _score(weighted, doc):
+        best = 0.0
+        for _, postings, factor in weighted:
+            impact = postings.get(doc)
+            if impact is not None and impact * factor > best:
+                best = impact * factor
+        return best
+
+    def _top(self, weighted, limit):
+        # The best `limit` docs overall are among the best `limit` of each expansion
+        candidates = set()
+        for term, _, _ in weighted:
+            candidates.update(self._ranked(term)[:limit])
+        return candidates
+
+    def _stream(self, weighted):
+        """
+        (upper bound, doc) for every doc of a token, in descending order of that token's score.
+        """
+        def scored(term, postings, factor):
+            for doc in self._ranked(term):
+                yield postings[doc] * factor, doc
+
+        return heapq.merge(*(scored(*entry) for entry in weighted), reverse=True)
+
+    def _all_tokens(self, weighted, limit):
+        """
+        Top documents containing every token (threshold algorithm): walk the rarest token's
+        docs best first and stop once no unseen doc can beat the current top `limit`.
+        """
+        rarest, rest = weighted[0], weighted[1:]
+        rest_bound = sum(max(self._best_impact(term) * factor for term, _, factor in w) for w in rest)
+        top, seen = [], set()
+        for upper, doc in self._stream(rarest):
+            if len(top) >= limit and top[0][0] >= upper + rest_bound:
+                break
+            if doc in seen:
+                continue
+            seen.add(doc)
+            total = upper
+            for other in rest:
+                score = self._score(other, doc)
+                if not score:
+                    break
+                total += score
+            else:
+                entry = (total, doc)
+                if len(top) < limit:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+        return {doc: (len(weighted), score) for score, doc in top}
+
+    def search(self, query, limit=20):
+        """
+        Returns [(key, score)] best first. Documents matching every query token rank first;
+        if there are fewer than `limit` of those, the best partial matches follow.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TOKENS]
+        with self._lock:
+            count = len(self.doc_terms)
+            if not tokens or not count:
+                return []
+            if self.pending_terms:
+                self._sort_terms()
+            weighted = [self._weighted_terms(token, count) for token in tokens]
+            weighted = sorted((w for w in weighted if w), key=lambda w: sum(len(p) for _, p, _ in w))
+            if not weighted:
+                return []
+
+            scores = {}
+            if len(weighted) == len(tokens):
+                if len(weighted) == 1:
+                    scores = {doc: (1, self._score(weighted[0], doc)) for doc in self._top(weighted[0], limit)}
+                else:
+                    scores = self._all_tokens(weighted, limit)
+
+            if len(scores) < limit:
+                partial = set()
+                for token_weighted in weighted:
+                    partial.update(self._top(token_weighted, limit))
+                for doc in partial - scores.keys():
+                    token_scores = [self._score(w, doc) for w in weighted]
+                    scores[doc] = (sum(1 for score in token_scores if score), sum(token_scores))
+
+            ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(self.keys[doc], round(score, 4)) for doc, (_, score) in ranked]
+
+
+def product_fields(name, sku, brand, category):
+    return {'name': name, 'sku': sku, 'brand': brand, 'category': category}
+
+
+PRODUCT_COLUMNS = ('p_id', 'p_name', 'sku_name', 'brand_id__name', 'c_id__c_name')
+
+
+class ProductSearch(CatalogIndex):
+    sync_setting = 'SEARCH_INDEX_SYNC_SECONDS'
+    watermark_models = (Product, Brand, Category)
+
+    def new_index(self):
+        return SearchIndex()
+
+    def load(self, index):
+        rows = Product.objects.order_by().values_list(*PRODUCT_COLUMNS).iterator(chunk_size=5000)
+        index.load((p_id, product_fields(name, sku, brand, category)) for p_id, name, sku, brand, category in rows)
+
+    def index_rows(self, queryset):
+        for p_id, name, sku, brand, category in queryset.values_list(*PRODUCT_COLUMNS).iterator(chunk_size=5000):
+            self.index.add(p_id, product_fields(name, sku, brand, category))
+
+    def catch_up(self, since):
+        brands = list(Brand.objects.filter(updated_at__gte=since).values_list('pk', flat=True))
+        categories = list(Category.objects.filter(updated_at__gte=since).values_list('pk', flat=True))
+        self.index_rows(Product.objects.filter(updated_at__gte=since).order_by())
+        if brands:
+            self.index_rows(Product.objects.filter(brand_id__in=brands).order_by())
+        if categories:
+            self.index_rows(Product.objects.filter(c_id__in=categories).order_by())
+
+    def search(self, query, limit=20):
+        self.sync()
+        return self.index.search(query, limit)
+
+
+product_search = ProductSearch()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    product_search.reindex(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    product_search.index.remove(instance.pk)
+
+
+@receiver(post_save, sender=Brand)
+def reindex_brand_products(sender, instance, created, **kwargs):
+    if not created:
+        product_search.reindex(Product.objects.filter(brand_id=instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, **kwargs):
+    if not created:
+        product_search.reindex(Product.objects.filter(c_id=instance.pk))
+
+
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Category)
+def reindex_detached_products(sender, instance, **kwargs):
+    # Collected and stamped for other processes by bee.models.touch_detached_products
+    product_search.reindex(Product.objects.filter(pk__in=getattr(instance, '_detached_products', [])))
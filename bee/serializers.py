@@ -1,9 +1,16 @@
 # serializers.py
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max, Prefetch
+from django.db.models.functions import Length
 from .models import *
-import random
-from rest_framework_simplejwt.tokens import RefreshToken
+from .mail import queue_email
+from .otp import ExpiredOTP, InvalidOTP, get_otp_store
+from .passwords import verify_password
+from .purchasing import ZERO, line_total, with_item_totals
+from .tokens import issue_tokens
+from django.conf import settings
 from django.contrib.auth import get_user_model, authenticate
 
 User = get_user_model()
@@ -18,8 +25,9 @@ class RegisterSerializer(serializers.Serializer):
             raise serializers.ValidationError("Email already exists.")
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
-        user = User.objects.create(
+        user = User(
             full_name=validated_data['full_name'],
             email=validated_data['email'],
             username=validated_data['email'],  
@@ -28,17 +36,13 @@ class RegisterSerializer(serializers.Serializer):
         user.set_password(validated_data['password'])
         user.save()
 
-        
-        otp_code = str(random.randint(100000, 999999))
-        OTP.objects.update_or_create(user=user, defaults={'otp_code': otp_code})
 
-        
-        from django.core.mail import send_mail
-        from django.conf import settings
+        otp_code = get_otp_store().issue(user)
 
+        # Delivered by the send_queued_emails worker, outside the request
         subject = 'Your OTP for Registration'
-        message = f'Your OTP is {otp_code}. It will expire in 5 minutes.'
-        send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email])
+        message = f'Your OTP is {otp_code}. It will expire in {settings.OTP_TTL_SECONDS // 60} minutes.'
+        queue_email(subject, message, user.email)
 
         return user
 
@@ -47,35 +51,27 @@ class VerifyOTPSerializer(serializers.Serializer):
     otp = serializers.CharField(max_length=6)
 
     def validate(self, data):
-        email = data['email']
-        otp = data['otp']
-
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            raise serializers.ValidationError("User not found.")
-
         try:
-            otp_obj = OTP.objects.get(user=user, otp_code=otp)
-        except OTP.DoesNotExist:
-            raise serializers.ValidationError("Invalid OTP.")
-
-        if otp_obj.is_expired():
-            otp_obj.delete()
+            data['user'] = get_otp_store().verify(data['email'], data['otp'])
+        except ExpiredOTP:
             raise serializers.ValidationError("OTP has expired.")
-        
-        try:
-            user_role = Role.objects.get(name='user')
-            user.role = user_role
-        except Role.DoesNotExist:
-            raise serializers.ValidationError("User role not found.")
-
+        except InvalidOTP:
+            raise serializers.ValidationError("Invalid OTP.")
+        return data
 
+    def create(self, validated_data):
+        """
+        Activates the verified user, keeping the role they already have.
+        """
+        user = validated_data['user']
+        fields = ['is_active', 'profile_verified', 'updated_at']
+        if user.role_id is None:
+            user.role = Role.objects.filter(name='user').first()
+            fields.append('role')
         user.is_active = True
-        user.save()
-        otp_obj.delete()  
-
-        return data
+        user.profile_verified = True
+        user.save(update_fields=fields)
+        return user
     
     
 class LoginSerializer(serializers.Serializer):
@@ -88,36 +84,24 @@ class LoginSerializer(serializers.Serializer):
 
         try:
             
-            user = User.objects.get(email=email)
+            user = User.objects.select_related('role').get(email=email)
         except User.DoesNotExist:
             raise serializers.ValidationError("Invalid email or password.")
 
-        
-        if not user.check_password(password):
+        # Hashed in bee.passwords' bounded pool; HashPoolBusy propagates to the view as a 429
+        if not verify_password(user, password):
             raise serializers.ValidationError("Invalid email or password.")
 
         
         if not user.is_active:
             raise serializers.ValidationError("User account is not active.")
 
-        
-        refresh = RefreshToken.for_user(user)
-        access_token = refresh.access_token
-
-        
-        access_token["user_id"] = str(user.id)
-        access_token["email"] = user.email
-        access_token["full_name"] = user.full_name or ""
-        access_token["phone"] = user.phone or ""
-        access_token["dob"] = user.dob.isoformat() if user.dob else None
-        access_token["gender"] = user.gender or ""
-        access_token["is_seller"] = user.is_seller
-        access_token["role"] = user.role.name if user.role else None
-        access_token["profile_verified"] = True
+        # Compact authorization claims only; see bee.tokens
+        access_token, refresh_token = issue_tokens(user)
 
         data["user"] = user
-        data["refresh"] = str(refresh)
-        data["access"] = str(access_token)
+        data["refresh"] = refresh_token
+        data["access"] = access_token
 
         return data
     
@@ -133,10 +117,76 @@ class UserProfileSerializer(serializers.ModelSerializer):
         
         
 
+class ExpandableSerializerMixin:
+    """
+    Declares the queryset plan a serializer needs (Meta.select_related / Meta.prefetch_related)
+    and which relations ?expand= may inline, so a list renders in a fixed number of queries.
+    Only the top-level serializer expands; inlined serializers render their own plain fields.
+    """
+
+    @classmethod
+    def expandable_fields(cls):
+        """
+        {field name: (serializer class, 'select' | 'prefetch')}
+        """
+        return {}
+
+    @classmethod
+    def parse_expand(cls, value):
+        names = [name.strip() for name in (value or '').split(',') if name.strip()]
+        unknown = [name for name in names if name not in cls.expandable_fields()]
+        if unknown:
+            raise serializers.ValidationError({
+                "expand": f"Cannot expand {', '.join(unknown)}. Expandable: {', '.join(cls.expandable_fields()) or 'none'}."
+            })
+        return list(dict.fromkeys(names))
+
+    @classmethod
+    def query_plan(cls, queryset, expand=()):
+        queryset = queryset.select_related(*getattr(cls.Meta, 'select_related', ()))
+        queryset = queryset.prefetch_related(*getattr(cls.Meta, 'prefetch_related', ()))
+        for name in expand:
+            nested, join = cls.expandable_fields()[name]
+            if join == 'prefetch':
+                nested_queryset = nested.query_plan(nested.Meta.model.objects.all())
+                queryset = queryset.prefetch_related(Prefetch(name, queryset=nested_queryset))
+            else:
+                queryset = queryset.select_related(
+                    name, *(f"{name}__{related}" for related in getattr(nested.Meta, 'select_related', ()))
+                )
+        return queryset
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        is_top_level = parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+        if is_top_level:
+            for name in self.context.get('expand', ()):
+                nested, join = self.expandable_fields()[name]
+                fields[name] = nested(read_only=True, many=join == 'prefetch')
+        return fields
+
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = '__all__'
+        # path is internal; the tree endpoint reports depth instead
+        exclude = ['path']
+
+    def validate_parent_category(self, value):
+        if value is None:
+            return value
+        subtree_length = CATEGORY_PATH_SEGMENT_LENGTH
+        if self.instance is not None:
+            if value.path.startswith(self.instance.path):
+                raise serializers.ValidationError("A category cannot be moved under itself or its subcategories.")
+            deepest = Category.objects.filter(path__startswith=self.instance.path).aggregate(
+                deepest=Max(Length('path'))
+            )['deepest']
+            subtree_length = deepest - len(self.instance.path) + CATEGORY_PATH_SEGMENT_LENGTH
+        if len(value.path) + subtree_length > CATEGORY_PATH_MAX_LENGTH:
+            raise serializers.ValidationError("Category tree is too deep.")
+        return value
 
 
 class BrandSerializer(serializers.ModelSerializer):
@@ -145,17 +195,39 @@ class BrandSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductAvailabilitySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductAvailability
+        fields = ['total_available', 'total_reserved', 'min_price', 'warehouse_count', 'updated_at']
+
+
+class ProductSerializer(ExpandableSerializerMixin, serializers.ModelSerializer):
+    availability = ProductAvailabilitySerializer(read_only=True)
+
     class Meta:
         model = Product
         fields = '__all__'
+        select_related = ['availability']
 
+    @classmethod
+    def expandable_fields(cls):
+        return {
+            'c_id': (CategorySerializer, 'select'),
+            'brand_id': (BrandSerializer, 'select'),
+            'variants': (VariantSerializer, 'prefetch'),
+            'inventories': (InventorySerializer, 'prefetch'),
+        }
 
-class VariantSerializer(serializers.ModelSerializer):
+
+class VariantSerializer(ExpandableSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Variant
         fields = '__all__'
 
+    @classmethod
+    def expandable_fields(cls):
+        return {'product_id': (ProductSerializer, 'select')}
+
 
 class WarehouseSerializer(serializers.ModelSerializer):
     class Meta:
@@ -163,19 +235,245 @@ class WarehouseSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class InventorySerializer(serializers.ModelSerializer):
+class InventorySerializer(ExpandableSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Inventory
         fields = '__all__'
+        # Stock counters move only through bee.reservations; quantity_available can be set on create
+        read_only_fields = ['quantity_reserved']
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.instance is not None:
+            fields['quantity_available'].read_only = True
+        return fields
+
+    @classmethod
+    def expandable_fields(cls):
+        return {
+            'product_id': (ProductSerializer, 'select'),
+            'warehouse_id': (WarehouseSerializer, 'select'),
+        }
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    many=True serializer for the bulk endpoints and nested purchase order lines. Foreign keys
+    are checked with one IN query per field, the natural key (Meta.bulk_key, named by
+    serializer field) must be unique within the batch and, with context bulk_mode 'create',
+    must not exist yet. These checks also run on rows with field errors, so one response
+    reports every problem. Errors are returned as a list aligned with the input rows.
+    """
+
+    def to_internal_value(self, data):
+        try:
+            rows = super().to_internal_value(data)
+            errors = [{} for _ in rows]
+        except serializers.ValidationError as exc:
+            if not isinstance(exc.detail, list):
+                raise
+            rows, errors = None, [dict(error) for error in exc.detail]
+        meta = self.child.Meta
+        key = getattr(meta, 'bulk_key', ())
+        values = [self._checked_values(item) for item in data]
+
+        for field_name, related_model in getattr(meta, 'bulk_foreign_keys', {}).items():
+            ids = {row[field_name] for row in values if row.get(field_name)}
+            existing = set(related_model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+            for index, row in enumerate(values):
+                if row.get(field_name) and row[field_name] not in existing:
+                    errors[index].setdefault(field_name, []).append(
+                        f'Invalid pk "{row[field_name]}" - object does not exist.'
+                    )
+
+        keys = [tuple(row.get(name) for name in key) if key else None for row in values]
+        seen = {}
+        for index, value in enumerate(keys):
+            if value is None or None in value:
+                continue
+            if value in seen:
+                errors[index].setdefault('non_field_errors', []).append(
+                    f"Duplicate of row {seen[value]} in this batch."
+                )
+            seen.setdefault(value, index)
+
+        if key and self.context.get('bulk_mode') == 'create':
+            for index in self._existing_key_rows(key, keys):
+                errors[index].setdefault('non_field_errors', []).append(
+                    f"A row with this {', '.join(key)} already exists; use mode=upsert to update it."
+                )
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return rows
+
+    def _checked_values(self, item):
+        """
+        The foreign key and natural key values of one input row, as far as they parse.
+        """
+        meta = self.child.Meta
+        values = {}
+        if not isinstance(item, dict):
+            return values
+        for name in {*getattr(meta, 'bulk_foreign_keys', {}), *getattr(meta, 'bulk_key', ())}:
+            if item.get(name) is None:
+                continue
+            try:
+                values[name] = self.child.fields[name].run_validation(item[name])
+            except serializers.ValidationError:
+                continue
+        return values
+
+    def _existing_key_rows(self, key, keys):
+        model = self.child.Meta.model
+        attnames = [model._meta.get_field(self.child.fields[name].source).attname for name in key]
+        candidates = {value for value in keys if value is not None and None not in value}
+        if not candidates:
+            return []
+        # One IN query on the first key column; the rest is matched here
+        existing = set(
+            model.objects.order_by()
+            .filter(**{f"{attnames[0]}__in": {value[0] for value in candidates}})
+            .values_list(*attnames)
+        )
+        return [index for index, value in enumerate(keys) if value in existing]
+
+
+class PurchaseOrderLineSerializer(serializers.ModelSerializer):
+    """
+    One line of a nested purchase order create. All product ids are checked with one IN query.
+    """
+    product_id = serializers.UUIDField(source='product_id_id')
+
+    class Meta:
+        model = PurchaseOrderItem
+        fields = ['product_id', 'quantity', 'price']
+        list_serializer_class = BulkListSerializer
+        bulk_foreign_keys = {'product_id': Product}
+
 
+class PurchaseOrderSerializer(ExpandableSerializerMixin, serializers.ModelSerializer):
+    # From with_item_totals(); left out where the order was not loaded through query_plan
+    item_count = serializers.IntegerField(read_only=True)
+    items_total = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    items = PurchaseOrderLineSerializer(many=True, write_only=True, required=False, max_length=settings.BULK_MAX_ROWS)
 
-class PurchaseOrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = PurchaseOrder
         fields = '__all__'
+        # Maintained from the items by bee.purchasing
+        read_only_fields = ['total_amount']
 
+    @classmethod
+    def query_plan(cls, queryset, expand=()):
+        return with_item_totals(super().query_plan(queryset, expand))
+
+    def validate(self, data):
+        if self.instance is not None and 'items' in data:
+            raise serializers.ValidationError(
+                {"items": "Lines can only be sent with a new order; use /api/purchase-order-items/ to change them."}
+            )
+        return data
+
+    @transaction.atomic
+    def create(self, validated_data):
+        lines = [PurchaseOrderItem(**line) for line in validated_data.pop('items', [])]
+        # bulk_create skips the bee.purchasing signals, so the order starts with its final total
+        total = sum((line_total(line.quantity, line.price) for line in lines), ZERO)
+        order = super().create({**validated_data, 'total_amount': total})
+        for line in lines:
+            line.purchase_order_id = order
+        PurchaseOrderItem.objects.bulk_create(lines, batch_size=settings.BULK_BATCH_SIZE)
+        order.item_count, order.items_total = len(lines), total
+        return order
+
+
+class PurchaseOrderItemSerializer(ExpandableSerializerMixin, serializers.ModelSerializer):
+    line_total = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
 
-class PurchaseOrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = PurchaseOrderItem
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+    @classmethod
+    def expandable_fields(cls):
+        return {
+            'purchase_order_id': (PurchaseOrderSerializer, 'select'),
+            'product_id': (ProductSerializer, 'select'),
+        }
+
+
+# ---------------- BULK ----------------
+class ProductBulkSerializer(serializers.ModelSerializer):
+    c_id = serializers.UUIDField(source='c_id_id', required=False, allow_null=True)
+    brand_id = serializers.UUIDField(source='brand_id_id', required=False, allow_null=True)
+
+    class Meta:
+        model = Product
+        fields = ['p_name', 'sku_name', 'c_id', 'brand_id']
+        extra_kwargs = {'sku_name': {'validators': []}}
+        list_serializer_class = BulkListSerializer
+        bulk_foreign_keys = {'c_id': Category, 'brand_id': Brand}
+        bulk_key = ('sku_name',)
+
+
+class VariantBulkSerializer(serializers.ModelSerializer):
+    id = serializers.UUIDField(required=False)
+    product_id = serializers.UUIDField(source='product_id_id')
+
+    class Meta:
+        model = Variant
+        fields = ['id', 'product_id', 'size', 'color', 'gender']
+        list_serializer_class = BulkListSerializer
+        # Rows with an id update that variant, so the id must exist too
+        bulk_foreign_keys = {'product_id': Product, 'id': Variant}
+        bulk_key = ('id',)
+
+
+class InventoryBulkSerializer(serializers.ModelSerializer):
+    product_id = serializers.UUIDField(source='product_id_id')
+    warehouse_id = serializers.UUIDField(source='warehouse_id_id')
+
+    class Meta:
+        model = Inventory
+        # quantity_reserved is only moved by bee.reservations
+        fields = ['product_id', 'warehouse_id', 'actual_price', 'price', 'quantity_available']
+        validators = []
+        list_serializer_class = BulkListSerializer
+        bulk_foreign_keys = {'product_id': Product, 'warehouse_id': Warehouse}
+        bulk_key = ('product_id', 'warehouse_id')
+        # Opening stock for new rows; existing rows change stock through adjust_stock
+        bulk_insert_only = ('quantity_available',)
+
+
+# ---------------- RESERVATION ----------------
+class ReservationLineSerializer(serializers.Serializer):
+    inventory_id = serializers.UUIDField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class ReservationCreateSerializer(serializers.Serializer):
+    items = ReservationLineSerializer(many=True, allow_empty=False)
+
+
+class StockAdjustmentLineSerializer(serializers.Serializer):
+    inventory_id = serializers.UUIDField()
+    delta = serializers.IntegerField()
+
+
+class StockAdjustmentSerializer(serializers.Serializer):
+    items = StockAdjustmentLineSerializer(many=True, allow_empty=False, max_length=settings.BULK_MAX_ROWS)
+
+
+class StockReservationItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockReservationItem
+        fields = ['inventory', 'quantity']
+
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    items = StockReservationItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = StockReservation
+        fields = ['id', 'user', 'status', 'expires_at', 'items', 'created_at', 'updated_at']
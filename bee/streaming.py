@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+from .pagination import keyset_after
+
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def iterate_in_chunks(queryset, chunk_size):
+    """
+    Yields every row of the queryset in (created_at, pk) order, one keyset chunk at a time.
+    MySQLdb buffers a whole result set client-side, so a single iterator() would not keep
+    memory flat there; chunking by key does on every backend.
+    """
+    queryset = queryset.order_by('created_at', 'pk')
+    last = None
+    while True:
+        chunk = queryset
+        if last is not None:
+            chunk = keyset_after(chunk, last.created_at, last.pk)
+        count = 0
+        for obj in chunk[:chunk_size].iterator(chunk_size=chunk_size):
+            count += 1
+            last = obj
+            yield obj
+        if count < chunk_size:
+            return
+
+
+def stream_rows(queryset, serializer_class, fmt, chunk_size, context=None):
+    serializer = serializer_class(context=context or {})
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    buffer = []
+    first = True
+    if fmt == 'json':
+        yield '['
+    for obj in iterate_in_chunks(queryset, chunk_size):
+        row = encoder.encode(serializer.to_representation(obj))
+        if fmt == 'ndjson':
+            buffer.append(row + '\n')
+        else:
+            buffer.append(row if first else ',' + row)
+        first = False
+        if len(buffer) >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+    if fmt == 'json':
+        yield ']'
+
+
+def stream_response(queryset, serializer_class, fmt, context=None):
+    """
+    Streams the whole queryset as NDJSON (one object per line) or as a chunked JSON array.
+    """
+    chunk_size = getattr(settings, 'STREAM_CHUNK_SIZE', 2000)
+    return StreamingHttpResponse(
+        stream_rows(queryset, serializer_class, fmt, chunk_size, context),
+        content_type=STREAM_FORMATS[fmt],
+    )
@@ -1,3 +1,1288 @@
-from django.test import TestCase
+import base64
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, parse_qsl, urlsplit
 
-# Create your tests here.
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import mail
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import AsyncClient, Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken as SimpleRefreshToken
+
+from . import async_views, metrics, oauth
+from .availability import compute_availability
+from .auth import ClaimsUser, CookieJWTAuthentication
+from .facets import ProductFacets
+from .management.commands._seed import CatalogSizes, seed_catalog
+from .management.commands.bench_api import compare
+from .mail import claim_emails, deliver_queued_emails, queue_email, record_result
+from .middleware import QueryProfilingMiddleware
+from .models import (
+    OTP, Brand, Category, Inventory, OutboundEmail, Product, ProductAvailability, PurchaseOrder, PurchaseOrderItem, Role,
+    User, Variant, Warehouse,
+)
+from .otp import get_otp_store
+from .passwords import HashPool, HashPoolBusy, reset_hash_pools, verify_password
+from .purchasing import reconcile_totals
+from .response_cache import generation
+from .reservations import InsufficientStock, adjust_stock, commit, release, reserve
+from .search import ProductSearch
+from .throttles import LoginIPThrottle
+from .tokens import ROLE_CLAIM, AccessToken, issue_tokens
+from .utils import _admin_cache, is_admin_from_token
+from .views import (
+    BrandDetailAPIView, BrandListCreateAPIView, InventoryDetailAPIView, InventoryListCreateAPIView, ProductDetailAPIView,
+    ProductListCreateAPIView, PurchaseOrderItemDetailAPIView, PurchaseOrderItemListCreateAPIView,
+    PurchaseOrderListCreateAPIView, VariantDetailAPIView, VariantListCreateAPIView,
+)
+
+
+def run_concurrently(func, count):
+    """
+    Runs func(index) on `count` threads released together; returns results and exceptions.
+    """
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(index):
+        try:
+            barrier.wait()
+            results[index] = func(index)
+        except Exception as exc:
+            results[index] = exc
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class StubOIDC:
+    """
+    A local OpenID provider: discovery, JWKS and a token endpoint that answers any code
+    with a signed ID token for code@example.com. Counts requests and client connections.
+    Tokens are signed with signing_key, the published key unless a test replaces it.
+    """
+
+    def __init__(self, delay=0.0):
+        self.key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.signing_key = self.key
+        self.kid = uuid.uuid4().hex
+        self.delay = delay
+        self.hits = Counter()
+        self.connections = set()
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, body, max_age=None):
+                content = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                if max_age:
+                    self.send_header('Cache-Control', f'public, max-age={max_age}')
+                self.end_headers()
+                self.wfile.write(content)
+
+            def record(self):
+                with stub.lock:
+                    stub.hits[self.path.split('?')[0]] += 1
+                    stub.connections.add(self.client_address)
+
+            def do_GET(self):
+                self.record()
+                if self.path == '/.well-known/openid-configuration':
+                    self.send_json({
+                        'issuer': stub.issuer,
+                        'token_endpoint': f'{stub.issuer}/token',
+                        'jwks_uri': f'{stub.issuer}/jwks',
+                        'id_token_signing_alg_values_supported': ['RS256'],
+                    }, max_age=3600)
+                elif self.path == '/jwks':
+                    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(stub.key.public_key()))
+                    self.send_json({'keys': [{**jwk, 'kid': stub.kid, 'alg': 'RS256', 'use': 'sig'}]}, max_age=3600)
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                self.record()
+                form = parse_qs(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode())
+                if stub.delay:
+                    time.sleep(stub.delay)
+                code = form.get('code', [''])[0]
+                now = int(time.time())
+                id_token = jwt.encode({
+                    'iss': stub.issuer, 'aud': form.get('client_id', [''])[0], 'sub': code,
+                    'email': f'{code}@example.com', 'email_verified': True, 'name': f'Bench {code}',
+                    'iat': now, 'exp': now + 3600,
+                }, stub.signing_key, algorithm='RS256', headers={'kid': stub.kid})
+                self.send_json({'access_token': 'unused', 'id_token': id_token, 'token_type': 'Bearer'})
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+            def handle_error(self, request, client_address):
+                # Clients that timed out hang up before the response is written
+                pass
+
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.issuer = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StockConcurrencyTests(TransactionTestCase):
+    STOCK = 10
+
+    def setUp(self):
+        product = Product.objects.create(p_name="Concurrent", sku_name="concurrent-1")
+        warehouse = Warehouse.objects.create(name="Main", address="Somewhere", type="store")
+        self.inventory = Inventory.objects.create(
+            product_id=product, warehouse_id=warehouse, actual_price=1, price=1, quantity_available=self.STOCK,
+        )
+
+    def stock(self):
+        self.inventory.refresh_from_db()
+        return self.inventory.quantity_available, self.inventory.quantity_reserved
+
+    def test_concurrent_reservations_never_oversell(self):
+        results = run_concurrently(lambda index: reserve([(self.inventory.pk, 3)]), 8)
+
+        reserved = [result for result in results if not isinstance(result, Exception)]
+        failures = [result for result in results if isinstance(result, Exception)]
+        self.assertEqual(len(reserved), self.STOCK // 3)
+        self.assertTrue(all(isinstance(failure, InsufficientStock) for failure in failures), failures)
+        self.assertEqual(self.stock(), (self.STOCK - 3 * len(reserved), 3 * len(reserved)))
+        summary = ProductAvailability.objects.get(product_id=self.inventory.product_id_id)
+        self.assertEqual((summary.total_available, summary.total_reserved), self.stock())
+
+        run_concurrently(lambda index: (commit if index % 2 else release)(reserved[index].pk), len(reserved))
+        committed = len(reserved) // 2
+        self.assertEqual(self.stock(), (self.STOCK - 3 * committed, 0))
+
+    def test_updates_and_adjustments_do_not_lose_reservations(self):
+        admin = User.objects.create(username="stock-admin@example.com", email="stock-admin@example.com", is_superuser=True)
+        token, _ = issue_tokens(admin)
+        inventory_id = self.inventory.pk
+
+        def work(index):
+            if index % 3 == 0:
+                return reserve([(inventory_id, 1)])
+            if index % 3 == 1:
+                return adjust_stock([(inventory_id, 2)])
+            # A full PUT carrying stale counters only changes the price
+            response = Client().put(
+                f"/api/inventories/{inventory_id}/",
+                data={"actual_price": "2.00", "price": "3.00", "quantity_available": 0, "quantity_reserved": 0},
+                content_type="application/json", HTTP_AUTHORIZATION=f"Bearer {token}",
+            )
+            return response.status_code
+
+        results = run_concurrently(work, 9)
+
+        self.assertFalse([result for result in results if isinstance(result, Exception)], results)
+        self.assertEqual(results[2::3], [200, 200, 200])
+        self.assertEqual(self.stock(), (self.STOCK + 3 * 2 - 3, 3))
+        self.assertEqual(str(self.inventory.price), "3.00")
+
+    def test_write_off_cannot_take_reserved_stock(self):
+        reserve([(self.inventory.pk, self.STOCK - 2)])
+        with self.assertRaises(InsufficientStock):
+            adjust_stock([(self.inventory.pk, -3)])
+        adjust_stock([(self.inventory.pk, -2)])
+        self.assertEqual(self.stock(), (0, self.STOCK - 2))
+
+
+# (view, url, ?expand=, queries). Conditional GET adds one version query to the catalog
+# endpoints unless ?expand= bypasses it.
+LIST_CASES = [
+    (ProductListCreateAPIView, '/api/products/', '', 2),
+    (ProductListCreateAPIView, '/api/products/', 'c_id,brand_id', 1),
+    (ProductListCreateAPIView, '/api/products/', 'c_id,brand_id,variants,inventories', 3),
+    (VariantListCreateAPIView, '/api/variants/', '', 2),
+    (VariantListCreateAPIView, '/api/variants/', 'product_id', 1),
+    (InventoryListCreateAPIView, '/api/inventories/', '', 2),
+    (InventoryListCreateAPIView, '/api/inventories/', 'product_id,warehouse_id', 1),
+    # Item count and items total come from the same annotated query
+    (PurchaseOrderListCreateAPIView, '/api/purchase-orders/', '', 1),
+    (PurchaseOrderItemListCreateAPIView, '/api/purchase-order-items/', '', 1),
+    (PurchaseOrderItemListCreateAPIView, '/api/purchase-order-items/', 'product_id,purchase_order_id', 1),
+]
+
+DETAIL_CASES = [
+    (ProductDetailAPIView, Product, 'c_id,brand_id,variants,inventories', 3),
+    (VariantDetailAPIView, Variant, 'product_id', 1),
+    (InventoryDetailAPIView, Inventory, 'product_id,warehouse_id', 1),
+    (PurchaseOrderItemDetailAPIView, PurchaseOrderItem, 'product_id,purchase_order_id', 1),
+]
+
+
+# Responses must come from the views, not the response cache
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'catalog': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+})
+class QueryCountTests(TestCase):
+    """
+    List and detail endpoints (with and without ?expand=) run a fixed number of queries,
+    the same for 3 rows as for 30.
+    """
+
+    def seed(self, count):
+        for i in range(self.seeded, count):
+            product = Product.objects.create(
+                p_name=f"Check {i}", sku_name=f"check-{i}", c_id=self.category, brand_id=self.brand,
+            )
+            Variant.objects.create(product_id=product, size="M")
+            Variant.objects.create(product_id=product, size="L")
+            Inventory.objects.create(
+                product_id=product, warehouse_id=self.warehouse, actual_price=1, price=1, quantity_available=5,
+            )
+            PurchaseOrderItem.objects.create(purchase_order_id=self.order, product_id=product, quantity=1, price=1)
+        self.seeded = count
+
+    def setUp(self):
+        self.category = Category.objects.create(c_name="Check")
+        self.brand = Brand.objects.create(name="Check")
+        self.warehouse = Warehouse.objects.create(name="Check", address="check", type="main")
+        self.order = PurchaseOrder.objects.create(order_date=datetime.date.today())
+        self.seeded = 0
+
+    def get(self, view, path, params, **kwargs):
+        response = view.as_view()(RequestFactory().get(path, params), **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        self.assertEqual(response.status_code, 200, response.content[:500])
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        for rows in (3, 30):
+            self.seed(rows)
+            for view, path, expand, queries in LIST_CASES:
+                params = {'page_size': 500, **({'expand': expand} if expand else {})}
+                with self.subTest(rows=rows, path=path, expand=expand), self.assertNumQueries(queries):
+                    self.get(view, path, params)
+            for view, model, expand, queries in DETAIL_CASES:
+                pk = model.objects.order_by('created_at').values_list('pk', flat=True).first()
+                with self.subTest(rows=rows, model=model.__name__, expand=expand), self.assertNumQueries(queries):
+                    self.get(view, f'/api/{model._meta.model_name}/{pk}/', {'expand': expand}, pk=pk)
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1.0, CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'catalog': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+})
+class QueryProfilingTests(TransactionTestCase):
+    """
+    Sampled requests count their queries whichever thread runs them, under WSGI and ASGI.
+    """
+
+    def setUp(self):
+        Brand.objects.create(name="Profiled")
+        # Requests must open their own connections, as worker threads do
+        connections.close_all()
+        metrics.reset_metrics()
+        self.addCleanup(metrics.reset_metrics)
+
+    def recorded(self, method, route):
+        labels = (("method", method), ("view", route))
+        counts, total, observed = metrics.histogram('bee_request_queries', labels).snapshot()
+        return observed, total
+
+    def test_sync_request_queries_are_recorded(self):
+        self.assertEqual(Client().get('/api/brands').status_code, 200)
+        observed, queries = self.recorded("GET", "api/brands")
+        self.assertEqual(observed, 1)
+        self.assertGreater(queries, 0)
+
+    async def test_async_request_queries_are_recorded(self):
+        response = await AsyncClient().get('/api/brands')
+        self.assertEqual(response.status_code, 200)
+        observed, queries = self.recorded("GET", "api/brands")
+        self.assertEqual(observed, 1)
+        self.assertGreater(queries, 0)
+
+    def test_middleware_runs_natively_async(self):
+        async def get_response(request):
+            return None
+
+        self.assertTrue(iscoroutinefunction(QueryProfilingMiddleware(get_response)))
+
+    async def test_queries_on_other_threads_are_counted(self):
+        stats = {"queries": 0, "seconds": 0.0}
+        token = metrics.query_stats.set(stats)
+        try:
+            # A fresh pool thread, with a connection the middleware's thread never sees
+            await sync_to_async(lambda: Brand.objects.count(), thread_sensitive=False)()
+        finally:
+            metrics.query_stats.reset(token)
+        self.assertEqual(stats["queries"], 1)
+
+
+@override_settings(METRICS_TOKEN='scrape-token')
+class MetricsEndpointTests(TestCase):
+    def get(self, authorization):
+        return Client().get('/api/_metrics', HTTP_AUTHORIZATION=authorization)
+
+    def test_static_token_is_accepted(self):
+        response = self.get("Bearer scrape-token")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+    def test_other_tokens_are_rejected(self):
+        for authorization in ("Bearer scrape-tokenx", "Bearer scrape", "Token scrape-token", ""):
+            self.assertIn(self.get(authorization).status_code, (401, 403), authorization)
+
+
+@override_settings(SEARCH_INDEX_SYNC_SECONDS=0, FACET_INDEX_SYNC_SECONDS=0)
+class CatalogIndexSyncTests(TestCase):
+    """
+    Indexes built here stand in for other processes: the signals only update the module
+    instances, so these see writes through sync() alone.
+    """
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name="Acme")
+        self.kept = Product.objects.create(p_name="Kept widget", sku_name="kept-1", brand_id=self.brand)
+        self.doomed = Product.objects.create(p_name="Doomed widget", sku_name="doomed-1", brand_id=self.brand)
+        self.variant = Variant.objects.create(product_id=self.kept, size="XL")
+        self.search, self.facets = ProductSearch(), ProductFacets()
+        self.search.build()
+        self.facets.build()
+
+    def found(self, query):
+        return {key for key, _ in self.search.search(query)}
+
+    def test_deletes_elsewhere_are_dropped(self):
+        self.doomed.delete()
+        self.variant.delete()
+        self.assertEqual(self.found("widget"), {self.kept.pk})
+        total, counts = self.facets.counts({})
+        self.assertEqual(total, 1)
+        self.assertEqual(counts['size'], {})
+
+    def test_rows_committed_behind_the_watermark_are_caught(self):
+        # Stamped before the watermark but only visible after it, like a slow transaction
+        stamp = self.search.watermark - datetime.timedelta(seconds=10)
+        Product.objects.filter(pk=self.kept.pk).update(p_name="Renamed gadget", updated_at=stamp)
+        self.assertEqual(self.found("gadget"), {self.kept.pk})
+
+    def test_brand_deletes_elsewhere_detach_products(self):
+        self.brand.delete()
+        self.assertEqual(self.found("acme"), set())
+        total, counts = self.facets.counts({'brand': {self.brand.pk}})
+        self.assertEqual((total, counts['brand']), (0, {}))
+
+    def test_moving_a_variant_reindexes_both_products(self):
+        local = ProductFacets()
+        local.build()
+        with mock.patch('bee.facets.product_facets', local):
+            variant = Variant.objects.get(pk=self.variant.pk)
+            variant.product_id = self.doomed
+            variant.save()
+
+        # This process through the signal alone, the other one through catch-up
+        self.assertEqual(local.index.facet_counts({'size': {'XL'}})[0], 1)
+        self.assertEqual(self.facets.counts({'size': {'XL'}})[0], 1)
+
+    def test_reconcile_rebuilds_from_scratch(self):
+        Product.objects.filter(pk=self.doomed.pk)._raw_delete('default')
+        self.assertEqual(self.found("widget"), {self.kept.pk, self.doomed.pk})
+        self.search.reconcile()
+        self.assertEqual(self.found("widget"), {self.kept.pk})
+
+
+class CatalogIndexBuildTests(TransactionTestCase):
+    def test_concurrent_first_syncs_build_once(self):
+        Product.objects.create(p_name="Only widget", sku_name="only-1")
+        search = ProductSearch()
+        rebuild, rebuilds = search._rebuild, []
+
+        def counted_rebuild():
+            rebuilds.append(threading.get_ident())
+            # Long enough for every other thread to queue up on the build lock
+            time.sleep(0.1)
+            rebuild()
+
+        search._rebuild = counted_rebuild
+        results = run_concurrently(lambda index: search.search("widget"), 8)
+
+        self.assertEqual(len(rebuilds), 1)
+        self.assertTrue(all(len(result) == 1 for result in results), results)
+
+
+class LoginThrottleKeyTests(TestCase):
+    def key(self, forwarded_for):
+        request = RequestFactory().post('/api/login', REMOTE_ADDR='203.0.113.7', HTTP_X_FORWARDED_FOR=forwarded_for)
+        return LoginIPThrottle().get_cache_key(request, None)
+
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        self.assertEqual(self.key('198.51.100.1'), self.key('198.51.100.2'))
+        self.assertIn('203.0.113.7', self.key('198.51.100.1'))
+
+    @override_settings(REST_FRAMEWORK={'NUM_PROXIES': 1})
+    def test_forwarded_for_is_read_behind_proxies(self):
+        # A client-supplied entry before the one the proxy appended does not change the key
+        self.assertEqual(self.key('10.0.0.1, 198.51.100.1'), self.key('10.9.9.9, 198.51.100.1'))
+        self.assertIn('198.51.100.1', self.key('10.0.0.1, 198.51.100.1'))
+
+
+class TokenTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="tokens@example.com", email="tokens@example.com", is_seller=True)
+
+    def authenticate(self, access):
+        request = RequestFactory().get('/api/profile')
+        request.COOKIES['access_token'] = access
+        return CookieJWTAuthentication().authenticate(request)
+
+    def test_tokens_are_plain_pyjwt_tokens(self):
+        access, _ = issue_tokens(self.user)
+        payload = jwt.decode(access, settings.SECRET_KEY, algorithms=['HS256'])
+        self.assertEqual(payload['user_id'], str(self.user.pk))
+        self.assertEqual(self.authenticate(access)[0].pk, self.user.pk)
+        with self.assertRaises(TokenError):
+            AccessToken(access[:-2] + ('A' if access[-2] != 'A' else 'B') + access[-1])
+
+    def test_tokens_issued_before_compact_claims_still_authenticate(self):
+        access = SimpleRefreshToken.for_user(self.user).access_token
+        access['role'] = 'user'
+        access['is_seller'] = True
+        self.assertEqual(self.authenticate(str(access))[0].pk, self.user.pk)
+        principal = ClaimsUser(AccessToken(str(access)))
+        self.assertEqual((principal.role_name, principal.is_seller), ('user', True))
+        self.assertNotIn(ROLE_CLAIM, principal.token)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'catalog': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'availability-tests'},
+})
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(p_name="Summed", sku_name="summed-1")
+        self.cheap = Inventory.objects.create(
+            product_id=self.product, warehouse_id=Warehouse.objects.create(name="A", address="a", type="store"),
+            actual_price=1, price=5, quantity_available=3,
+        )
+        self.dear = Inventory.objects.create(
+            product_id=self.product, warehouse_id=Warehouse.objects.create(name="B", address="b", type="store"),
+            actual_price=1, price=9, quantity_available=10,
+        )
+
+    def summary(self):
+        summary = ProductAvailability.objects.get(product_id=self.product.pk)
+        return {field: getattr(summary, field) for field in ('total_available', 'total_reserved', 'min_price', 'warehouse_count')}
+
+    def assert_in_step(self):
+        self.assertEqual(self.summary(), compute_availability([self.product.pk])[self.product.pk])
+
+    def test_stock_changes_apply_deltas_without_recomputing(self):
+        before = generation('products')
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            reservation = reserve([(self.cheap.pk, 1), (self.dear.pk, 2)])
+        self.assertFalse([query for query in ctx.captured_queries if 'SUM(' in query['sql'].upper()])
+        self.assert_in_step()
+        # Totals moved, nothing a product response advertises did
+        self.assertEqual(generation('products'), before)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            release(reservation.pk)
+            adjust_stock([(self.dear.pk, 4)])
+        self.assert_in_step()
+        self.assertEqual(generation('products'), before)
+
+    def test_selling_a_warehouse_out_recomputes_and_invalidates(self):
+        before = generation('products')
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation = reserve([(self.cheap.pk, 3)])
+        self.assert_in_step()
+        self.assertEqual((self.summary()['min_price'], self.summary()['warehouse_count']), (9, 1))
+        self.assertNotEqual(generation('products'), before)
+
+        release(reservation.pk)
+        self.assert_in_step()
+        self.assertEqual((self.summary()['min_price'], self.summary()['warehouse_count']), (5, 2))
+
+
+class BulkWriteTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create(username="bulk-admin@example.com", email="bulk-admin@example.com", is_superuser=True)
+        self.token, _ = issue_tokens(admin)
+        self.brand = Brand.objects.create(name="Bulk brand")
+        self.existing = Product.objects.create(p_name="Existing", sku_name="bulk-existing", brand_id=self.brand)
+
+    def post(self, rows, mode='upsert'):
+        response = Client().post(
+            f"/api/products/bulk?mode={mode}", data=rows, content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {self.token}",
+        )
+        return response.status_code, response.json()
+
+    def test_create_mode_reports_existing_keys_per_row(self):
+        code, body = self.post([
+            {"p_name": "New", "sku_name": "bulk-new"},
+            {"p_name": "Clash", "sku_name": "bulk-existing"},
+        ], mode='create')
+        self.assertEqual(code, 400)
+        errors = body['meta']['data']
+        self.assertEqual(errors[0], {})
+        self.assertIn("already exists", errors[1]['non_field_errors'][0])
+        self.assertFalse(Product.objects.filter(sku_name="bulk-new").exists())
+
+    def test_upsert_keeps_omitted_fields(self):
+        code, body = self.post([{"p_name": "Renamed", "sku_name": "bulk-existing"}])
+        self.assertEqual(code, 201, body)
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.p_name, self.existing.brand_id_id), ("Renamed", self.brand.pk))
+
+    def test_field_and_foreign_key_errors_come_back_together(self):
+        missing = "00000000-0000-0000-0000-000000000000"
+        code, body = self.post([
+            {"sku_name": "bulk-no-name"},
+            {"p_name": "Bad brand", "sku_name": "bulk-bad-brand", "brand_id": missing},
+            {"p_name": "Fine", "sku_name": "bulk-fine"},
+        ])
+        self.assertEqual(code, 400)
+        errors = body['meta']['data']
+        self.assertIn('p_name', errors[0])
+        self.assertIn(missing, errors[1]['brand_id'][0])
+        self.assertEqual(errors[2], {})
+
+    def test_conflicts_do_not_echo_database_errors(self):
+        with mock.patch('bee.views.bulk_write', side_effect=IntegrityError("UNIQUE constraint failed: bee_product.sku_name")):
+            code, body = self.post([{"p_name": "Raced", "sku_name": "bulk-raced"}])
+        self.assertEqual(code, 409)
+        self.assertNotIn("bee_product", str(body))
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_RETRY_SECONDS=30, EMAIL_OUTBOX_LEASE_SECONDS=300,
+)
+class EmailOutboxTests(TestCase):
+    def expire(self, email):
+        OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now() - datetime.timedelta(seconds=1))
+
+    def test_registration_queues_its_email_in_the_same_transaction(self):
+        response = Client().post(
+            "/api/v1/auth/register",
+            data={"full_name": "Outbox", "email": "outbox@example.org", "password": "s3cret-pass"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        email = OutboundEmail.objects.get(to_email="outbox@example.org")
+        self.assertEqual((email.status, email.attempts), ('pending', 0))
+        self.assertEqual(mail.outbox, [])
+
+    def test_rolled_back_email_is_never_queued(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            queue_email("Subject", "Body", "rollback@example.org")
+            raise RuntimeError
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_claimed_emails_are_sent(self):
+        queue_email("First", "Body", "one@example.org")
+        queue_email("Second", "Body", "two@example.org")
+        self.assertEqual(deliver_queued_emails(), (2, 0))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ["one@example.org", "two@example.org"])
+        self.assertEqual(set(OutboundEmail.objects.values_list('status', 'attempts')), {('sent', 1)})
+        self.assertEqual(deliver_queued_emails(), (0, 0))
+
+    def test_failed_sends_back_off_then_fail(self):
+        email = queue_email("Flaky", "Body", "flaky@example.org")
+        delays = []
+        with mock.patch('bee.mail.EmailMessage.send', side_effect=OSError("connection refused")):
+            for _ in range(3):
+                started = timezone.now()
+                self.assertEqual(deliver_queued_emails(), (0, 1))
+                email.refresh_from_db()
+                if email.status == 'pending':
+                    delays.append(round((email.next_attempt_at - started).total_seconds()))
+                    self.assertEqual(claim_emails(10), [])
+                    self.expire(email)
+        self.assertEqual(delays, [30, 60])
+        self.assertEqual((email.status, email.attempts, email.last_error), ('failed', 3, "connection refused"))
+
+    def test_expired_lease_is_claimed_again(self):
+        email = queue_email("Orphaned", "Body", "orphan@example.org")
+        [first] = claim_emails(10)
+        self.assertEqual(claim_emails(10), [])
+        self.expire(email)
+        [second] = claim_emails(10)
+        self.assertEqual(second.attempts, 2)
+        # The worker that lost the lease cannot overwrite the new claim
+        self.assertEqual(record_result(first), 0)
+        self.assertEqual(record_result(second), 1)
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'sent')
+
+    def test_expired_lease_after_last_attempt_fails(self):
+        email = queue_email("Orphaned", "Body", "orphan@example.org")
+        OutboundEmail.objects.filter(pk=email.pk).update(status='sending', attempts=3)
+        self.expire(email)
+        self.assertEqual(claim_emails(10), [])
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 3))
+        self.assertIn("lease expired", email.last_error)
+
+
+class GoogleCallbackTests(TestCase):
+    def setUp(self):
+        self.stub = StubOIDC()
+        override = override_settings(
+            GOOGLE_OIDC_DISCOVERY_URL=f'{self.stub.issuer}/.well-known/openid-configuration',
+            GOOGLE_CLIENT_ID='test-client.apps.example.com', GOOGLE_CLIENT_SECRET='test-secret',
+            GOOGLE_REDIRECT_URI='http://testserver/api/auth/google/callback',
+            GOOGLE_LOGIN_REDIRECT_URL='http://frontend.example.org/success',
+            GOOGLE_HTTP_READ_TIMEOUT=0.5,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(self.reset_oauth)
+        self.addCleanup(self.stub.close)
+        self.reset_oauth()
+
+    def reset_oauth(self):
+        oauth._documents.clear()
+        oauth._pool = None
+
+    def callback(self, code):
+        return Client().get('/api/auth/google/callback', {'code': code})
+
+    def test_callback_signs_in_and_redirects(self):
+        response = self.callback('google-new')
+        self.assertEqual(response.status_code, 302)
+        location = urlsplit(response['Location'])
+        self.assertEqual(f'{location.scheme}://{location.netloc}{location.path}', 'http://frontend.example.org/success')
+        query = dict(parse_qsl(location.query))
+        user = User.objects.get(email='google-new@example.com')
+        self.assertTrue(user.profile_verified)
+        self.assertEqual(query['user_id'], str(user.pk))
+        self.assertEqual(AccessToken(query['access_token'])['user_id'], str(user.pk))
+        self.assertEqual(self.stub.hits['/token'], 1)
+
+    def test_slow_token_endpoint_times_out(self):
+        self.stub.delay = 1.5
+        response = self.callback('google-slow')
+        self.assertEqual(response.status_code, 504)
+        self.assertFalse(User.objects.filter(email='google-slow@example.com').exists())
+
+    def test_id_token_with_bad_signature_is_rejected(self):
+        self.stub.signing_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        response = self.callback('google-forged')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.filter(email='google-forged@example.com').exists())
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'category-tests'},
+    'catalog': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'category-tests-catalog'},
+})
+class CategoryTreeTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create(username="tree-admin@example.com", email="tree-admin@example.com", is_superuser=True)
+        self.token, _ = issue_tokens(admin)
+        self.home = Category.objects.create(c_name="Home")
+        self.kitchen = Category.objects.create(c_name="Kitchen", parent_category=self.home)
+        self.knives = Category.objects.create(c_name="Knives", parent_category=self.kitchen)
+        self.outdoor = Category.objects.create(c_name="Outdoor")
+
+    def move(self, category, parent):
+        response = Client().put(
+            f"/api/categories/{category.pk}", data={"parent_category": str(parent.pk)},
+            content_type="application/json", HTTP_AUTHORIZATION=f"Bearer {self.token}",
+        )
+        return response.status_code, response.json()
+
+    def tree(self, category):
+        response = Client().get(f"/api/categories/{category.pk}/tree")
+        self.assertEqual(response.status_code, 200)
+        return response.json()['meta']['data']
+
+    def test_moving_a_category_moves_its_subtree(self):
+        self.tree(self.outdoor)  # cached before the move
+        code, body = self.move(self.kitchen, self.outdoor)
+        self.assertEqual(code, 200, body)
+        self.assertNotIn('path', body['meta']['data'])
+
+        for category in (self.kitchen, self.knives):
+            category.refresh_from_db()
+        self.assertEqual(self.kitchen.path, self.outdoor.segment + self.kitchen.segment)
+        self.assertEqual(self.knives.path, self.kitchen.path + self.knives.segment)
+
+        tree = self.tree(self.outdoor)['category']
+        [kitchen] = tree['subcategories']
+        [knives] = kitchen['subcategories']
+        self.assertEqual((kitchen['c_id'], kitchen['depth']), (str(self.kitchen.pk), 1))
+        self.assertEqual((knives['c_id'], knives['depth']), (str(self.knives.pk), 2))
+        self.assertEqual(self.tree(self.home)['category']['subcategories'], [])
+        ancestors = self.tree(self.knives)['ancestors']
+        self.assertEqual([node['c_id'] for node in ancestors], [str(self.outdoor.pk), str(self.kitchen.pk)])
+
+    def test_save_with_update_fields_stores_the_new_path(self):
+        self.kitchen.parent_category = self.outdoor
+        self.kitchen.save(update_fields=['parent_category'])
+        self.kitchen.refresh_from_db()
+        self.knives.refresh_from_db()
+        self.assertEqual(self.kitchen.path, self.outdoor.segment + self.kitchen.segment)
+        self.assertTrue(self.knives.path.startswith(self.kitchen.path))
+
+    def test_category_cannot_move_under_itself_or_its_subtree(self):
+        for parent in (self.home, self.knives):
+            code, body = self.move(self.home, parent)
+            self.assertEqual(code, 400)
+            self.assertIn('parent_category', body['meta']['data'])
+        self.home.refresh_from_db()
+        self.assertIsNone(self.home.parent_category_id)
+        self.assertEqual(self.home.path, self.home.segment)
+
+
+@override_settings(OTP_STORE='database')
+class VerifyOTPTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="otp@example.org", email="otp@example.org", is_active=False)
+        self.code = get_otp_store().issue(self.user)
+
+    def verify(self, code):
+        response = Client().post(
+            "/api/v1/auth/verify-email", data={"email": "otp@example.org", "otp": code}, content_type="application/json",
+        )
+        return response.status_code, response.json()
+
+    def test_valid_code_activates_the_user(self):
+        code, body = self.verify(self.code)
+        self.assertEqual(code, 200, body)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active and self.user.profile_verified)
+        self.assertEqual(self.user.role.name, 'user')
+        self.assertEqual(AccessToken(body['meta']['access_token'])['user_id'], str(self.user.pk))
+
+    def test_existing_role_is_kept(self):
+        User.objects.filter(pk=self.user.pk).update(role=Role.objects.get(name='seller'))
+        self.assertEqual(self.verify(self.code)[0], 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.role.name, 'seller')
+
+    def test_expired_code_is_rejected(self):
+        OTP.objects.filter(user=self.user).update(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+        code, body = self.verify(self.code)
+        self.assertEqual(code, 400)
+        self.assertIn("OTP has expired.", body['meta']['data']['non_field_errors'])
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+
+    def test_code_works_once(self):
+        self.assertEqual(self.verify(self.code)[0], 200)
+        code, body = self.verify(self.code)
+        self.assertEqual(code, 400)
+        self.assertIn("Invalid OTP.", body['meta']['data']['non_field_errors'])
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'catalog': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+})
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        Brand.objects.bulk_create([Brand(name=f"Paged {i}") for i in range(5)])
+        # Equal timestamps: pages must still split on the primary key
+        Brand.objects.update(created_at=timezone.now() - datetime.timedelta(minutes=1))
+
+    def page(self, **params):
+        response = Client().get('/api/brands', {'page_size': 2, **params})
+        return response.status_code, response.json()
+
+    def walk(self):
+        ids, cursor = [], None
+        while True:
+            code, body = self.page(**({'cursor': cursor} if cursor else {}))
+            self.assertEqual(code, 200, body)
+            ids += [row['id'] for row in body['meta']['data']]
+            cursor = body['meta']['page']['next_cursor']
+            self.assertEqual(body['meta']['page']['has_more'], cursor is not None)
+            if cursor is None:
+                return ids
+
+    def test_pages_follow_created_at_then_pk(self):
+        expected = [str(pk) for pk in Brand.objects.order_by('created_at', 'pk').values_list('pk', flat=True)]
+        self.assertEqual(self.walk(), expected)
+
+    def test_rows_added_meanwhile_do_not_shift_later_pages(self):
+        code, body = self.page()
+        first = [row['id'] for row in body['meta']['data']]
+        # Sorts ahead of every existing row; an offset would repeat the second row
+        Brand.objects.filter(pk=Brand.objects.create(name="Early").pk).update(
+            created_at=timezone.now() - datetime.timedelta(days=1),
+        )
+        code, body = self.page(cursor=body['meta']['page']['next_cursor'])
+        second = [row['id'] for row in body['meta']['data']]
+        self.assertFalse(set(first) & set(second))
+
+    def test_invalid_cursor_is_rejected(self):
+        def encode(value):
+            return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+        for cursor in ("not-a-cursor", encode(["yesterday", "x"]), encode([timezone.now().isoformat(), "not-a-uuid"])):
+            code, body = self.page(cursor=cursor)
+            self.assertEqual((code, body['message']), (400, "Invalid cursor"), cursor)
+
+    @override_settings(API_PAGE_SIZE=2, API_MAX_PAGE_SIZE=3)
+    def test_page_size_is_capped(self):
+        for requested, expected in (('100', 3), ('0', 1), ('lots', 2)):
+            response = Client().get('/api/brands', {'page_size': requested})
+            meta = response.json()['meta']
+            self.assertEqual((len(meta['data']), meta['page']['page_size']), (expected, expected), requested)
+
+    def test_every_list_endpoint_is_paged(self):
+        for url in (
+            '/api/categories', '/api/brands', '/api/products/', '/api/variants/', '/api/warehouses/',
+            '/api/inventories/', '/api/purchase-orders/', '/api/purchase-order-items/',
+        ):
+            response = Client().get(url, {'page_size': 1})
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(response.json()['meta']['page']['page_size'], 1, url)
+
+
+@override_settings(STREAM_CHUNK_SIZE=2, CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'catalog': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+})
+class StreamingExportTests(TestCase):
+    def setUp(self):
+        for i in range(5):
+            Product.objects.create(p_name=f"Streamed {i}", sku_name=f"streamed-{i}")
+        self.expected = [str(pk) for pk in Product.objects.order_by('created_at', 'pk').values_list('pk', flat=True)]
+
+    def export(self, fmt):
+        response = Client().get('/api/products/', {'stream': fmt})
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson_streams_one_object_per_line(self):
+        response, content = self.export('ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = content.splitlines()
+        self.assertEqual([json.loads(line)['p_id'] for line in lines], self.expected)
+
+    def test_json_streams_one_array(self):
+        response, content = self.export('json')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual([row['p_id'] for row in json.loads(content)], self.expected)
+
+    def test_empty_export_is_valid_json(self):
+        Product.objects.all().delete()
+        self.assertEqual(json.loads(self.export('json')[1]), [])
+
+    def test_unknown_format_is_rejected(self):
+        response = Client().get('/api/products/', {'stream': 'xml'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(response.json()['meta']['data']['supported']), ['json', 'ndjson'])
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'catalog': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+})
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(p_name="Tagged", sku_name="tagged-1")
+        self.inventory = Inventory.objects.create(
+            product_id=self.product, warehouse_id=Warehouse.objects.create(name="Tagged", address="t", type="store"),
+            actual_price=1, price=5, quantity_available=3,
+        )
+        self.urls = ['/api/products/', f'/api/products/{self.product.pk}/']
+
+    def get(self, url, etag=None):
+        return Client().get(url, **({'HTTP_IF_NONE_MATCH': etag} if etag else {}))
+
+    def test_matching_etag_is_not_modified(self):
+        for url in self.urls:
+            response = self.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('Last-Modified', response)
+            revalidated = self.get(url, response['ETag'])
+            self.assertEqual(revalidated.status_code, 304, url)
+            self.assertEqual(revalidated['ETag'], response['ETag'])
+            self.assertEqual(revalidated.content, b'')
+            self.assertEqual(self.get(url, 'W/"stale", ' + response['ETag']).status_code, 304)
+
+    def test_stock_change_changes_the_etag(self):
+        etags = {url: self.get(url)['ETag'] for url in self.urls}
+        adjust_stock([(self.inventory.pk, 2)])
+        for url, etag in etags.items():
+            response = self.get(url, etag)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_query_string_is_part_of_the_etag(self):
+        etag = self.get(self.urls[0])['ETag']
+        self.assertEqual(self.get(self.urls[0] + '?page_size=1', etag).status_code, 200)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'catalog': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'response-cache-tests'},
+})
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name="Cached")
+        self.product = Product.objects.create(p_name="Cached", sku_name="cached-1", brand_id=self.brand)
+
+    def rename_quietly(self, name):
+        # No post_save, so nothing bumps a generation
+        Brand.objects.filter(pk=self.brand.pk).update(name=name)
+
+    def brand_names(self):
+        return [row['name'] for row in Client().get('/api/brands').json()['meta']['data']]
+
+    def expanded_brand(self, **params):
+        response = Client().get('/api/products/', {'expand': 'brand_id', **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['meta']['data'][0]['brand_id']['name']
+
+    def test_writes_bump_their_generation(self):
+        before = {resource: generation(resource) for resource in ('brands', 'products')}
+        self.brand.save()
+        self.assertNotEqual(generation('brands'), before['brands'])
+        self.assertEqual(generation('products'), before['products'])
+        Product.objects.create(p_name="Another", sku_name="cached-2")
+        self.assertNotEqual(generation('products'), before['products'])
+
+    def test_cached_list_is_served_until_a_write(self):
+        self.assertEqual(self.brand_names(), ["Cached"])
+        self.rename_quietly("Renamed")
+        self.assertEqual(self.brand_names(), ["Cached"])
+        self.brand.refresh_from_db()
+        self.brand.save()
+        self.assertEqual(self.brand_names(), ["Renamed"])
+
+    def test_expand_bypasses_the_cache(self):
+        self.assertEqual(self.expanded_brand(), "Cached")
+        self.rename_quietly("Renamed")
+        self.assertEqual(self.expanded_brand(), "Renamed")
+        response = Client().get('/api/products/', {'expand': 'brand_id'}, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+
+class HashPoolTests(TestCase):
+    def pool(self, workers, queue, timeout=5.0):
+        pool = HashPool(workers, queue, timeout)
+        release = threading.Event()
+        self.addCleanup(pool.shutdown)
+        self.addCleanup(release.set)
+        return pool, release
+
+    def test_checks_beyond_workers_and_queue_are_rejected(self):
+        pool, release = self.pool(workers=1, queue=1)
+        waiting = [threading.Thread(target=pool.run, args=(release.wait,)) for _ in range(2)]
+        for thread in waiting:
+            thread.start()
+        while pool.slots._value:  # both slots taken
+            time.sleep(0.01)
+        started = time.monotonic()
+        with self.assertRaises(HashPoolBusy):
+            pool.run(lambda: True)
+        self.assertLess(time.monotonic() - started, 1)
+        release.set()
+        for thread in waiting:
+            thread.join()
+        self.assertEqual(pool.run(lambda: "done"), "done")
+        self.assertEqual((pool.stats["rejected"], pool.stats["timeouts"]), (1, 0))
+
+    def test_slow_check_times_out_and_keeps_its_slot(self):
+        pool, release = self.pool(workers=1, queue=0, timeout=0.05)
+        with self.assertRaises(HashPoolBusy):
+            pool.run(release.wait)
+        self.assertEqual(pool.stats["timeouts"], 1)
+        # The hash is still running, so the pool stays full until it ends
+        with self.assertRaises(HashPoolBusy):
+            pool.run(lambda: True)
+        release.set()
+        while pool.stats["completed"] < 1:
+            time.sleep(0.01)
+        self.assertIs(pool.run(lambda: True), True)
+
+    @override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=0)
+    def test_verify_password_runs_in_the_pool(self):
+        self.addCleanup(reset_hash_pools)
+        user = User(username="hashed@example.org", email="hashed@example.org")
+        user.set_password("correct horse")
+        self.assertTrue(verify_password(user, "correct horse"))
+        self.assertFalse(verify_password(user, "wrong horse"))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'hash-pool-tests'}})
+    def test_busy_pool_sheds_the_login(self):
+        user = User.objects.create(username="shed@example.org", email="shed@example.org", is_active=True)
+        user.set_password("correct horse")
+        user.save()
+        with mock.patch('bee.serializers.verify_password', side_effect=HashPoolBusy):
+            response = Client().post(
+                "/api/v1/auth/login", data={"email": "shed@example.org", "password": "correct horse"},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+class PurchaseOrderTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create(username="po-admin@example.com", email="po-admin@example.com", is_superuser=True)
+        self.token, _ = issue_tokens(admin)
+        self.pen = Product.objects.create(p_name="Pen", sku_name="po-pen")
+        self.ink = Product.objects.create(p_name="Ink", sku_name="po-ink")
+
+    def send(self, method, url, data=None):
+        response = getattr(Client(), method)(
+            url, data=data, content_type="application/json", HTTP_AUTHORIZATION=f"Bearer {self.token}",
+        )
+        return response.status_code, response.json()
+
+    def line(self, product, quantity, price):
+        return {"product_id": str(product.pk), "quantity": quantity, "price": price}
+
+    def test_nested_create_writes_the_order_and_its_lines(self):
+        code, body = self.send('post', '/api/purchase-orders/', {
+            "order_date": "2026-01-05",
+            "items": [self.line(self.pen, 3, "1.50"), self.line(self.ink, 2, "4.25")],
+        })
+        self.assertEqual(code, 201, body)
+        order = PurchaseOrder.objects.get(pk=body['meta']['data']['id'])
+        self.assertEqual(str(order.total_amount), "13.00")
+        self.assertEqual(
+            sorted(order.items.values_list('product_id', 'quantity')), sorted([(self.pen.pk, 3), (self.ink.pk, 2)]),
+        )
+
+    def test_bad_line_is_reported_per_row(self):
+        missing = "00000000-0000-0000-0000-000000000000"
+        code, body = self.send('post', '/api/purchase-orders/', {
+            "order_date": "2026-01-05",
+            "items": [
+                self.line(self.pen, 3, "1.50"),
+                {"product_id": missing, "quantity": 1, "price": "2.00"},
+                {"product_id": str(self.ink.pk), "quantity": -1, "price": "2.00"},
+            ],
+        })
+        self.assertEqual(code, 400)
+        errors = body['meta']['data']['items']
+        self.assertEqual(errors[0], {})
+        self.assertIn(missing, errors[1]['product_id'][0])
+        self.assertIn('quantity', errors[2])
+        self.assertFalse(PurchaseOrder.objects.exists())
+
+    def order_totals(self, order_id):
+        code, body = self.send('get', f'/api/purchase-orders/{order_id}/')
+        self.assertEqual(code, 200, body)
+        return body['meta']['data']['total_amount'], body['meta']['data']['items_total']
+
+    def test_totals_follow_item_writes(self):
+        first = PurchaseOrder.objects.create(order_date=datetime.date(2026, 1, 5))
+        second = PurchaseOrder.objects.create(order_date=datetime.date(2026, 1, 6))
+
+        code, body = self.send('post', '/api/purchase-order-items/', {
+            "purchase_order_id": str(first.pk), **self.line(self.pen, 4, "2.50"),
+        })
+        self.assertEqual(code, 201, body)
+        item_url = f"/api/purchase-order-items/{body['meta']['data']['id']}/"
+        self.send('post', '/api/purchase-order-items/', {"purchase_order_id": str(first.pk), **self.line(self.ink, 1, "3.00")})
+        self.assertEqual(self.order_totals(first.pk), ("13.00", "13.00"))
+
+        self.assertEqual(self.send('put', item_url, {"quantity": 2})[0], 200)
+        self.assertEqual(self.order_totals(first.pk), ("8.00", "8.00"))
+
+        self.assertEqual(self.send('put', item_url, {"purchase_order_id": str(second.pk)})[0], 200)
+        self.assertEqual(self.order_totals(first.pk), ("3.00", "3.00"))
+        self.assertEqual(self.order_totals(second.pk), ("5.00", "5.00"))
+
+        self.assertEqual(self.send('delete', item_url)[0], 200)
+        self.assertEqual(self.order_totals(second.pk), ("0.00", "0.00"))
+        self.assertEqual(reconcile_totals([first.pk, second.pk]), [])
+
+    def test_put_ignores_total_amount(self):
+        order = PurchaseOrder.objects.create(order_date=datetime.date(2026, 1, 5))
+        PurchaseOrderItem.objects.create(purchase_order_id=order, product_id=self.pen, quantity=2, price="1.25")
+        code, body = self.send('put', f'/api/purchase-orders/{order.pk}/', {"status": "received", "total_amount": "999.00"})
+        self.assertEqual(code, 200, body)
+        self.assertEqual(body['meta']['data']['total_amount'], "2.50")
+        order.refresh_from_db()
+        self.assertEqual((order.status, str(order.total_amount)), ("received", "2.50"))
+
+
+class AdminAuthCacheTests(TestCase):
+    def setUp(self):
+        _admin_cache.clear()
+        self.addCleanup(_admin_cache.clear)
+        self.user = User.objects.create(username="cached-admin@example.org", email="cached-admin@example.org")
+        self.user.role = Role.objects.get(name='admin')
+        self.user.save()
+        self.token, _ = issue_tokens(self.user)
+
+    def test_decision_is_cached_per_token(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(is_admin_from_token(self.token), (True, self.user))
+        with self.assertNumQueries(0):
+            is_admin, user = is_admin_from_token(self.token)
+        self.assertTrue(is_admin)
+        self.assertEqual((user.pk, user.role.name), (self.user.pk, 'admin'))
+
+    def test_role_change_invalidates_the_decision(self):
+        is_admin_from_token(self.token)
+        self.user.role = Role.objects.get(name='user')
+        self.user.save()
+        self.assertIs(is_admin_from_token(self.token)[0], False)
+
+    def test_renamed_role_invalidates_every_decision(self):
+        is_admin_from_token(self.token)
+        Role.objects.filter(name='admin').update(name='former-admin')
+        self.assertIs(is_admin_from_token(self.token)[0], True)  # no signal, still cached
+        role = Role.objects.get(name='former-admin')
+        role.save()
+        self.assertIs(is_admin_from_token(self.token)[0], False)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'catalog': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+})
+class AsyncCatalogViewTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.brands = [Brand.objects.create(name=f"Async {i}") for i in range(3)]
+
+    async def both(self, sync_view, async_view, path, **kwargs):
+        request = self.factory.get(path, {'page_size': 2})
+        sync_response = await sync_to_async(sync_view)(request, **kwargs)
+        if hasattr(sync_response, 'render'):
+            sync_response.render()
+        async_response = await async_view(self.factory.get(path, {'page_size': 2}), **kwargs)
+        return sync_response, async_response
+
+    async def test_list_matches_the_sync_view(self):
+        sync_response, async_response = await self.both(BrandListCreateAPIView.as_view(), async_views.brand_list, '/api/brands')
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(json.loads(async_response.content), json.loads(sync_response.content))
+        self.assertEqual(async_response['ETag'], sync_response['ETag'])
+
+    async def test_detail_matches_the_sync_view(self):
+        pk = self.brands[0].pk
+        sync_response, async_response = await self.both(
+            BrandDetailAPIView.as_view(), async_views.brand_detail, f'/api/brands/{pk}/', pk=pk,
+        )
+        self.assertEqual(json.loads(async_response.content), json.loads(sync_response.content))
+
+    async def test_missing_detail_and_bad_cursor(self):
+        missing = await async_views.brand_detail(self.factory.get('/api/brands/x/'), pk=uuid.uuid4())
+        self.assertEqual(missing.status_code, 404)
+        bad_cursor = await async_views.brand_list(self.factory.get('/api/brands', {'cursor': 'nope'}))
+        self.assertEqual(bad_cursor.status_code, 400)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'catalog': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-tests'},
+})
+class BenchSuiteTests(TransactionTestCase):
+    sizes = CatalogSizes(categories=4, brands=2, products=6, variants=2, warehouses=2, stocked_warehouses=1)
+
+    def test_seed_is_deterministic(self):
+        names = []
+        for _ in range(2):
+            catalog = seed_catalog(self.sizes, seed=7)
+            names.append(sorted(Product.objects.filter(pk__in=catalog.products).values_list('p_name', flat=True)))
+            self.assertEqual(Variant.objects.filter(product_id__in=catalog.products).count(), 12)
+            catalog.delete()
+        self.assertEqual(len(names[0]), 6)
+        self.assertEqual(names[0], names[1])
+        self.assertFalse(Product.objects.exists())
+
+    def test_bench_api_reports_json(self):
+        out = StringIO()
+        call_command(
+            'bench_api', '--categories', '4', '--brands', '2', '--products', '6', '--warehouses', '2',
+            '--stocked-warehouses', '1', '--requests', '3', '--warmup', '1', '--concurrency', '1', '2',
+            '--scenarios', 'brands_list', 'product_detail', stdout=out,
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(sorted(report['results']), ['brands_list@1', 'brands_list@2', 'product_detail@1', 'product_detail@2'])
+        for result in report['results'].values():
+            self.assertEqual((result['requests'], result['errors']), (3, 0))
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertFalse(Product.objects.exists())
+        current = report['results']['brands_list@1']
+        previous = {"results": {"brands_list@1": {**current, "p50_ms": current['p50_ms'] * 2}}}
+        self.assertEqual(compare(report['results'], previous)['brands_list@1']['p50_ms'], -50.0)
+
+
+class IndexAdvisorTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="advised@example.org", email="advised@example.org")
+        warehouse = Warehouse.objects.create(name="Advised", address="a", type="store")
+        self.product = Product.objects.create(p_name="Advised", sku_name="advised-1")
+        Inventory.objects.create(product_id=self.product, warehouse_id=warehouse, actual_price=1, price=1)
+        self.warehouse = warehouse
+
+    def run_advisor(self, querysets):
+        log = []
+        with CaptureQueriesContext(connection) as ctx:
+            for queryset in querysets:
+                list(queryset)
+        for query in ctx.captured_queries:
+            log.append(json.dumps({"scenario": "test", "sql": query['sql'], "count": 2}))
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as handle:
+            handle.write('\n'.join(log) + '\n')
+        self.addCleanup(os.remove, handle.name)
+        out = StringIO()
+        call_command('explain_queries', handle.name, '--min-rows', '0', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['errors'], [])
+        return {(item['model'], item['kind']): item for item in report['flagged']}
+
+    def test_hot_lookups_use_indexes(self):
+        flagged = self.run_advisor([
+            OTP.objects.filter(user=self.user, otp_code="123456"),
+            Inventory.objects.filter(product_id=self.product, warehouse_id=self.warehouse),
+            Category.objects.filter(parent_category=None).order_by('c_name'),
+            PurchaseOrder.objects.order_by('order_date')[:10],
+            Product.objects.order_by('p_name')[:10],
+        ])
+        self.assertEqual(flagged, {})
+
+    def test_scans_and_sorts_are_flagged(self):
+        flagged = self.run_advisor([
+            Brand.objects.filter(contact_info="a"),
+            Brand.objects.filter(contact_info="b"),
+            Warehouse.objects.order_by('address')[:10],
+        ])
+        scan = flagged[('Brand', 'full_scan')]
+        # Both literals normalize to one statement
+        self.assertEqual((scan['statements'], scan['executions']), (1, 4))
+        self.assertIn(('Warehouse', 'filesort'), flagged)
@@ -0,0 +1,39 @@
+"""
+Login throttles. DRF checks them in APIView.initial(), before the serializer runs, so
+rejected brute-force attempts never reach the password hasher. Counters live in the
+'throttle' cache, which must be shared (file or redis) for limits to hold across workers.
+"""
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginThrottle(SimpleRateThrottle):
+    cache = caches['throttle']
+
+    def ident(self, request):
+        raise NotImplementedError
+
+    def get_cache_key(self, request, view):
+        ident = self.ident(request)
+        if not ident:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class LoginIPThrottle(LoginThrottle):
+    scope = 'login_ip'
+
+    def ident(self, request):
+        # REMOTE_ADDR, or the client address the proxies counted by NUM_PROXIES recorded
+        return self.get_ident(request)
+
+
+class LoginEmailThrottle(LoginThrottle):
+    """
+    Caps attempts against one account however many addresses they come from.
+    """
+    scope = 'login_email'
+
+    def ident(self, request):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        return email.strip().lower() if isinstance(email, str) and email.strip() else None
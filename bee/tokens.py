@@ -0,0 +1,85 @@
+"""
+The one place JWTs are minted: password login, OTP verification and Google sign-in all
+call issue_tokens().
+
+Access tokens carry only what authorization reads, under short keys, next to simplejwt's
+own token_type/exp/iat/jti and user_id claims (whose names are unchanged, so tokens issued
+before compact claims keep working):
+
+    rl  role name
+    sl  1 when the user is a seller (omitted otherwise)
+
+Profile fields (email, names, phone, dob, ...) are no longer copied into every cookie;
+endpoints that show them load the row. Refresh tokens carry no custom claims at all.
+
+Signing and verification stay with simplejwt's TokenBackend and PyJWT; PreparedKeyTokenBackend
+only resolves the HMAC key and algorithm object once instead of for every token.
+"""
+from functools import cached_property
+
+from jwt import PyJWK
+from jwt.utils import base64url_encode
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken as SimpleAccessToken
+from rest_framework_simplejwt.tokens import RefreshToken as SimpleRefreshToken
+
+ROLE_CLAIM = 'rl'
+SELLER_CLAIM = 'sl'
+
+
+class PreparedKeyTokenBackend(TokenBackend):
+    """
+    simplejwt's TokenBackend, verifying HS256/384/512 tokens with a PyJWK built once: PyJWT
+    uses its algorithm object and key as they are, where a plain key is looked up and
+    re-prepared on every decode. Signing already reuses simplejwt's prepared_signing_key.
+    """
+
+    @cached_property
+    def verifying_jwk(self):
+        if not self.algorithm.startswith('HS') or not self.signing_key:
+            return None
+        key = self.signing_key.encode() if isinstance(self.signing_key, str) else self.signing_key
+        return PyJWK({'kty': 'oct', 'k': base64url_encode(key).decode()}, self.algorithm)
+
+    def get_verifying_key(self, token):
+        return self.verifying_jwk or super().get_verifying_key(token)
+
+
+token_backend = PreparedKeyTokenBackend(
+    api_settings.ALGORITHM,
+    api_settings.SIGNING_KEY,
+    api_settings.VERIFYING_KEY,
+    api_settings.AUDIENCE,
+    api_settings.ISSUER,
+    api_settings.JWK_URL,
+    api_settings.LEEWAY,
+    api_settings.JSON_ENCODER,
+)
+
+
+class AccessToken(SimpleAccessToken):
+    _token_backend = token_backend
+
+
+class RefreshToken(SimpleRefreshToken):
+    _token_backend = token_backend
+    access_token_class = AccessToken
+
+
+def access_claims(user):
+    claims = {ROLE_CLAIM: user.role.name if user.role_id else None}
+    if user.is_seller:
+        claims[SELLER_CLAIM] = 1
+    return claims
+
+
+def issue_tokens(user):
+    """
+    Returns (access, refresh) token strings for the user.
+    """
+    refresh = RefreshToken.for_user(user)
+    access = refresh.access_token
+    for claim, value in access_claims(user).items():
+        access[claim] = value
+    return str(access), str(refresh)
@@ -1,7 +1,9 @@
 # urls.py (Create this file in your app directory)
 from django.urls import path
 from .views import *
-from . import views
+from . import async_views, views
+from .async_views import catalog_view
+from .facets import FACETS
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
@@ -16,23 +18,38 @@ urlpatterns = [
     
     
     
-    path('categories', CategoryListCreateAPIView.as_view()),
-    path('categories/<str:pk>', CategoryDetailAPIView.as_view()),
-
-    path('brands', BrandListCreateAPIView.as_view()),
-    path('brands/<uuid:pk>/', BrandDetailAPIView.as_view()),
-
-    path('products/', ProductListCreateAPIView.as_view()),
-    path('products/<uuid:pk>/', ProductDetailAPIView.as_view()),
-
-    path('variants/', VariantListCreateAPIView.as_view()),
-    path('variants/<uuid:pk>/', VariantDetailAPIView.as_view()),
-
-    path('warehouses/', WarehouseListCreateAPIView.as_view()),
-    path('warehouses/<uuid:pk>/', WarehouseDetailAPIView.as_view()),
-
-    path('inventories/', InventoryListCreateAPIView.as_view()),
-    path('inventories/<uuid:pk>/', InventoryDetailAPIView.as_view()),
+    path('_cache', CacheStatsAPIView.as_view()),
+    path('_metrics', MetricsAPIView.as_view()),
+
+    path('categories', catalog_view(CategoryListCreateAPIView, async_views.category_list)),
+    path('categories/<str:pk>', catalog_view(CategoryDetailAPIView, async_views.category_detail)),
+    path('categories/<str:pk>/tree', CategoryTreeAPIView.as_view()),
+
+    path('brands', catalog_view(BrandListCreateAPIView, async_views.brand_list)),
+    path('brands/<uuid:pk>/', catalog_view(BrandDetailAPIView, async_views.brand_detail)),
+
+    path('products/bulk', ProductBulkAPIView.as_view()),
+    path('products/search', ProductSearchAPIView.as_view()),
+    path('products/facets', ProductFacetsAPIView.as_view()),
+    path('products/', catalog_view(ProductListCreateAPIView, async_views.product_list, sync_params=FACETS)),
+    path('products/<uuid:pk>/', catalog_view(ProductDetailAPIView, async_views.product_detail)),
+
+    path('variants/bulk', VariantBulkAPIView.as_view()),
+    path('variants/', catalog_view(VariantListCreateAPIView, async_views.variant_list)),
+    path('variants/<uuid:pk>/', catalog_view(VariantDetailAPIView, async_views.variant_detail)),
+
+    path('warehouses/', catalog_view(WarehouseListCreateAPIView, async_views.warehouse_list)),
+    path('warehouses/<uuid:pk>/', catalog_view(WarehouseDetailAPIView, async_views.warehouse_detail)),
+
+    path('inventories/bulk', InventoryBulkAPIView.as_view()),
+    path('inventories/stock', InventoryStockAPIView.as_view()),
+    path('inventories/', catalog_view(InventoryListCreateAPIView, async_views.inventory_list)),
+    path('inventories/<uuid:pk>/', catalog_view(InventoryDetailAPIView, async_views.inventory_detail)),
+
+    path('reservations/', ReservationCreateAPIView.as_view()),
+    path('reservations/<uuid:pk>/', ReservationDetailAPIView.as_view()),
+    path('reservations/<uuid:pk>/commit', ReservationCommitAPIView.as_view()),
+    path('reservations/<uuid:pk>/release', ReservationReleaseAPIView.as_view()),
 
     path('purchase-orders/', PurchaseOrderListCreateAPIView.as_view()),
     path('purchase-orders/<uuid:pk>/', PurchaseOrderDetailAPIView.as_view()),
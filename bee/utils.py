@@ -1,7 +1,19 @@
-import jwt
 from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from rest_framework.exceptions import AuthenticationFailed
-from .models import User
+from rest_framework_simplejwt.exceptions import TokenBackendError, TokenBackendExpiredToken
+from rest_framework_simplejwt.settings import api_settings
+from .cache import TTLCache, restore, snapshot
+from .models import Role, User
+from .tokens import token_backend
+
+# Admin decisions keyed by (user_id, jti); kept short so revocations apply quickly. Per process:
+# a role change made by another worker applies here once ADMIN_AUTH_CACHE_TTL runs out.
+_admin_cache = TTLCache(
+    maxsize=getattr(settings, 'ADMIN_AUTH_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'ADMIN_AUTH_CACHE_TTL', 30),
+)
 
 
 def is_admin_from_token(token):
@@ -10,23 +22,43 @@ def is_admin_from_token(token):
     Returns (is_admin: bool, user: User or None)
     """
     try:
-        # Decode JWT token
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        user_id = payload.get("user_id")
+        # Decode JWT token with the shared, pre-keyed backend
+        payload = token_backend.decode(token)
+        user_id = payload.get(api_settings.USER_ID_CLAIM)
 
         if not user_id:
             raise AuthenticationFailed("Invalid token — user ID missing")
 
-        # Fetch user
-        user = User.objects.filter(id=user_id).first()
+        cache_key = (str(user_id), payload.get("jti"))
+        cached = _admin_cache.get(cache_key)
+        if cached is not None:
+            is_admin, frozen = cached
+            return is_admin, restore(frozen)
+
+        # Fetch user together with its role
+        user = User.objects.select_related("role").filter(id=user_id).first()
         if not user:
             raise AuthenticationFailed("User not found")
 
         # Check role
-        is_admin = user.is_superuser or (user.role and user.role.name.lower() == "admin")
+        is_admin = bool(user.is_superuser or (user.role and user.role.name.lower() == "admin"))
+        _admin_cache.set(cache_key, (is_admin, snapshot(user, related=('role',))))
         return is_admin, user
 
-    except jwt.ExpiredSignatureError:
+    except TokenBackendExpiredToken:
         raise AuthenticationFailed("Token has expired")
-    except jwt.DecodeError:
+    except TokenBackendError:
         raise AuthenticationFailed("Invalid token")
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_admin_cache_for_user(sender, instance, **kwargs):
+    user_id = str(instance.pk)
+    _admin_cache.discard_where(lambda key: key[0] == user_id)
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_admin_cache_for_role(sender, instance, **kwargs):
+    _admin_cache.clear()
@@ -3,16 +3,39 @@ from rest_framework.response import Response
 from rest_framework import status
 from .serializers import RegisterSerializer, VerifyOTPSerializer, LoginSerializer,UserProfileSerializer
 from datetime import timedelta
+from urllib.parse import urlencode
+from asgiref.sync import sync_to_async
 from django.shortcuts import redirect
-from django.http import JsonResponse
-from rest_framework_simplejwt.tokens import RefreshToken
-import requests
+from django.http import HttpResponse, JsonResponse
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.exceptions import AuthenticationFailed, Throttled, ValidationError
 from rest_framework.permissions import AllowAny
+from .auth import ClaimsUser, get_cached_user
+from .availability import refresh_availability
+from .bulk import bulk_write
+from .facets import facet_summary, filter_products, parse_filters
+from .search import product_search
+from .reservations import InsufficientStock, ReservationNotActive, adjust_stock, commit, release, reserve
+from .pagination import InvalidCursor, paginate
+from .passwords import HashPoolBusy
+from .conditional import conditional_get
+from .metrics import render_prometheus
+from .oauth import OAuthError, UpstreamTimeout, exchange_code, google_user
+from .response_cache import cache_stats, cached_get, invalidate
+from .streaming import STREAM_FORMATS, stream_response
+from .throttles import LoginEmailThrottle, LoginIPThrottle
+from .tokens import issue_tokens
 from .models import *
 from . serializers import *
-import os
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils.crypto import constant_time_compare
+import logging
+import math
+import uuid
+
+logger = logging.getLogger(__name__)
 
 class RegisterAPIView(APIView):
     permission_classes = [AllowAny]
@@ -80,25 +103,10 @@ class VerifyOTPAPIView(APIView):
     def post(self, request):
         serializer = VerifyOTPSerializer(data=request.data)
         if serializer.is_valid():
-            email = serializer.validated_data['email']
-
-            try:
-                user = User.objects.get(email=email)
-            except User.DoesNotExist:
-                return Response(
-                    {"error": True, "message": "User not found.", "meta": {}},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-
-            # ✅ Mark user verified
-            user.is_active = True
-            user.profile_verified = True
-            user.save()
+            user = serializer.save()
 
             # ✅ Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
-            access_token = str(refresh.access_token)
-            refresh_token = str(refresh)
+            access_token, refresh_token = issue_tokens(user)
 
             # ✅ Prepare response
             response = Response(
@@ -150,9 +158,26 @@ class VerifyOTPAPIView(APIView):
 class LoginAPIView(APIView):
     authentication_classes = []  # Disable token auth
     permission_classes = [AllowAny]
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
+
+    def handle_exception(self, exc):
+        if isinstance(exc, Throttled):
+            response = Response(
+                {"message": "Too many login attempts. Please try again later.", "meta": {}, "error": True},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+            )
+            response['Retry-After'] = str(math.ceil(exc.wait or 1))
+            return response
+        return super().handle_exception(exc)
+
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
-        if serializer.is_valid():
+        try:
+            valid = serializer.is_valid()
+        except HashPoolBusy:
+            # Every password worker is busy and the admission queue is full: shed the login
+            raise Throttled(wait=1)
+        if valid:
             user = serializer.validated_data['user']
             access_token = serializer.validated_data['access']
             refresh_token = serializer.validated_data['refresh']
@@ -208,74 +233,49 @@ class LoginAPIView(APIView):
         
         
 def generate_tokens(user):
-    refresh = RefreshToken.for_user(user)
+    access, refresh = issue_tokens(user)
     return {
-        "refresh": str(refresh),
-        "access": str(refresh.access_token),
+        "refresh": refresh,
+        "access": access,
     }
-        
-def google_callback(request):
-    code = request.GET.get("code")
-    if not code:
-        return JsonResponse({"error": "Missing authorization code"}, status=400)
 
-    try:
-        # 1️⃣ Exchange code for access token
-        token_data = {
-            "code": code,
-            "client_id": os.getenv("GOOGLE_CLIENT_ID"),
-            "client_secret": os.getenv("GOOGLE_CLIENT_SECRET"),
-            "redirect_uri": os.getenv("GOOGLE_REDIRECT_URI"),
-            "grant_type": "authorization_code",
-        }
-
-        token_res = requests.post(
-            "https://oauth2.googleapis.com/token",
-            data=token_data,
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-        )
 
-        token_json = token_res.json()
-        print("🔹 TOKEN RESPONSE:", token_json)
-        access_token = token_json.get("access_token")
-        if not access_token:
-            return JsonResponse({"error": "Access token not found"}, status=400)
+def google_login(claims):
+    user = google_user(claims)
+    return user, generate_tokens(user)
 
-        # 2️⃣ Get user info
-        user_info_res = requests.get(
-            "https://www.googleapis.com/oauth2/v3/userinfo",
-            headers={"Authorization": f"Bearer {access_token}"}
-        )
-        user_info = user_info_res.json()
-
-        # 3️⃣ Find or create user
-        user, created = User.objects.get_or_create(
-            email=user_info["email"],
-            defaults={
-                "first_name": user_info.get("given_name", "First"),
-                "last_name": user_info.get("family_name", "Last"),
-                "profile_picture": user_info.get("picture", ""),
-                "auth_provider": "google",
-            },
-        )
 
-        # 4️⃣ Generate JWT tokens
-        jwt_tokens = generate_tokens(user)
+async def google_callback(request):
+    """
+    The code exchange is blocking urllib3 I/O, so it runs on a thread pool thread
+    (sync_to_async with thread_sensitive=False) rather than the event loop; bee.oauth's
+    connect/read timeouts bound it, and an upstream timeout answers 504.
+    """
+    code = request.GET.get("code")
+    if not code:
+        return JsonResponse({"error": "Missing authorization code"}, status=400)
 
-        # 5️⃣ Redirect to frontend with query params
-        query = (
-            f"access_token={jwt_tokens['access']}"
-            f"&refresh_token={jwt_tokens['refresh']}"
-            f"&email={user.email}"
-            f"&user_id={user.id}"
-        )
-        redirect_url = f"http://127.0.0.1:8000/success?{query}"
+    try:
+        # 1️⃣ Exchange the code and verify the ID token locally (no userinfo call)
+        claims = await sync_to_async(exchange_code, thread_sensitive=False)(code)
+    except UpstreamTimeout as e:
+        logger.warning("Google login timed out: %s", e)
+        return JsonResponse({"error": "Google did not respond in time"}, status=504)
+    except OAuthError as e:
+        logger.warning("Google login failed: %s", e)
+        return JsonResponse({"error": "Google authentication failed"}, status=400)
 
-        return redirect(redirect_url)
+    # 2️⃣ Find or create the user and generate JWT tokens
+    user, jwt_tokens = await sync_to_async(google_login)(claims)
 
-    except Exception as e:
-        print("Google login error:", str(e))
-        return JsonResponse({"error": "Google authentication failed"}, status=400)
+    # 3️⃣ Redirect to frontend with query params
+    query = urlencode({
+        "access_token": jwt_tokens['access'],
+        "refresh_token": jwt_tokens['refresh'],
+        "email": user.email,
+        "user_id": str(user.id),
+    })
+    return redirect(f"{settings.GOOGLE_LOGIN_REDIRECT_URL}?{query}")
 
 
 
@@ -284,6 +284,9 @@ class MyProfileView(APIView):
 
     def get(self, request):
         user = request.user
+        if isinstance(user, ClaimsUser):
+            # Stateless principals only carry claims; the profile needs the full row.
+            user = get_cached_user(user.id)
         serializer = UserProfileSerializer(user)
         return Response({
             "message": "User profile fetched successfully.",
@@ -294,14 +297,59 @@ class MyProfileView(APIView):
         
         
         
-def api_response(message, error, data=None, code=status.HTTP_200_OK):
+def api_response(message, error, data=None, code=status.HTTP_200_OK, page=None):
+    meta = {"data": data if data else {}}
+    if page is not None:
+        meta["page"] = page
     return Response({
         "message": message,
         "error": error,
-        "meta": {"data": data if data else {}}
+        "meta": meta
     }, status=code)
 
 
+def planned_queryset(request, queryset, serializer_class):
+    """
+    Applies the serializer's declared query plan and any ?expand= relations.
+    Returns (queryset, serializer context); raises ValidationError for unknown expansions.
+    """
+    if not issubclass(serializer_class, ExpandableSerializerMixin):
+        if request.GET.get('expand'):
+            raise ValidationError({"expand": "This endpoint has no expandable fields."})
+        return queryset, {}
+    expand = serializer_class.parse_expand(request.GET.get('expand'))
+    return serializer_class.query_plan(queryset, expand), {"expand": expand}
+
+
+def paginated_response(request, queryset, serializer_class, message):
+    """
+    Serializes one keyset page of the queryset (see bee.pagination) inside the usual envelope.
+    """
+    try:
+        queryset, context = planned_queryset(request, queryset, serializer_class)
+        rows, page = paginate(request, queryset)
+    except ValidationError as exc:
+        return api_response("Invalid expand", True, exc.detail, status.HTTP_400_BAD_REQUEST)
+    except InvalidCursor:
+        return api_response("Invalid cursor", True, {}, status.HTTP_400_BAD_REQUEST)
+    serializer = serializer_class(rows, many=True, context=context)
+    return api_response(message, False, serializer.data, page=page)
+
+
+def export_response(request, queryset, serializer_class):
+    """
+    Full export for ?stream=ndjson|json, serialized row by row with flat memory use.
+    """
+    fmt = request.GET.get('stream')
+    if fmt not in STREAM_FORMATS:
+        return api_response("Unsupported stream format", True, {"supported": list(STREAM_FORMATS)}, status.HTTP_400_BAD_REQUEST)
+    try:
+        queryset, context = planned_queryset(request, queryset, serializer_class)
+    except ValidationError as exc:
+        return api_response("Invalid expand", True, exc.detail, status.HTTP_400_BAD_REQUEST)
+    return stream_response(queryset, serializer_class, fmt, context)
+
+
 # ---------- CATEGORY ----------
 from .utils import is_admin_from_token  # your admin token checker
 
@@ -326,10 +374,11 @@ class AdminAuthMixin:
 
 # ---------------- CATEGORY ----------------
 class CategoryListCreateAPIView(AdminAuthMixin, APIView):
+    @conditional_get(Category)
+    @cached_get('categories')
     def get(self, request):
         categories = Category.objects.all()
-        serializer = CategorySerializer(categories, many=True)
-        return api_response("Categories fetched successfully", False, serializer.data)
+        return paginated_response(request, categories, CategorySerializer, "Categories fetched successfully")
 
     def post(self, request):
         self.check_admin(request)
@@ -341,6 +390,8 @@ class CategoryListCreateAPIView(AdminAuthMixin, APIView):
 
 
 class CategoryDetailAPIView(AdminAuthMixin, APIView):
+    @conditional_get(Category)
+    @cached_get('categories')
     def get(self, request, pk):
         try:
             category = Category.objects.get(pk=pk)
@@ -371,12 +422,68 @@ class CategoryDetailAPIView(AdminAuthMixin, APIView):
             return api_response("Category not found", True, {}, status.HTTP_404_NOT_FOUND)
 
 
+class CategoryTreeAPIView(APIView):
+    @conditional_get(Category, whole_table=True)
+    @cached_get('categories')
+    def get(self, request, pk):
+        """
+        Returns the category with its full subtree and ancestor chain, loaded in one query.
+        """
+        try:
+            segment = f"{uuid.UUID(pk).hex}/"
+        except ValueError:
+            return api_response("Category not found", True, {}, status.HTTP_404_NOT_FOUND)
+
+        # Subtree rows carry the node's segment in their path; ancestors are path prefixes of the node.
+        is_ancestor = Exists(Category.objects.filter(pk=pk, path__startswith=OuterRef('path')))
+        nodes = list(Category.objects.filter(Q(path__contains=segment) | is_ancestor))
+
+        root = next((node for node in nodes if node.segment == segment), None)
+        if root is None:
+            return api_response("Category not found", True, {}, status.HTTP_404_NOT_FOUND)
+
+        serialized = {}
+        for node in nodes:
+            if node.path.startswith(root.path):
+                serialized[node.pk] = {**CategorySerializer(node).data, "depth": node.depth, "subcategories": []}
+        for node in nodes:
+            if node.pk != root.pk and node.path.startswith(root.path):
+                serialized[node.parent_category_id]["subcategories"].append(serialized[node.pk])
+
+        ancestors = [
+            {**CategorySerializer(node).data, "depth": node.depth}
+            for node in sorted(nodes, key=lambda node: node.depth)
+            if not node.path.startswith(root.path)
+        ]
+        return api_response("Category tree fetched", False, {"category": serialized[root.pk], "ancestors": ancestors})
+
+
+class CacheStatsAPIView(AdminAuthMixin, APIView):
+    def get(self, request):
+        self.check_admin(request)
+        return api_response("Cache stats fetched", False, cache_stats())
+
+
+class MetricsAPIView(AdminAuthMixin, APIView):
+    # The bearer token is checked below; DRF's JWT authentication would reject METRICS_TOKEN
+    authentication_classes = []
+
+    def get(self, request):
+        # Scrapers can use the static METRICS_TOKEN instead of an admin JWT
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        scheme, _, presented = request.headers.get("Authorization", "").partition(" ")
+        if not (token and scheme == "Bearer" and constant_time_compare(presented, token)):
+            self.check_admin(request)
+        return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 # ---------------- BRAND ----------------
 class BrandListCreateAPIView(AdminAuthMixin, APIView):
+    @conditional_get(Brand)
+    @cached_get('brands')
     def get(self, request):
         brands = Brand.objects.all()
-        serializer = BrandSerializer(brands, many=True)
-        return api_response("Brands fetched successfully", False, serializer.data)
+        return paginated_response(request, brands, BrandSerializer, "Brands fetched successfully")
 
     def post(self, request):
         self.check_admin(request)
@@ -388,6 +495,8 @@ class BrandListCreateAPIView(AdminAuthMixin, APIView):
 
 
 class BrandDetailAPIView(AdminAuthMixin, APIView):
+    @conditional_get(Brand)
+    @cached_get('brands')
     def get(self, request, pk):
         try:
             brand = Brand.objects.get(pk=pk)
@@ -420,10 +529,16 @@ class BrandDetailAPIView(AdminAuthMixin, APIView):
 
 # ---------------- PRODUCT ----------------
 class ProductListCreateAPIView(AdminAuthMixin, APIView):
+    @conditional_get(Product)
+    @cached_get('products')
     def get(self, request):
-        products = Product.objects.all()
-        serializer = ProductSerializer(products, many=True)
-        return api_response("Products fetched successfully", False, serializer.data)
+        try:
+            products = filter_products(Product.objects.all(), parse_filters(request.GET))
+        except ValidationError as exc:
+            return api_response("Invalid filter", True, exc.detail, status.HTTP_400_BAD_REQUEST)
+        if request.GET.get('stream'):
+            return export_response(request, products, ProductSerializer)
+        return paginated_response(request, products, ProductSerializer, "Products fetched successfully")
 
     def post(self, request):
         self.check_admin(request)
@@ -434,11 +549,58 @@ class ProductListCreateAPIView(AdminAuthMixin, APIView):
         return api_response("Validation failed", True, serializer.errors, status.HTTP_400_BAD_REQUEST)
 
 
+class ProductSearchAPIView(APIView):
+    def get(self, request):
+        query = request.GET.get('q', '').strip()
+        if not query:
+            return api_response("Query parameter q is required", True, {}, status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.GET.get('limit', 20)), settings.SEARCH_MAX_RESULTS)
+            if limit < 1:
+                raise ValueError
+        except ValueError:
+            return api_response("limit must be a positive integer", True, {}, status.HTTP_400_BAD_REQUEST)
+        try:
+            queryset, context = planned_queryset(request, Product.objects.all(), ProductSerializer)
+        except ValidationError as exc:
+            return api_response("Invalid expand", True, exc.detail, status.HTTP_400_BAD_REQUEST)
+
+        hits = product_search.search(query, limit)
+        # Rows are put in rank order below, so skip the Meta.ordering sort
+        products = queryset.order_by().in_bulk([key for key, _ in hits])
+        # Products another process deleted stay in this index until its next sync
+        # (SEARCH_INDEX_SYNC_SECONDS), so skip ids that no longer load
+        ranked = [(products[key], score) for key, score in hits if key in products]
+        serializer = ProductSerializer([product for product, _ in ranked], many=True, context=context)
+        data = [{**row, "score": score} for row, (_, score) in zip(serializer.data, ranked)]
+        return api_response("Products fetched successfully", False, data, page={"limit": limit, "count": len(data)})
+
+
+class ProductFacetsAPIView(APIView):
+    """
+    Facet counts for the product list filters (same query params as GET /products/).
+    """
+    @conditional_get(Product)
+    @cached_get('products')
+    def get(self, request):
+        try:
+            filters = parse_filters(request.GET)
+        except ValidationError as exc:
+            return api_response("Invalid filter", True, exc.detail, status.HTTP_400_BAD_REQUEST)
+        return api_response("Facets fetched successfully", False, facet_summary(filters, settings.FACET_MAX_VALUES))
+
+
 class ProductDetailAPIView(AdminAuthMixin, APIView):
+    @conditional_get(Product)
+    @cached_get('products')
     def get(self, request, pk):
         try:
-            product = Product.objects.get(pk=pk)
-            serializer = ProductSerializer(product)
+            queryset, context = planned_queryset(request, Product.objects.all(), ProductSerializer)
+        except ValidationError as exc:
+            return api_response("Invalid expand", True, exc.detail, status.HTTP_400_BAD_REQUEST)
+        try:
+            product = queryset.get(pk=pk)
+            serializer = ProductSerializer(product, context=context)
             return api_response("Product details fetched", False, serializer.data)
         except Product.DoesNotExist:
             return api_response("Product not found", True, {}, status.HTTP_404_NOT_FOUND)
@@ -467,10 +629,12 @@ class ProductDetailAPIView(AdminAuthMixin, APIView):
 
 # ---------------- VARIANT ----------------
 class VariantListCreateAPIView(AdminAuthMixin, APIView):
+    @conditional_get(Variant)
     def get(self, request):
         variants = Variant.objects.all()
-        serializer = VariantSerializer(variants, many=True)
-        return api_response("Variants fetched successfully", False, serializer.data)
+        if request.GET.get('stream'):
+            return export_response(request, variants, VariantSerializer)
+        return paginated_response(request, variants, VariantSerializer, "Variants fetched successfully")
 
     def post(self, request):
         self.check_admin(request)
@@ -482,10 +646,15 @@ class VariantListCreateAPIView(AdminAuthMixin, APIView):
 
 
 class VariantDetailAPIView(AdminAuthMixin, APIView):
+    @conditional_get(Variant)
     def get(self, request, pk):
         try:
-            variant = Variant.objects.get(pk=pk)
-            serializer = VariantSerializer(variant)
+            queryset, context = planned_queryset(request, Variant.objects.all(), VariantSerializer)
+        except ValidationError as exc:
+            return api_response("Invalid expand", True, exc.detail, status.HTTP_400_BAD_REQUEST)
+        try:
+            variant = queryset.get(pk=pk)
+            serializer = VariantSerializer(variant, context=context)
             return api_response("Variant details fetched", False, serializer.data)
         except Variant.DoesNotExist:
             return api_response("Variant not found", True, {}, status.HTTP_404_NOT_FOUND)
@@ -514,10 +683,10 @@ class VariantDetailAPIView(AdminAuthMixin, APIView):
 
 # ---------------- WAREHOUSE ----------------
 class WarehouseListCreateAPIView(AdminAuthMixin, APIView):
+    @conditional_get(Warehouse)
     def get(self, request):
         warehouses = Warehouse.objects.all()
-        serializer = WarehouseSerializer(warehouses, many=True)
-        return api_response("Warehouses fetched successfully", False, serializer.data)
+        return paginated_response(request, warehouses, WarehouseSerializer, "Warehouses fetched successfully")
 
     def post(self, request):
         self.check_admin(request)
@@ -529,6 +698,7 @@ class WarehouseListCreateAPIView(AdminAuthMixin, APIView):
 
 
 class WarehouseDetailAPIView(AdminAuthMixin, APIView):
+    @conditional_get(Warehouse)
     def get(self, request, pk):
         try:
             warehouse = Warehouse.objects.get(pk=pk)
@@ -561,10 +731,12 @@ class WarehouseDetailAPIView(AdminAuthMixin, APIView):
 
 # ---------------- INVENTORY ----------------
 class InventoryListCreateAPIView(AdminAuthMixin, APIView):
+    @conditional_get(Inventory)
     def get(self, request):
         inventories = Inventory.objects.all()
-        serializer = InventorySerializer(inventories, many=True)
-        return api_response("Inventories fetched successfully", False, serializer.data)
+        if request.GET.get('stream'):
+            return export_response(request, inventories, InventorySerializer)
+        return paginated_response(request, inventories, InventorySerializer, "Inventories fetched successfully")
 
     def post(self, request):
         self.check_admin(request)
@@ -576,10 +748,15 @@ class InventoryListCreateAPIView(AdminAuthMixin, APIView):
 
 
 class InventoryDetailAPIView(AdminAuthMixin, APIView):
+    @conditional_get(Inventory)
     def get(self, request, pk):
         try:
-            inventory = Inventory.objects.get(pk=pk)
-            serializer = InventorySerializer(inventory)
+            queryset, context = planned_queryset(request, Inventory.objects.all(), InventorySerializer)
+        except ValidationError as exc:
+            return api_response("Invalid expand", True, exc.detail, status.HTTP_400_BAD_REQUEST)
+        try:
+            inventory = queryset.get(pk=pk)
+            serializer = InventorySerializer(inventory, context=context)
             return api_response("Inventory details fetched", False, serializer.data)
         except Inventory.DoesNotExist:
             return api_response("Inventory not found", True, {}, status.HTTP_404_NOT_FOUND)
@@ -606,12 +783,145 @@ class InventoryDetailAPIView(AdminAuthMixin, APIView):
             return api_response("Inventory not found", True, {}, status.HTTP_404_NOT_FOUND)
 
 
+class InventoryStockAPIView(AdminAuthMixin, APIView):
+    def post(self, request):
+        """
+        Receives or writes off stock: each line adds its delta to quantity_available.
+        """
+        self.check_admin(request)
+        serializer = StockAdjustmentSerializer(data=request.data)
+        if not serializer.is_valid():
+            return api_response("Validation failed", True, serializer.errors, status.HTTP_400_BAD_REQUEST)
+        lines = [(item['inventory_id'], item['delta']) for item in serializer.validated_data['items']]
+        try:
+            adjust_stock(lines)
+        except InsufficientStock as exc:
+            return api_response("Insufficient stock", True, {"inventory_id": str(exc.inventory_id)}, status.HTTP_409_CONFLICT)
+        inventories = Inventory.objects.filter(pk__in=[inventory_id for inventory_id, _ in lines])
+        return api_response("Stock adjusted successfully", False, InventorySerializer(inventories, many=True).data)
+
+
+# ---------------- BULK ----------------
+BULK_MODES = ('create', 'upsert')
+
+
+def bulk_response(request, serializer_class, message, on_write=None):
+    """
+    Validates a JSON list of rows as one batch and writes it with bee.bulk.bulk_write.
+    ?mode=create inserts only; ?mode=upsert (default) updates rows matching the natural key.
+    Bulk writes skip model signals; on_write(rows) runs their side effects instead.
+    """
+    mode = request.GET.get('mode', 'upsert')
+    if mode not in BULK_MODES:
+        return api_response("Unsupported bulk mode", True, {"supported": list(BULK_MODES)}, status.HTTP_400_BAD_REQUEST)
+    if not isinstance(request.data, list):
+        return api_response("Expected a list of rows", True, {}, status.HTTP_400_BAD_REQUEST)
+
+    serializer = serializer_class(
+        data=request.data, many=True, allow_empty=False, max_length=settings.BULK_MAX_ROWS,
+        context={'bulk_mode': mode},
+    )
+    if not serializer.is_valid():
+        return api_response("Validation failed", True, serializer.errors, status.HTTP_400_BAD_REQUEST)
+    try:
+        with transaction.atomic():
+            counts = bulk_write(serializer, upsert=mode == 'upsert')
+            if on_write is not None:
+                on_write(serializer.validated_data)
+    except IntegrityError as exc:
+        # Validation already reports conflicting rows; this is a row written concurrently
+        logger.warning("Bulk write conflict: %s", exc)
+        return api_response(
+            "Bulk write conflicts with rows written meanwhile; retry the request", True, {}, status.HTTP_409_CONFLICT,
+        )
+    return api_response(message, False, counts, status.HTTP_201_CREATED)
+
+
+class ProductBulkAPIView(AdminAuthMixin, APIView):
+    def post(self, request):
+        self.check_admin(request)
+        return bulk_response(
+            request, ProductBulkSerializer, "Products saved successfully",
+            on_write=lambda rows: transaction.on_commit(lambda: invalidate('products')),
+        )
+
+
+class VariantBulkAPIView(AdminAuthMixin, APIView):
+    def post(self, request):
+        self.check_admin(request)
+        return bulk_response(
+            request, VariantBulkSerializer, "Variants saved successfully",
+            on_write=lambda rows: transaction.on_commit(lambda: invalidate('products')),
+        )
+
+
+class InventoryBulkAPIView(AdminAuthMixin, APIView):
+    def post(self, request):
+        self.check_admin(request)
+        return bulk_response(
+            request, InventoryBulkSerializer, "Inventories saved successfully",
+            on_write=lambda rows: refresh_availability(row['product_id_id'] for row in rows),
+        )
+
+
+# ---------------- RESERVATION ----------------
+class ReservationCreateAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = ReservationCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return api_response("Validation failed", True, serializer.errors, status.HTTP_400_BAD_REQUEST)
+        lines = [(item['inventory_id'], item['quantity']) for item in serializer.validated_data['items']]
+        try:
+            reservation = reserve(lines, user_id=request.user.id)
+        except InsufficientStock as exc:
+            return api_response("Insufficient stock", True, {"inventory_id": str(exc.inventory_id)}, status.HTTP_409_CONFLICT)
+        reservation = StockReservation.objects.prefetch_related('items').get(pk=reservation.pk)
+        return api_response("Stock reserved successfully", False, StockReservationSerializer(reservation).data, status.HTTP_201_CREATED)
+
+
+class ReservationDetailAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            reservation = StockReservation.objects.prefetch_related('items').get(pk=pk, user_id=request.user.id)
+        except StockReservation.DoesNotExist:
+            return api_response("Reservation not found", True, {}, status.HTTP_404_NOT_FOUND)
+        return api_response("Reservation details fetched", False, StockReservationSerializer(reservation).data)
+
+
+class ReservationActionAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    action = None
+    message = None
+
+    def post(self, request, pk):
+        if not StockReservation.objects.filter(pk=pk, user_id=request.user.id).exists():
+            return api_response("Reservation not found", True, {}, status.HTTP_404_NOT_FOUND)
+        try:
+            self.action(pk)
+        except ReservationNotActive:
+            return api_response("Reservation is no longer active", True, {}, status.HTTP_409_CONFLICT)
+        return api_response(self.message, False)
+
+
+class ReservationCommitAPIView(ReservationActionAPIView):
+    action = staticmethod(commit)
+    message = "Reservation committed successfully"
+
+
+class ReservationReleaseAPIView(ReservationActionAPIView):
+    action = staticmethod(release)
+    message = "Reservation released successfully"
+
+
 # ---------------- PURCHASE ORDER ----------------
 class PurchaseOrderListCreateAPIView(AdminAuthMixin, APIView):
     def get(self, request):
         orders = PurchaseOrder.objects.all()
-        serializer = PurchaseOrderSerializer(orders, many=True)
-        return api_response("Purchase orders fetched successfully", False, serializer.data)
+        return paginated_response(request, orders, PurchaseOrderSerializer, "Purchase orders fetched successfully")
 
     def post(self, request):
         self.check_admin(request)
@@ -625,7 +935,7 @@ class PurchaseOrderListCreateAPIView(AdminAuthMixin, APIView):
 class PurchaseOrderDetailAPIView(AdminAuthMixin, APIView):
     def get(self, request, pk):
         try:
-            order = PurchaseOrder.objects.get(pk=pk)
+            order = PurchaseOrderSerializer.query_plan(PurchaseOrder.objects.all()).get(pk=pk)
             serializer = PurchaseOrderSerializer(order)
             return api_response("Purchase order details fetched", False, serializer.data)
         except PurchaseOrder.DoesNotExist:
@@ -634,7 +944,7 @@ class PurchaseOrderDetailAPIView(AdminAuthMixin, APIView):
     def put(self, request, pk):
         self.check_admin(request)
         try:
-            order = PurchaseOrder.objects.get(pk=pk)
+            order = PurchaseOrderSerializer.query_plan(PurchaseOrder.objects.all()).get(pk=pk)
             serializer = PurchaseOrderSerializer(order, data=request.data, partial=True)
             if serializer.is_valid():
                 serializer.save()
@@ -657,8 +967,7 @@ class PurchaseOrderDetailAPIView(AdminAuthMixin, APIView):
 class PurchaseOrderItemListCreateAPIView(AdminAuthMixin, APIView):
     def get(self, request):
         items = PurchaseOrderItem.objects.all()
-        serializer = PurchaseOrderItemSerializer(items, many=True)
-        return api_response("Purchase order items fetched successfully", False, serializer.data)
+        return paginated_response(request, items, PurchaseOrderItemSerializer, "Purchase order items fetched successfully")
 
     def post(self, request):
         self.check_admin(request)
@@ -672,8 +981,12 @@ class PurchaseOrderItemListCreateAPIView(AdminAuthMixin, APIView):
 class PurchaseOrderItemDetailAPIView(AdminAuthMixin, APIView):
     def get(self, request, pk):
         try:
-            item = PurchaseOrderItem.objects.get(pk=pk)
-            serializer = PurchaseOrderItemSerializer(item)
+            queryset, context = planned_queryset(request, PurchaseOrderItem.objects.all(), PurchaseOrderItemSerializer)
+        except ValidationError as exc:
+            return api_response("Invalid expand", True, exc.detail, status.HTTP_400_BAD_REQUEST)
+        try:
+            item = queryset.get(pk=pk)
+            serializer = PurchaseOrderItemSerializer(item, context=context)
             return api_response("Purchase order item details fetched", False, serializer.data)
         except PurchaseOrderItem.DoesNotExist:
             return api_response("Purchase order item not found", True, {}, status.HTTP_404_NOT_FOUND)
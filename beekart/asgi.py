@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'beekart.settings')
+# Read by settings: persistent DB connections are off by default under ASGI
+os.environ.setdefault('DJANGO_SERVER_INTERFACE', 'asgi')
 
 application = get_asgi_application()
+
+# Search and facet indexes build in the background instead of in the first requests
+from bee.indexing import start_catalog_indexes  # noqa: E402
+
+start_catalog_indexes()
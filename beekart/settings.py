@@ -11,9 +11,11 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
 from datetime import timedelta
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv()
@@ -55,6 +57,7 @@ AUTHENTICATION_BACKENDS = (
 )
 
 MIDDLEWARE = [
+    'bee.middleware.QueryProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware', 
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -102,6 +105,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'beekart.wsgi.application'
+ASGI_APPLICATION = 'beekart.asgi.application'
+# Serve catalog GETs with native async views (only worthwhile when running under ASGI)
+ASYNC_CATALOG_READS = os.getenv('ASYNC_CATALOG_READS', 'False') == 'True'
 
 
 
@@ -121,17 +127,50 @@ SOCIALACCOUNT_PROVIDERS = {
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+DATABASE_ENGINE = os.getenv('DATABASE_ENGINE', 'mysql')  # mysql | postgresql | sqlite3
+# wsgi | asgi; beekart/asgi.py sets it before loading these settings
+SERVER_INTERFACE = os.getenv('DJANGO_SERVER_INTERFACE', 'wsgi')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',  # change to 'mysql' if needed
+        'ENGINE': f'django.db.backends.{DATABASE_ENGINE}',
         'NAME': os.getenv('DATABASE_NAME', 'beekart'),
         'USER': os.getenv('DATABASE_USER', 'postgres'),
         'PASSWORD': os.getenv('DATABASE_PASSWORD', ''),
         'HOST': os.getenv('DATABASE_HOST', 'localhost'),
         'PORT': os.getenv('DATABASE_PORT', '5432'),
+        # Keep one connection per worker thread alive between requests instead of reconnecting.
+        # Off by default under ASGI, where each sync request may run on a new thread and every
+        # thread would keep its own connection open (use DATABASE_POOL_SIZE there instead).
+        'CONN_MAX_AGE': int(os.getenv('DATABASE_CONN_MAX_AGE', 0 if SERVER_INTERFACE == 'asgi' else 300)),
+        # Ping reused connections at the start of each request and reconnect if they went away
+        'CONN_HEALTH_CHECKS': os.getenv('DATABASE_CONN_HEALTH_CHECKS', 'True') == 'True',
     }
 }
 
+if DATABASE_ENGINE == 'sqlite3':
+    DATABASES['default']['NAME'] = os.getenv('DATABASE_NAME', str(BASE_DIR / 'db.sqlite3'))
+    # Writers queue for the lock at BEGIN instead of failing when two transactions both
+    # try to upgrade; the test database is a file so threaded tests share it the same way
+    DATABASES['default']['OPTIONS'] = {'transaction_mode': 'IMMEDIATE', 'timeout': 20}
+    DATABASES['default']['TEST'] = {'NAME': str(BASE_DIR / 'test_db.sqlite3')}
+
+# Shared connection pool (PostgreSQL with psycopg 3 and psycopg-pool only; psycopg2 has no
+# pool). Pooled connections are returned after every request, so persistent connections
+# are switched off.
+DATABASE_POOL_SIZE = int(os.getenv('DATABASE_POOL_SIZE', 0))
+if DATABASE_ENGINE == 'postgresql' and DATABASE_POOL_SIZE:
+    if importlib.util.find_spec('psycopg_pool') is None:
+        raise ImproperlyConfigured("DATABASE_POOL_SIZE needs psycopg 3 with the pool extra: pip install 'psycopg[pool]'")
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('DATABASE_POOL_MIN_SIZE', 2)),
+            'max_size': DATABASE_POOL_SIZE,
+            'timeout': int(os.getenv('DATABASE_POOL_TIMEOUT', 10)),
+        }
+    }
+
 # settings.py (Add these configurations to your project's settings.py)
 import os
 from dotenv import load_dotenv  # pip install python-dotenv if not installed
@@ -143,8 +182,109 @@ REST_FRAMEWORK = {
         'bee.auth.CookieJWTAuthentication',
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
+    # Used by the throttles in bee.throttles, which are checked before any password hashing
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.getenv('LOGIN_THROTTLE_IP_RATE', '30/min'),
+        'login_email': os.getenv('LOGIN_THROTTLE_EMAIL_RATE', '5/min'),
+    },
+    # Reverse proxies in front of the app. Throttles key on the address the last of them
+    # saw in X-Forwarded-For; with 0 they key on REMOTE_ADDR and ignore the header, which
+    # the client controls
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 0)),
 }
 
+# Cursor pagination for list endpoints (?page_size= is capped at API_MAX_PAGE_SIZE)
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 50))
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 500))
+# Rows fetched and flushed per chunk by ?stream=ndjson|json exports
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 2000))
+# Bulk create/upsert endpoints: rows accepted per request and rows per INSERT batch
+BULK_MAX_ROWS = int(os.getenv('BULK_MAX_ROWS', 1000))
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', 1000))
+# In-process product search (bee.search): how often each process catches up with
+# writes made elsewhere, and the most results one query may ask for
+SEARCH_INDEX_SYNC_SECONDS = int(os.getenv('SEARCH_INDEX_SYNC_SECONDS', 5))
+SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', 100))
+# Product facet bitmaps (bee.facets): catch-up interval and values returned per facet.
+FACET_INDEX_SYNC_SECONDS = int(os.getenv('FACET_INDEX_SYNC_SECONDS', 5))
+FACET_MAX_VALUES = int(os.getenv('FACET_MAX_VALUES', 50))
+# Catalog index catch-up (bee.indexing): how far before the database watermark each
+# sync looks again, for rows committed after others stamped later, and how often each
+# process rebuilds its indexes from scratch (sweep_tombstones keeps twice that)
+CATALOG_INDEX_SYNC_OVERLAP_SECONDS = int(os.getenv('CATALOG_INDEX_SYNC_OVERLAP_SECONDS', 60))
+CATALOG_INDEX_RECONCILE_SECONDS = int(os.getenv('CATALOG_INDEX_RECONCILE_SECONDS', 3600))
+# Build the indexes on a background thread when the WSGI/ASGI application loads
+CATALOG_INDEX_WARM_ON_START = os.getenv('CATALOG_INDEX_WARM_ON_START', 'True') == 'True'
+# Fraction of requests profiled into the /api/_metrics histograms (0 disables profiling)
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv('REQUEST_METRICS_SAMPLE_RATE', 0.0))
+# Static bearer token for Prometheus scrapes of /api/_metrics (admin JWTs also work)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Seconds a stock reservation holds inventory before expire_reservations returns it
+STOCK_RESERVATION_TTL = int(os.getenv('STOCK_RESERVATION_TTL', 900))
+
+# Response cache for catalog GETs. CATALOG_CACHE_BACKEND: file (shared by the workers on one
+# host), redis (shared across hosts, any Redis-compatible server) or locmem. Writes invalidate
+# by bumping a generation key in this cache, so locmem is only correct with a single worker
+# process: other workers would serve stale responses for up to CATALOG_CACHE_TTL.
+CATALOG_CACHE_BACKEND = os.getenv('CATALOG_CACHE_BACKEND', 'file')
+CATALOG_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CATALOG_CACHE_LOCATION = {
+    'locmem': 'catalog',
+    'file': str(BASE_DIR / '.cache' / 'catalog'),
+    'redis': 'redis://127.0.0.1:6379/1',
+}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': CATALOG_CACHE_BACKENDS[CATALOG_CACHE_BACKEND],
+        'LOCATION': os.getenv('CATALOG_CACHE_LOCATION', CATALOG_CACHE_LOCATION[CATALOG_CACHE_BACKEND]),
+    },
+}
+if CATALOG_CACHE_BACKEND != 'redis':
+    CACHES['catalog']['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv('CATALOG_CACHE_MAX_ENTRIES', 10000))}
+CATALOG_CACHE_TTL = int(os.getenv('CATALOG_CACHE_TTL', 300))
+
+# Email verification codes (bee.otp). OTP_STORE: database (swept by manage.py sweep_otps)
+# or cache (TTL keys in the 'otp' cache; use the file or redis backend with several workers).
+OTP_STORE = os.getenv('OTP_STORE', 'database')
+OTP_TTL_SECONDS = int(os.getenv('OTP_TTL_SECONDS', 300))
+OTP_CACHE_BACKEND = os.getenv('OTP_CACHE_BACKEND', CATALOG_CACHE_BACKEND)
+CACHES['otp'] = {
+    'BACKEND': CATALOG_CACHE_BACKENDS[OTP_CACHE_BACKEND],
+    'LOCATION': os.getenv('OTP_CACHE_LOCATION', {
+        'locmem': 'otp',
+        'file': str(BASE_DIR / '.cache' / 'otp'),
+        'redis': 'redis://127.0.0.1:6379/2',
+    }[OTP_CACHE_BACKEND]),
+}
+# Login throttle counters (bee.throttles); shared between workers unless the backend is locmem.
+THROTTLE_CACHE_BACKEND = os.getenv('THROTTLE_CACHE_BACKEND', CATALOG_CACHE_BACKEND)
+CACHES['throttle'] = {
+    'BACKEND': CATALOG_CACHE_BACKENDS[THROTTLE_CACHE_BACKEND],
+    'LOCATION': os.getenv('THROTTLE_CACHE_LOCATION', {
+        'locmem': 'throttle',
+        'file': str(BASE_DIR / '.cache' / 'throttle'),
+        'redis': 'redis://127.0.0.1:6379/3',
+    }[THROTTLE_CACHE_BACKEND]),
+}
+
+# Login password checks (bee.passwords) run in a bounded per-process pool so a login burst
+# cannot take every core from catalog reads. 0 workers hashes inline on the request thread.
+# PASSWORD_HASH_QUEUE checks may wait for a worker; beyond that, and after PASSWORD_HASH_TIMEOUT
+# seconds, login answers 429. PASSWORD_HASH_EXECUTOR: thread (hashlib releases the GIL) or
+# process; PASSWORD_HASH_NICE lowers the workers' CPU priority below request handling.
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', 4))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 3))
+PASSWORD_HASH_EXECUTOR = os.getenv('PASSWORD_HASH_EXECUTOR', 'thread')
+PASSWORD_HASH_NICE = int(os.getenv('PASSWORD_HASH_NICE', 5))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=15),
@@ -152,8 +292,36 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,  # Rotate hone ke baad purane ko invalidate kare
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
+    # bee.tokens adds the compact custom claims and verifies with a prepared key
+    'AUTH_TOKEN_CLASSES': ('bee.tokens.AccessToken',),
 }
 
+# Google sign-in (bee.oauth): OIDC discovery (point it at a stub server to test), the OAuth
+# client, and where the callback sends the browser with the issued tokens.
+GOOGLE_OIDC_DISCOVERY_URL = os.getenv('GOOGLE_OIDC_DISCOVERY_URL', 'https://accounts.google.com/.well-known/openid-configuration')
+GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
+GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
+GOOGLE_REDIRECT_URI = os.getenv('GOOGLE_REDIRECT_URI')
+GOOGLE_LOGIN_REDIRECT_URL = os.getenv('GOOGLE_LOGIN_REDIRECT_URL', 'http://127.0.0.1:8000/success')
+# Pooled keep-alive client for Google: connections kept per host and strict timeouts (seconds)
+GOOGLE_HTTP_POOL_SIZE = int(os.getenv('GOOGLE_HTTP_POOL_SIZE', 10))
+GOOGLE_HTTP_CONNECT_TIMEOUT = float(os.getenv('GOOGLE_HTTP_CONNECT_TIMEOUT', 2))
+GOOGLE_HTTP_READ_TIMEOUT = float(os.getenv('GOOGLE_HTTP_READ_TIMEOUT', 5))
+# Upper bound on caching the discovery document and JWKS; refetch on an unknown key id at most this often
+GOOGLE_OIDC_CACHE_SECONDS = int(os.getenv('GOOGLE_OIDC_CACHE_SECONDS', 3600))
+GOOGLE_JWKS_MIN_REFRESH_SECONDS = int(os.getenv('GOOGLE_JWKS_MIN_REFRESH_SECONDS', 60))
+
+# Build request.user straight from the access token claims instead of loading the User row.
+# Role or activation changes then only take effect once the token expires.
+JWT_STATELESS_AUTH = os.getenv('JWT_STATELESS_AUTH', 'False') == 'True'
+# Per-process cache of authenticated users (used when stateless auth is off). Writes clear it
+# only in the writing process; other workers see role or activation changes after the TTL.
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', 10000))
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 60))
+# Cached is-admin decisions for AdminAuthMixin, keyed by user id and token jti.
+ADMIN_AUTH_CACHE_SIZE = int(os.getenv('ADMIN_AUTH_CACHE_SIZE', 10000))
+ADMIN_AUTH_CACHE_TTL = int(os.getenv('ADMIN_AUTH_CACHE_TTL', 30))
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.getenv('EMAIL_HOST')
 EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
@@ -161,6 +329,11 @@ EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL')
+# Outbox worker (manage.py send_queued_emails): retries back off exponentially from this base
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+EMAIL_OUTBOX_RETRY_SECONDS = int(os.getenv('EMAIL_OUTBOX_RETRY_SECONDS', 30))
+# How long a worker owns the emails it claimed; unfinished ones are retried after this
+EMAIL_OUTBOX_LEASE_SECONDS = int(os.getenv('EMAIL_OUTBOX_LEASE_SECONDS', 300))
 
 # Also, add your app to INSTALLED_APPS, e.g., 'your_app_name.apps.YourAppConfig'
 # And for DRF: REST_FRAMEWORK = { ... } if needed
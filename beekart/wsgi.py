@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'beekart.settings')
 
 application = get_wsgi_application()
+
+# Search and facet indexes build in the background instead of in the first requests
+from bee.indexing import start_catalog_indexes  # noqa: E402
+
+start_catalog_indexes()